@@ -11,7 +11,7 @@ def update_dependencies(payload: DependencyRequest):
     Generate or update project dependencies based on the root directory and Python version.
 
     Args:
-        payload: DependencyRequest containing root_dir and python_version.
+        payload: DependencyRequest containing root_dir, python_version and the offline and resolve_only flags.
 
     Returns:
         A list or string of resolved dependencies.
@@ -22,7 +22,9 @@ def update_dependencies(payload: DependencyRequest):
     try:
         return generate_dependencies(
             root_dir=payload.root_dir,
-            python_version=payload.python_version
+            python_version=payload.python_version,
+            offline=payload.offline,
+            resolve_only=payload.resolve_only
         )
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -2,8 +2,9 @@
 from fastapi import APIRouter, HTTPException
 from loguru import logger
 
-from models.model import FileContent
+from models.model import FileContent, DirectoryAnalysisRequest
 from services.file_analysis_service import generate_file_analysis
+from services.static_analysis_service import analyze_directory
 
 
 file_analysis_router=APIRouter()
@@ -25,8 +26,32 @@ def get_file_analysis(data: FileContent):
     try:
         # escaped_code = json.dumps( data.code_content) 
         # escaped_code is needed for transmitting as json
-        analysis = generate_file_analysis(data.file_path, data.code_content)
+        analysis = generate_file_analysis(data.file_path, data.code_content, data.mode)
         logger.info(analysis)
         return  analysis
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@file_analysis_router.post("/get-directory-analysis",summary="Static analysis of every file in a directory")
+def get_directory_analysis(data: DirectoryAnalysisRequest):
+    """
+    Run the static rule engine over every Python file under a directory, in a process pool.
+
+    Args:
+        data: DirectoryAnalysisRequest with the directory and optional worker count.
+
+    Returns:
+        Findings and metrics per file, with a summary across the directory.
+
+    Raises:
+        HTTPException: 404 if the directory does not exist, 500 on any other failure.
+    """
+    try:
+        return analyze_directory(data.root_dir, data.max_workers)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
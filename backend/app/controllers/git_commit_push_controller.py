@@ -3,7 +3,7 @@ from fastapi import APIRouter, HTTPException
 from loguru import logger
 
 from models.model import CommitPushMessage
-from services.git_commit_push_service import commit_and_push_file_service
+from services.git_commit_push_service import commit_and_push_file_service, commit_and_push_batch_service
 
 
 commit_push_router=APIRouter() 
@@ -22,7 +22,8 @@ def commit_and_push(data: CommitPushMessage):
         HTTPException: On failure during commit or push.
     """
     try:
-        message = commit_and_push_file_service(data.owner,data.repo,data.commit_message,data.branch,data.base_branch)
+        push = commit_and_push_batch_service if data.single_commit else commit_and_push_file_service
+        message = push(data.owner,data.repo,data.commit_message,data.branch,data.base_branch)
         logger.info(message)
         return  message
     except Exception as e:
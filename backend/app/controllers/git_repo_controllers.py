@@ -1,10 +1,13 @@
 # backend/app/controllers/git_repo_controllers.py
 from fastapi import APIRouter, HTTPException, Query
+from utils.github_client import github_client
 from utils.github_utils import (
     get_owner_and_repo,
     get_github_file_content,
     get_branch_list,
     get_branch_files,
+    download_branch_snapshot,
+    get_snapshot_file_content,
 )
 
 git_api_router = APIRouter()
@@ -64,7 +67,13 @@ def extract_files(owner: str, repo: str, branch: str):
 
 
 @git_api_router.get("/get-github-file-content", summary="Get GitHub File Content")
-def extract_github_file_content(owner: str, repo: str, file_path: str, branch: str = "main"):
+def extract_github_file_content(
+    owner: str,
+    repo: str,
+    file_path: str,
+    branch: str = "main",
+    use_snapshot: bool = False
+):
     """
     Fetch the content of a specific file from a GitHub repository branch.
 
@@ -73,11 +82,47 @@ def extract_github_file_content(owner: str, repo: str, file_path: str, branch: s
         repo: Repository name.
         file_path: Path to the file in the repo.
         branch: Branch name (default is 'main').
+        use_snapshot: Read the file from the local branch snapshot (downloaded once if missing).
 
     Returns:
         Raw content of the file as a string.
     """
     try:
+        if use_snapshot:
+            return get_snapshot_file_content(owner, repo, file_path, branch)
         return get_github_file_content(owner, repo, file_path, branch)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+
+@git_api_router.post("/download-branch-snapshot", summary="Download a branch archive into the local snapshot store")
+def download_snapshot(owner: str, repo: str, branch: str = "main"):
+    """
+    Download the whole branch as one archive so files can be read locally afterwards.
+
+    Args:
+        owner: GitHub username or org.
+        repo: Repository name.
+        branch: Branch name (default is 'main').
+
+    Returns:
+        Dict with the local snapshot directory.
+    """
+    try:
+        return {"snapshot_dir": download_branch_snapshot(owner, repo, branch, refresh=True)}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@git_api_router.get("/github-metrics", summary="GitHub client call counts and latencies")
+def get_github_metrics():
+    """
+    Report how many GitHub calls were made and how long they took, per method and host.
+
+    Returns:
+        Dict of call metrics collected by the shared GitHub client.
+    """
+    return github_client.metrics()
@@ -0,0 +1,188 @@
+# backend/app/controllers/job_controllers.py
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import StreamingResponse
+
+from models.model import RefactorRequest, ReadmeRequest
+from models.dependency_management_models import DependencyRequest
+from services.job_service import job_manager, JobQueueFullError, JobConflictError
+from services.refactor_full_repo_service import refactor_all_python_files_in_repo
+from services.readme_generation_service import generate_readme
+from services.dependency_management_services import generate_dependencies
+
+job_router = APIRouter()
+
+
+def run_refactor_job(**kwargs: Any) -> Dict[str, Any]:
+    """Runs the full-repo refactor and shapes its result like /refactor-python-files."""
+    success, output_dir, logs = refactor_all_python_files_in_repo(**kwargs)
+    return {"success": success, "output_dir": output_dir, "logs": logs}
+
+
+def run_readme_job(**kwargs: Any) -> Dict[str, str]:
+    """Runs README generation and shapes its result like /generate-readme."""
+    return {"status": generate_readme(**kwargs)}
+
+
+def submit_job(kind: str, func, **params: Any) -> Dict[str, str]:
+    """
+    Queues a job and returns its id.
+
+    Raises:
+        HTTPException: 429 if the job queue is full, 409 if another unfinished job uses the same directory.
+    """
+    try:
+        job = job_manager.submit(kind, func, **params)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except JobConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"job_id": job.id, "state": job.state}
+
+
+@job_router.post("/jobs/refactor", summary="Start refactoring a repository in the background")
+def submit_refactor_job(request: RefactorRequest):
+    """
+    Queue a full-repository refactor and return immediately.
+
+    Args:
+        request: RefactorRequest, same as /refactor-python-files.
+
+    Returns:
+        Dict with the job id and its initial state.
+    """
+    return submit_job(
+        "refactor",
+        run_refactor_job,
+        workspace=request.output_dir,
+        owner=request.owner,
+        repo=request.repo,
+        branch=request.branch,
+        all_files=request.files,
+        python_version=request.python_version,
+        output_dir=request.output_dir,
+        max_workers=request.max_workers,
+        incremental=request.incremental,
+        use_snapshot=request.use_snapshot,
+    )
+
+
+@job_router.post("/jobs/readme", summary="Start README generation in the background")
+def submit_readme_job(request: ReadmeRequest):
+    """
+    Queue README generation and return immediately.
+
+    Args:
+        request: ReadmeRequest with root_dir and python_version.
+
+    Returns:
+        Dict with the job id and its initial state.
+    """
+    return submit_job(
+        "readme", run_readme_job, workspace=request.root_dir,
+        root_dir=request.root_dir, python_version=request.python_version
+    )
+
+
+@job_router.post("/jobs/dependencies", summary="Start dependency generation in the background")
+def submit_dependency_job(request: DependencyRequest):
+    """
+    Queue dependency detection and validation and return immediately.
+
+    Args:
+        request: DependencyRequest with root_dir and python_version.
+
+    Returns:
+        Dict with the job id and its initial state.
+    """
+    return submit_job(
+        "dependencies", generate_dependencies, workspace=request.root_dir,
+        root_dir=request.root_dir, python_version=request.python_version,
+        offline=request.offline, resolve_only=request.resolve_only
+    )
+
+
+@job_router.get("/jobs", summary="List background jobs")
+def list_jobs():
+    """
+    List known jobs without their logs.
+
+    Returns:
+        List of job summaries, oldest first.
+    """
+    return [
+        {key: value for key, value in job.to_dict().items() if key not in ("logs", "result")}
+        for job in job_manager.list()
+    ]
+
+
+@job_router.get("/jobs/{job_id}", summary="Get the state, progress, logs and result of a job")
+def get_job(job_id: str, log_offset: int = 0):
+    """
+    Report a job's state, per-file progress, logs and result.
+
+    Args:
+        job_id: Id returned when the job was submitted.
+        log_offset: Skip the first log lines already seen by the client.
+
+    Returns:
+        Job details.
+
+    Raises:
+        HTTPException: 404 if the job does not exist.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return job.to_dict(log_offset=max(0, log_offset))
+
+
+@job_router.get("/jobs/{job_id}/events", summary="Stream a job's progress as Server-Sent Events")
+def stream_job_events(job_id: str, last_event_id: Optional[int] = Header(None)):
+    """
+    Stream a job's per-file events (queued, fetching, llm-chunk, cache-hit, written,
+    failed, ...) with timings as they happen, ending with an 'end' event.
+
+    Events already emitted are replayed first, so clients may connect late;
+    reconnecting browsers resume after the `Last-Event-ID` they send. Streamed
+    code text (llm-delta) is only sent live and is not replayed.
+
+    Args:
+        job_id: Id returned when the job was submitted.
+        last_event_id: Id of the last event the client received.
+
+    Returns:
+        A text/event-stream response.
+
+    Raises:
+        HTTPException: 404 if the job does not exist.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return StreamingResponse(
+        job_manager.stream_events(job, after_id=max(0, last_event_id or 0)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@job_router.post("/jobs/{job_id}/cancel", summary="Cancel a queued or running job")
+def cancel_job(job_id: str):
+    """
+    Cancel a job; running jobs stop before their next file.
+
+    Args:
+        job_id: Id of the job to cancel.
+
+    Returns:
+        Dict with the job id and its state.
+
+    Raises:
+        HTTPException: 404 if the job does not exist.
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
+    return {"job_id": job.id, "state": job.state}
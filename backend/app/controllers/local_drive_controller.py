@@ -1,18 +1,35 @@
 # backend/app/controllers/local_drive_controller.py
-from fastapi import APIRouter, HTTPException
+import os
+import mimetypes
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from models.model import FileWriteRequest
 from services.local_drive_service import (
     get_all_refactored_files,
     write_all_refactored_files,
+    list_refactored_page,
+    resolve_refactored_path,
+    parse_byte_range,
+    iter_file_range,
+    RangeNotSatisfiableError,
 )
 
 local_drive_router = APIRouter()
 
-@local_drive_router.get("/get-refactored-content",summary="Get content from local drive")
+@local_drive_router.get(
+    "/get-refactored-content",
+    summary="Get content from local drive",
+    deprecated=True,
+)
 def get_refactored_files():
     """
     Retrieve all refactored files from the local drive.
 
+    Loads every file into one response; prefer /refactored-files and
+    /refactored-files/{file_path} for large repositories.
+
     Returns:
         A dictionary with file paths and their contents.
 
@@ -47,4 +64,75 @@ def write_refactored_files(request: FileWriteRequest):
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+@local_drive_router.get("/refactored-files", summary="List refactored files with their metadata")
+def list_refactored_files_page(
+    pattern: Optional[str] = Query(None, description="Glob matched against the relative path, e.g. '*.py'"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+    List one page of the refactored files, without their contents.
+
+    Args:
+        pattern: Optional glob filter on the relative path.
+        offset: Number of matching files to skip.
+        limit: Page size.
+
+    Returns:
+        Total number of matching files and the page's paths, sizes, mtimes and SHA-256 hashes.
+
+    Raises:
+        HTTPException: If the directory is missing or an unexpected error occurs.
+    """
+    try:
+        page = list_refactored_page(pattern=pattern, offset=offset, limit=limit)
+        return {"status": "success", **page}
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+
+@local_drive_router.get("/refactored-files/{file_path:path}", summary="Get the content of one refactored file")
+def get_refactored_file(file_path: str, range: Optional[str] = Header(None)):
+    """
+    Stream the raw bytes of one refactored file, honouring a single-range `Range` header.
+
+    Args:
+        file_path: Path relative to the refactored repository.
+        range: Optional Range header, e.g. "bytes=0-65535".
+
+    Returns:
+        The file (200) or the requested part of it (206), streamed in blocks.
+
+    Raises:
+        HTTPException: 400 for paths outside the repository, 404 if the file is
+            missing, 416 if the range does not overlap the file.
+    """
+    try:
+        full_path = resolve_refactored_path(file_path)
+        size = os.path.getsize(full_path)
+        byte_range = parse_byte_range(range, size)
+    except RangeNotSatisfiableError as e:
+        raise HTTPException(status_code=416, detail=str(e), headers={"Content-Range": f"bytes */{size}"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
+
+    start, end = byte_range or (0, size - 1)
+    headers = {"Accept-Ranges": "bytes", "Content-Length": str(end - start + 1)}
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+    return StreamingResponse(
+        iter_file_range(full_path, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=media_type,
+        headers=headers,
+    )
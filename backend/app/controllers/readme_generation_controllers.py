@@ -5,7 +5,7 @@ from services.readme_generation_service import generate_readme
 readme_router = APIRouter()
 
 @readme_router.get("/generate-readme", summary="Generate README.md from Python files in a repo")
-async def generate_readme_controller(
+def generate_readme_controller(
     root_dir: str = Query(default="temp_refactored_repo", description="Path to the root directory of the repo"),
     python_version: str = Query(default="3.12", description="Python version used in the repo")
 ):
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException
 from models.model import RefactorRequest
 from services.refactor_full_repo_service import refactor_all_python_files_in_repo
+from utils.llm_utils.llm_scheduler import llm_scheduler
+from utils.llm_utils.prompt_packing import token_usage
+from utils.llm_utils.token_counter import token_counter
 
 refactor_api_router = APIRouter()
 
@@ -25,7 +28,10 @@ def refactor_python_files(request: RefactorRequest):
             branch=request.branch,
             all_files=request.files,
             python_version=request.python_version,
-            output_dir=request.output_dir
+            output_dir=request.output_dir,
+            max_workers=request.max_workers,
+            incremental=request.incremental,
+            use_snapshot=request.use_snapshot
         )
         return {
             "success": success,
@@ -34,3 +40,16 @@ def refactor_python_files(request: RefactorRequest):
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@refactor_api_router.get("/llm-metrics", summary="LLM key budgets and token usage")
+def get_llm_metrics():
+    """
+    Report per-key rate-limit usage, LLM token counts per purpose (including
+    the prompt tokens saved compared to the old chunk-by-chunk conversation)
+    and the tokenizer in use.
+
+    Returns:
+        Dict with 'keys' (scheduler stats), 'tokens' (usage per purpose) and 'tokenizer'.
+    """
+    return {"keys": llm_scheduler.stats(), "tokens": token_usage.stats(), "tokenizer": token_counter.stats()}
@@ -0,0 +1,296 @@
+"""
+In-memory stand-in for the parts of GitHub this backend talks to.
+
+Serves the REST endpoints used by utils/github_utils.py and the commit/PR
+services (branches, trees, refs, blobs, commits, contents, pulls) plus the raw
+file and tarball hosts, all on one local port. Point the backend at it with
+GITHUB_API_URL, GITHUB_RAW_URL and GITHUB_ARCHIVE_URL.
+
+Usage (from the backend/app folder):
+    python -m devtools.fake_github_server --port 8765
+"""
+import io
+import json
+import base64
+import hashlib
+import argparse
+import tarfile
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.github_utils import git_blob_sha
+
+
+class FakeRepo:
+    """Branches, commits, flat trees and blobs of one fake repository."""
+
+    def __init__(self):
+        self.blobs: Dict[str, bytes] = {}
+        self.trees: Dict[str, Dict[str, str]] = {}
+        # Tree SHA -> path -> mode, for the entries that are not regular files
+        self.tree_modes: Dict[str, Dict[str, str]] = {}
+        self.commits: Dict[str, Dict[str, Any]] = {}
+        self.branches: Dict[str, str] = {}
+        self.pulls: list = []
+
+    def add_blob(self, data: bytes) -> str:
+        sha = git_blob_sha(data)
+        self.blobs[sha] = data
+        return sha
+
+    def add_tree(self, entries: Dict[str, str], modes: Optional[Dict[str, str]] = None) -> str:
+        modes = {path: mode for path, mode in (modes or {}).items() if path in entries and mode != "100644"}
+        sha = hashlib.sha1(json.dumps([sorted(entries.items()), sorted(modes.items())]).encode()).hexdigest()
+        self.trees[sha] = dict(entries)
+        self.tree_modes[sha] = modes
+        return sha
+
+    def add_commit(self, tree: str, parents: list, message: str) -> str:
+        payload = json.dumps({"tree": tree, "parents": parents, "message": message, "n": len(self.commits)})
+        sha = hashlib.sha1(payload.encode()).hexdigest()
+        self.commits[sha] = {"tree": tree, "parents": parents, "message": message}
+        return sha
+
+    def has_ref(self, ref: str) -> bool:
+        return ref in self.branches or ref in self.commits
+
+    def branch_files(self, branch: str) -> Dict[str, str]:
+        """Files of a branch, or of a commit when given its SHA."""
+        return self.trees[self.commits[self.branches.get(branch, branch)]["tree"]]
+
+    def branch_modes(self, branch: str) -> Dict[str, str]:
+        tree = self.commits[self.branches.get(branch, branch)]["tree"]
+        return {path: self.tree_modes[tree].get(path, "100644") for path in self.trees[tree]}
+
+
+class FakeGitHubServer:
+    """
+    Threaded local HTTP server emulating GitHub.
+
+    Use as a context manager; `url` is the base URL for the API, raw and archive hosts.
+    `requests` counts calls per "METHOD endpoint" for benchmarks and assertions.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.repos: Dict[Tuple[str, str], FakeRepo] = {}
+        self.requests: Counter = Counter()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def add_repo(
+        self, owner: str, repo: str, files: Dict[str, bytes], branch: str = "main", modes: Optional[Dict[str, str]] = None
+    ) -> FakeRepo:
+        """Creates a repository whose branch has a single commit holding `files`."""
+        fake = FakeRepo()
+        tree = fake.add_tree({path: fake.add_blob(data) for path, data in files.items()}, modes)
+        fake.branches[branch] = fake.add_commit(tree, [], "Initial commit")
+        self.repos[(owner, repo)] = fake
+        return fake
+
+    def start(self) -> "FakeGitHubServer":
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "FakeGitHubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PUT(self):
+                self._dispatch("PUT")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def _send(self, status: int, body: Any = None, raw: Optional[bytes] = None, content_type: str = "application/json"):
+                data = raw if raw is not None else json.dumps(body if body is not None else {}).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> Dict[str, Any]:
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length) or b"{}") if length else {}
+
+            def _dispatch(self, method: str):
+                parsed = urlparse(self.path)
+                parts = [unquote(p) for p in parsed.path.strip("/").split("/")]
+                query = parse_qs(parsed.query)
+                body = self._body() if method != "GET" else {}
+                with server.lock:
+                    try:
+                        if parts[0] == "repos":
+                            endpoint, status, payload = server._api(method, parts[1:], query, body)
+                            server.requests[f"{method} {endpoint}"] += 1
+                            return self._send(status, payload)
+                        if len(parts) >= 4 and parts[2] == "tar.gz":
+                            server.requests["GET archive"] += 1
+                            status, data = server._archive(parts[0], parts[1], "/".join(parts[3:]))
+                            return self._send(status, raw=data, content_type="application/x-gzip")
+                        server.requests["GET raw"] += 1
+                        status, data = server._raw(parts)
+                        return self._send(status, raw=data, content_type="text/plain; charset=utf-8")
+                    except KeyError as e:
+                        return self._send(404, {"message": f"Not Found: {e}"})
+
+        return Handler
+
+    def _api(self, method: str, parts: list, query: Dict[str, list], body: Dict[str, Any]) -> Tuple[str, int, Any]:
+        owner, repo_name, rest = parts[0], parts[1], parts[2:]
+        repo = self.repos[(owner, repo_name)]
+        route = "/".join(rest)
+
+        if method == "GET" and route == "branches":
+            return "branches", 200, [{"name": name, "commit": {"sha": sha}} for name, sha in repo.branches.items()]
+
+        if method == "GET" and route.startswith("git/trees/"):
+            ref = route[len("git/trees/"):]
+            tree_sha = repo.commits[repo.branches.get(ref, ref)]["tree"] if repo.has_ref(ref) else ref
+            entries, modes = repo.trees[tree_sha], repo.tree_modes[tree_sha]
+            tree = [
+                {"path": path, "type": "blob", "mode": modes.get(path, "100644"), "sha": sha}
+                for path, sha in sorted(entries.items())
+            ]
+            return "git/trees", 200, {"sha": tree_sha, "tree": tree, "truncated": False}
+
+        if method == "GET" and route.startswith("git/ref/heads/"):
+            branch = route[len("git/ref/heads/"):]
+            return "git/ref", 200, {"ref": f"refs/heads/{branch}", "object": {"sha": repo.branches[branch], "type": "commit"}}
+
+        if method == "POST" and route == "git/refs":
+            branch = body["ref"][len("refs/heads/"):]
+            if branch in repo.branches:
+                return "git/refs", 422, {"message": "Reference already exists"}
+            repo.branches[branch] = body["sha"]
+            return "git/refs", 201, {"ref": body["ref"], "object": {"sha": body["sha"]}}
+
+        if method == "PATCH" and route.startswith("git/refs/heads/"):
+            branch = route[len("git/refs/heads/"):]
+            current = repo.branches[branch]
+            if not body.get("force") and current not in repo.commits[body["sha"]]["parents"]:
+                return "git/refs", 422, {"message": "Update is not a fast forward"}
+            repo.branches[branch] = body["sha"]
+            return "git/refs", 200, {"ref": f"refs/heads/{branch}", "object": {"sha": body["sha"]}}
+
+        if method == "POST" and route == "git/blobs":
+            content = body["content"]
+            data = base64.b64decode(content) if body.get("encoding") == "base64" else content.encode()
+            return "git/blobs", 201, {"sha": repo.add_blob(data)}
+
+        if method == "GET" and route.startswith("git/commits/"):
+            sha = route[len("git/commits/"):]
+            commit = repo.commits[sha]
+            return "git/commits", 200, {
+                "sha": sha,
+                "tree": {"sha": commit["tree"]},
+                "parents": [{"sha": p} for p in commit["parents"]],
+                "message": commit["message"],
+            }
+
+        if method == "POST" and route == "git/trees":
+            entries = dict(repo.trees[body["base_tree"]]) if body.get("base_tree") else {}
+            modes = dict(repo.tree_modes[body["base_tree"]]) if body.get("base_tree") else {}
+            for item in body["tree"]:
+                if item.get("sha") is None:
+                    entries.pop(item["path"], None)
+                else:
+                    entries[item["path"]] = item["sha"]
+                    modes[item["path"]] = item["mode"]
+            return "git/trees", 201, {"sha": repo.add_tree(entries, modes)}
+
+        if method == "POST" and route == "git/commits":
+            return "git/commits", 201, {"sha": repo.add_commit(body["tree"], body.get("parents", []), body["message"])}
+
+        if route.startswith("contents/"):
+            path = route[len("contents/"):]
+            if method == "GET":
+                branch = query.get("ref", ["main"])[0]
+                sha = repo.branch_files(branch).get(path)
+                if sha is None:
+                    return "contents", 404, {"message": "Not Found"}
+                return "contents", 200, {"path": path, "sha": sha}
+            if method == "PUT":
+                branch = body["branch"]
+                entries = dict(repo.branch_files(branch))
+                if path in entries and body.get("sha") != entries[path]:
+                    return "contents", 409, {"message": "sha does not match"}
+                entries[path] = repo.add_blob(base64.b64decode(body["content"]))
+                tree = repo.add_tree(entries, repo.branch_modes(branch))
+                repo.branches[branch] = repo.add_commit(tree, [repo.branches[branch]], body["message"])
+                return "contents", 201 if body.get("sha") is None else 200, {"content": {"sha": entries[path]}}
+
+        if method == "POST" and route == "pulls":
+            if any(p["head"] == body["head"] and p["base"] == body["base"] for p in repo.pulls):
+                return "pulls", 422, {"message": "A pull request already exists"}
+            repo.pulls.append(body)
+            return "pulls", 201, {"html_url": f"{self.url}/{owner}/{repo_name}/pull/{len(repo.pulls)}"}
+
+        return route, 404, {"message": "Not Found"}
+
+    def _raw(self, parts: list) -> Tuple[int, bytes]:
+        owner, repo_name, branch, path = parts[0], parts[1], parts[2], "/".join(parts[3:])
+        repo = self.repos.get((owner, repo_name))
+        if repo is None or not repo.has_ref(branch) or path not in repo.branch_files(branch):
+            return 404, b"404: Not Found"
+        return 200, repo.blobs[repo.branch_files(branch)[path]]
+
+    def _archive(self, owner: str, repo_name: str, branch: str) -> Tuple[int, bytes]:
+        repo = self.repos.get((owner, repo_name))
+        if repo is None or not repo.has_ref(branch):
+            return 404, b"404: Not Found"
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+            for path, sha in sorted(repo.branch_files(branch).items()):
+                data = repo.blobs[sha]
+                info = tarfile.TarInfo(f"{repo_name}-{branch}/{path}")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return 200, buffer.getvalue()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--owner", default="owner")
+    parser.add_argument("--repo", default="repo")
+    args = parser.parse_args()
+
+    server = FakeGitHubServer(port=args.port)
+    server.add_repo(args.owner, args.repo, {"README.md": b"# Fake repo\n", "main.py": b"print('hello')\n"})
+    print(f"Fake GitHub serving {args.owner}/{args.repo} on {server.url}")
+    server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
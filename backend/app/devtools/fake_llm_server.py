@@ -0,0 +1,522 @@
+"""
+Local stand-in for the Groq chat-completions API, for offline runs and load tests.
+
+Speaks the OpenAI-compatible `/openai/v1/chat/completions` endpoint the Groq
+SDK uses. Replies are synthetic by default: refactor prompts get their code
+echoed back, package prompts get the imported third-party modules, and every
+other prompt gets a short deterministic description. Latency (base delay,
+log-normal jitter and generation speed), per-key RPM/TPM limits and injected
+rate-limit errors can be configured; 429 responses carry the same headers
+and message format as Groq's. Streamed requests get server-sent chunks
+paced at the configured generation speed.
+
+A record mode forwards requests to a real endpoint and stores the replies;
+a replay mode serves them back for deterministic runs with no network.
+
+Usage (from the backend/app folder):
+    python -m devtools.fake_llm_server --port 8766 --latency 0.4 --tokens-per-second 250 --tpm-limit 12000
+    GROQ_BASE_URL=http://127.0.0.1:8766 GROQ_API_KEY=fake GROQ_MODEL=fake-model uvicorn main:app
+
+    python -m devtools.fake_llm_server --upstream https://api.groq.com --record llm_recording.jsonl
+    python -m devtools.fake_llm_server --replay llm_recording.jsonl
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from utils.llm_utils.token_counter import count_tokens, CHARS_PER_TOKEN, MESSAGE_OVERHEAD_TOKENS
+
+WINDOW_SECONDS = 60.0
+# Characters of reply sent per streamed chunk (a few tokens, like the real API)
+STREAM_PIECE_CHARS = 16
+_CODE_BLOCK = re.compile(r"```(?:python)?\n(.*?)```", re.DOTALL)
+_IMPORT = re.compile(r"^\s*(?:from\s+([A-Za-z_]\w*)[\w.]*\s+import|import\s+([A-Za-z_][\w., ]*))", re.MULTILINE)
+_DEFINITION = re.compile(r"^\s*(?:async\s+)?(?:def|class)\s+(\w+)", re.MULTILINE)
+_PACKAGE_NAME = re.compile(r"^[A-Za-z][A-Za-z0-9_.\-]*$")
+
+
+def format_duration(seconds: float) -> str:
+    """Formats seconds the way Groq does in rate-limit headers and messages, e.g. '7.66s' or '2m59.56s'."""
+    minutes, rest = divmod(max(seconds, 0.0), 60)
+    return f"{int(minutes)}m{rest:.2f}s" if minutes else f"{rest:.2f}s"
+
+
+def _imported_packages(code: str) -> List[str]:
+    names = []
+    for from_module, modules in _IMPORT.findall(code):
+        candidates = [from_module] if from_module else [m.split()[0].split(".")[0] for m in modules.split(",") if m.strip()]
+        names.extend(n for n in candidates if n not in sys.stdlib_module_names and n != "__future__")
+    return list(dict.fromkeys(names))
+
+
+def synthetic_reply(messages: List[Dict[str, Any]]) -> str:
+    """
+    Builds a deterministic reply for a chat request, shaped like what the backend's prompts expect.
+
+    Args:
+        messages: OpenAI-style messages ({"role", "content"}).
+
+    Returns:
+        Reply text: a fenced copy of the code for refactor prompts, a package list for
+        dependency prompts, a short README for README prompts, and a one-line description otherwise.
+    """
+    system = " ".join(m.get("content") or "" for m in messages if m.get("role") == "system").lower()
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    blocks = _CODE_BLOCK.findall(user)
+    code = blocks[-1] if blocks else ""
+
+    if "refactor" in system:
+        return f"```python\n{code.rstrip()}\n```"
+    if "packages manager" in system:
+        return "\n".join(_imported_packages(code))
+    if "dependency cleaner" in system:
+        lines = (line.strip() for line in user.splitlines())
+        return "\n".join(dict.fromkeys(line for line in lines if _PACKAGE_NAME.match(line)))
+    if "readme" in system:
+        return "# Project\n\n## Overview\n\nGenerated offline by the fake LLM server.\n\n## Getting Started\n\n```bash\npip install -r requirements.txt\n```\n"
+
+    names = _DEFINITION.findall(code)
+    lines = len(code.splitlines()) or len(user.splitlines())
+    return f"The code ({lines} lines) defines {', '.join(names) if names else 'no functions or classes'}."
+
+
+class RawBody(NamedTuple):
+    """An upstream reply that is not JSON (e.g. a proxy's HTML error page), sent back unchanged."""
+    data: bytes
+    content_type: str
+
+
+class ReplayStore:
+    """Recorded chat responses, keyed by the request messages and stored as JSON lines."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.responses: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.responses[entry["key"]] = entry["response"]
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def key(body: Dict[str, Any]) -> str:
+        """Request key: only the messages count, so replays survive model or max_tokens changes."""
+        messages = [[m.get("role"), m.get("content")] for m in body.get("messages", [])]
+        return hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.responses.get(key)
+
+    def add(self, key: str, response: Dict[str, Any]) -> None:
+        with self._lock:
+            self.responses[key] = response
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"key": key, "response": response}, ensure_ascii=False) + "\n")
+
+
+class FakeLLMServer:
+    """
+    Threaded local HTTP server emulating Groq chat completions.
+
+    Use as a context manager; `url` is the value for GROQ_BASE_URL.
+    `requests` counts calls, rate-limited calls, replays and tokens for benchmarks and assertions.
+
+    Args:
+        latency: Base seconds before a reply starts.
+        latency_jitter: Sigma of a log-normal factor applied to `latency` (0 for a fixed delay).
+        tokens_per_second: Generation speed; adds completion_tokens / tokens_per_second to each reply (0 for instant).
+        rpm_limit: Requests per minute allowed per API key (0 for no limit).
+        tpm_limit: Tokens per minute allowed per API key (0 for no limit).
+        rate_limit_every: Answer every n-th request with a 429 (0 to disable).
+        rate_limit_probability: Chance of answering any request with a 429.
+        retry_after: Seconds reported by injected 429s.
+        upstream: Real API base URL to forward to when recording.
+        record_path: JSON-lines file that forwarded replies are appended to.
+        replay_path: JSON-lines file of recorded replies to serve instead of synthetic ones.
+        seed: Seed for the jitter and the injected errors.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        latency_jitter: float = 0.0,
+        tokens_per_second: float = 0.0,
+        rpm_limit: int = 0,
+        tpm_limit: int = 0,
+        rate_limit_every: int = 0,
+        rate_limit_probability: float = 0.0,
+        retry_after: float = 1.0,
+        upstream: Optional[str] = None,
+        record_path: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        seed: int = 0
+    ):
+        if record_path and not upstream:
+            raise ValueError("Recording needs an upstream URL to forward requests to.")
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.tokens_per_second = tokens_per_second
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.rate_limit_every = rate_limit_every
+        self.rate_limit_probability = rate_limit_probability
+        self.retry_after = retry_after
+        self.upstream = upstream
+        self.recorder = ReplayStore(record_path) if record_path else None
+        self.replay = ReplayStore(replay_path) if replay_path else None
+        self.responder: Callable[[List[Dict[str, Any]]], str] = synthetic_reply
+
+        self.requests: Counter = Counter()
+        self.lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._windows: Dict[str, Deque[List[float]]] = {}
+        self._http = httpx.Client(base_url=upstream, timeout=600.0) if upstream else None
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_port}"
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._http is not None:
+            self._http.close()
+
+    def __enter__(self) -> "FakeLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+                raw = isinstance(body, RawBody)
+                data = body.data if raw else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", body.content_type if raw else "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if self.path.rstrip("/").endswith("/models"):
+                    return self._send(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+                self._send(404, _error("Unknown path", "invalid_request_error", "not_found"))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    return self._send(400, _error("Request body is not valid JSON", "invalid_request_error", "bad_request"))
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send(404, _error("Unknown path", "invalid_request_error", "not_found"))
+
+                api_key = (self.headers.get("Authorization") or "").removeprefix("Bearer ").strip()
+                status, payload, headers, delay = server._complete(api_key, body, self.headers.get("Authorization"))
+                if delay > 0:
+                    time.sleep(delay)
+                if status == 200 and body.get("stream") and not isinstance(payload, RawBody):
+                    return self._stream(payload, headers)
+                self._send(status, payload, headers)
+
+            def _stream(self, response: Dict[str, Any], headers: Dict[str, str]):
+                """Sends a reply as server-sent chat.completion.chunk events, paced at the configured speed."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.close_connection = True
+                start, sent_chars = time.monotonic(), 0
+                try:
+                    for chunk in stream_chunks(response):
+                        sent_chars += len(chunk["choices"][0]["delta"].get("content") or "")
+                        if server.tokens_per_second > 0:
+                            # Paced against the start time, so sleep overshoot does not add up
+                            remaining = start + sent_chars / CHARS_PER_TOKEN / server.tokens_per_second - time.monotonic()
+                            if remaining > 0:
+                                time.sleep(remaining)
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    with server.lock:
+                        server.requests["stream_aborted"] += 1
+
+        return Handler
+
+    def _complete(self, api_key: str, body: Dict[str, Any], authorization: Optional[str]) -> Tuple[int, Any, Dict[str, str], float]:
+        """
+        Answers one chat request.
+
+        Returns:
+            (status, JSON body, headers, seconds to wait before sending). Streamed replies
+            only wait for the first token here; generation time is spread over the chunks.
+        """
+        if self.recorder is not None:
+            return self._forward(body, authorization)
+
+        model = body.get("model") or "fake-model"
+        messages = body.get("messages") or []
+        prompt_tokens = sum(count_tokens(str(m.get("content") or "")) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+        if self.replay is not None:
+            recorded = self.replay.get(ReplayStore.key(body))
+            if recorded is None:
+                with self.lock:
+                    self.requests["replay_miss"] += 1
+                return 404, _error("No recorded response for this request", "invalid_request_error", "replay_miss"), {}, 0.0
+            response = recorded
+            completion_tokens = (recorded.get("usage") or {}).get("completion_tokens", 0)
+        else:
+            response, completion_tokens = self._synthetic_response(model, messages, prompt_tokens, body.get("max_tokens"))
+
+        with self.lock:
+            self.requests["chat/completions"] += 1
+            limited = self._rate_limit(api_key, model, prompt_tokens + completion_tokens)
+            if limited is not None:
+                self.requests["rate_limited"] += 1
+                return 429, limited[0], limited[1], 0.0
+            self.requests["replayed" if self.replay is not None else "completed"] += 1
+            self.requests["prompt_tokens"] += prompt_tokens
+            self.requests["completion_tokens"] += completion_tokens
+            headers = self._limit_headers(api_key)
+            delay = self.latency * (self._random.lognormvariate(0, self.latency_jitter) if self.latency_jitter else 1.0)
+        if self.tokens_per_second > 0 and not body.get("stream"):
+            delay += completion_tokens / self.tokens_per_second
+        return 200, response, headers, delay
+
+    def _synthetic_response(self, model: str, messages: List[Dict[str, Any]], prompt_tokens: int, max_tokens: Optional[int]) -> Tuple[Dict[str, Any], int]:
+        content = self.responder(messages)
+        completion_tokens = count_tokens(content)
+        finish_reason = "stop"
+        if max_tokens and completion_tokens > max_tokens:
+            # Cut the reply at the limit, like a real model that runs out of output tokens
+            content = content[:max_tokens * 4]
+            completion_tokens = count_tokens(content)
+            finish_reason = "length"
+
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:24]
+        return {
+            "id": f"chatcmpl-{digest}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "logprobs": None,
+                "finish_reason": finish_reason,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+            "system_fingerprint": "fp_fake",
+            "x_groq": {"id": f"req_{digest}"},
+        }, completion_tokens
+
+    def _rate_limit(self, api_key: str, model: str, tokens: int) -> Optional[Tuple[Dict[str, Any], Dict[str, str]]]:
+        """Records the call in the key's window, or returns a Groq-style 429 (body, headers). Caller holds the lock."""
+        now = time.monotonic()
+        window = self._windows.setdefault(api_key, deque())
+        while window and window[0][0] <= now - WINDOW_SECONDS:
+            window.popleft()
+        used = int(sum(t for _, t in window))
+        number = self.requests["chat/completions"]
+
+        limit_type, limit, wait = None, 0, 0.0
+        if (self.rate_limit_every and number % self.rate_limit_every == 0) or self._random.random() < self.rate_limit_probability:
+            limit_type, limit, wait = "tokens", self.tpm_limit or used + tokens, self.retry_after
+        elif self.rpm_limit and len(window) >= self.rpm_limit:
+            limit_type, limit, wait = "requests", self.rpm_limit, window[0][0] + WINDOW_SECONDS - now
+        elif self.tpm_limit and window and used + tokens > self.tpm_limit:
+            freed = 0.0
+            for start, spent in window:
+                freed += spent
+                if used - freed + tokens <= self.tpm_limit:
+                    break
+            limit_type, limit, wait = "tokens", self.tpm_limit, start + WINDOW_SECONDS - now
+
+        if limit_type is None:
+            window.append([now, float(tokens)])
+            return None
+
+        unit = "tokens per minute (TPM)" if limit_type == "tokens" else "requests per minute (RPM)"
+        used_now = used if limit_type == "tokens" else len(window)
+        requested = tokens if limit_type == "tokens" else 1
+        message = (
+            f"Rate limit reached for model `{model}` in organization `org_fake` service tier `on_demand` on {unit}: "
+            f"Limit {limit}, Used {used_now}, Requested {requested}. Please try again in {format_duration(wait)}. "
+            f"Need more tokens? Upgrade to Dev Tier today at https://console.groq.com/settings/billing"
+        )
+        headers = {"retry-after": str(max(1, math.ceil(wait))), **self._limit_headers(api_key)}
+        headers[f"x-ratelimit-reset-{limit_type}"] = format_duration(wait)
+        return _error(message, limit_type, "rate_limit_exceeded"), headers
+
+    def _limit_headers(self, api_key: str) -> Dict[str, str]:
+        """x-ratelimit-* headers for the configured limits. Caller holds the lock."""
+        window = self._windows.get(api_key) or deque()
+        now = time.monotonic()
+        reset = format_duration(window[0][0] + WINDOW_SECONDS - now) if window else "0.00s"
+        headers = {}
+        if self.rpm_limit:
+            headers.update({
+                "x-ratelimit-limit-requests": str(self.rpm_limit),
+                "x-ratelimit-remaining-requests": str(max(0, self.rpm_limit - len(window))),
+                "x-ratelimit-reset-requests": reset,
+            })
+        if self.tpm_limit:
+            headers.update({
+                "x-ratelimit-limit-tokens": str(self.tpm_limit),
+                "x-ratelimit-remaining-tokens": str(max(0, self.tpm_limit - int(sum(t for _, t in window)))),
+                "x-ratelimit-reset-tokens": reset,
+            })
+        return headers
+
+    def _forward(self, body: Dict[str, Any], authorization: Optional[str]) -> Tuple[int, Any, Dict[str, str], float]:
+        """
+        Sends the request to the upstream API and records successful replies.
+
+        Replies that are not JSON are passed through with their status and body
+        unchanged, so upstream errors stay visible to the client.
+        """
+        upstream = self._http.post(
+            "/openai/v1/chat/completions",
+            # Recorded as a whole reply; streamed back to the client in chunks if it asked for a stream
+            json={**body, "stream": False},
+            headers={"Authorization": authorization or ""},
+        )
+        headers = {
+            name: value for name, value in upstream.headers.items()
+            if name.lower().startswith("x-ratelimit-") or name.lower() == "retry-after"
+        }
+        try:
+            payload = upstream.json()
+        except ValueError:
+            payload = RawBody(upstream.content, upstream.headers.get("content-type", "application/octet-stream"))
+        recorded = upstream.status_code == 200 and not isinstance(payload, RawBody)
+        with self.lock:
+            self.requests["chat/completions"] += 1
+            if recorded:
+                self.requests["recorded"] += 1
+            elif upstream.status_code == 429:
+                self.requests["rate_limited"] += 1
+        if recorded:
+            self.recorder.add(ReplayStore.key(body), payload)
+        return upstream.status_code, payload, headers, 0.0
+
+
+def stream_chunks(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Splits a chat.completion response into the chat.completion.chunk events of a streamed reply.
+
+    Args:
+        response: Complete (synthetic or recorded) chat.completion body.
+
+    Returns:
+        A role chunk, one chunk per few tokens of content, and a final chunk with the
+        finish reason and, like Groq, the usage under `x_groq`.
+    """
+    choice = response["choices"][0]
+    content = choice["message"].get("content") or ""
+    base = {
+        "id": response.get("id"),
+        "object": "chat.completion.chunk",
+        "created": response.get("created"),
+        "model": response.get("model"),
+        "system_fingerprint": response.get("system_fingerprint"),
+    }
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> Dict[str, Any]:
+        return {**base, "choices": [{"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}]}
+
+    chunks = [chunk({"role": "assistant", "content": ""})]
+    chunks.extend(chunk({"content": content[i:i + STREAM_PIECE_CHARS]}) for i in range(0, len(content), STREAM_PIECE_CHARS))
+    last = chunk({}, choice.get("finish_reason") or "stop")
+    last["x_groq"] = {"id": (response.get("x_groq") or {}).get("id"), "usage": response.get("usage")}
+    chunks.append(last)
+    return chunks
+
+
+def _error(message: str, error_type: str, code: str) -> Dict[str, Any]:
+    return {"error": {"message": message, "type": error_type, "code": code}}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="Base seconds before each reply")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="Log-normal sigma applied to the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Generation speed (0 for instant)")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Requests per minute per API key")
+    parser.add_argument("--tpm-limit", type=int, default=0, help="Tokens per minute per API key")
+    parser.add_argument("--rate-limit-every", type=int, default=0, help="Answer every n-th request with a 429")
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0, help="Chance of a 429 on any request")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Seconds reported by injected 429s")
+    parser.add_argument("--upstream", help="Real API base URL, e.g. https://api.groq.com (with --record)")
+    parser.add_argument("--record", help="Append forwarded replies to this JSON-lines file")
+    parser.add_argument("--replay", help="Serve recorded replies from this JSON-lines file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        port=args.port,
+        latency=args.latency,
+        latency_jitter=args.latency_jitter,
+        tokens_per_second=args.tokens_per_second,
+        rpm_limit=args.rpm_limit,
+        tpm_limit=args.tpm_limit,
+        rate_limit_every=args.rate_limit_every,
+        rate_limit_probability=args.rate_limit_probability,
+        retry_after=args.retry_after,
+        upstream=args.upstream,
+        record_path=args.record,
+        replay_path=args.replay,
+        seed=args.seed,
+    )
+    print(f"Fake LLM serving on {server.url}; set GROQ_BASE_URL={server.url}")
+    server.httpd.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ from controllers.dependency_management_controllers import dependency_router
 from controllers.file_analysis_controller import file_analysis_router
 from controllers.git_commit_push_controller import commit_push_router
 from controllers.git_pr_controller import git_pr_router
+from controllers.job_controllers import job_router
 
 app = FastAPI()
 
@@ -30,4 +31,5 @@ app.include_router(dependency_router, prefix="/code-agent-api")
 app.include_router(file_analysis_router,prefix="/code-agent-api")
 app.include_router(commit_push_router,prefix="/code-agent-api")
 app.include_router(git_pr_router,prefix="/code-agent-api")
+app.include_router(job_router,prefix="/code-agent-api")
 
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
 class DependencyRequest(BaseModel):
     root_dir: str = "temp_refactored_repo"
-    python_version: str = "3.12"
\ No newline at end of file
+    python_version: str = "3.12"
+    offline: bool = Field(default=False, description="Install only from the local wheelhouse, without the package index or the LLM")
+    resolve_only: bool = Field(default=False, description="Resolve and pin the packages without installing them")
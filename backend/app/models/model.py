@@ -1,5 +1,5 @@
 from pydantic import BaseModel,Field, field_validator
-from typing import List, Optional 
+from typing import List, Literal, Optional 
 
 class RefactorRequest(BaseModel):
     owner: str
@@ -8,6 +8,9 @@ class RefactorRequest(BaseModel):
     files: List[str]
     python_version: str
     output_dir: Optional[str] = "temp_refactored_repo"
+    max_workers: int = Field(default=4, ge=1, le=32, description="Number of files refactored concurrently")
+    incremental: bool = Field(default=False, description="Only refactor files changed since the previous run in output_dir")
+    use_snapshot: bool = Field(default=False, description="Download the branch once as an archive instead of one request per file")
 
 
 class CodeDiffRequest(BaseModel):
@@ -18,6 +21,15 @@ class CodeDiffRequest(BaseModel):
 class FileContent(BaseModel):
     code_content:str
     file_path:str
+    mode: Literal["static", "hybrid", "llm"] = Field(
+        default="hybrid",
+        description="static: rule engine only; hybrid: rule engine, then the LLM for the remaining issues; llm: LLM only",
+    )
+
+
+class DirectoryAnalysisRequest(BaseModel):
+    root_dir: str = "temp_refactored_repo"
+    max_workers: Optional[int] = Field(default=None, ge=1, le=64, description="Worker processes for the static analysis")
 
 
 class CommitPushMessage(BaseModel):
@@ -26,6 +38,7 @@ class CommitPushMessage(BaseModel):
     commit_message: str
     branch: str = "auto-refactored-branch"
     base_branch: str = "main"
+    single_commit: bool = Field(default=False, description="Push every file in one commit through the Git Data API")
 
     @field_validator("branch", "base_branch", mode="before")
     @classmethod
@@ -56,10 +69,7 @@ class FileWriteRequest(BaseModel):
     file_name: str
     content: str
 
-class RefactorRequest(BaseModel):
-    owner: str
-    repo: str
-    branch: str
-    files: List[str]
-    python_version: str
-    output_dir: Optional[str] = "temp_refactored_repo"
\ No newline at end of file
+
+class ReadmeRequest(BaseModel):
+    root_dir: str = "temp_refactored_repo"
+    python_version: str = "3.12"
@@ -1,13 +1,20 @@
 import os
 import sys 
 import re
-import tempfile
 import shutil
-import subprocess
-from typing import List, Dict, Union
-from utils.llm_utils.dependency_generation_prompt import get_packages, merge_packages
+import threading
+from typing import Any, Callable, List, Dict, Optional, Union
+from dotenv import load_dotenv
+from utils.import_scanner import scan_imports, third_party_imports, resolve_distribution
+from utils.llm_utils.dependency_generation_prompt import get_distributions
+from utils.venv_cache import get_environment, resolve_requirements, DEPENDENCY_OFFLINE
+from services.job_service import check_cancelled
 from loguru import logger
 
+load_dotenv()
+# Ask the LLM about imports that cannot be mapped to a distribution locally
+DEPENDENCY_LLM_FALLBACK = os.getenv("DEPENDENCY_LLM_FALLBACK", "true").lower() in ("1", "true", "yes")
+
 def clean_requirements_output(raw_text: str) -> str:
     """
     Cleans raw dependency output by extracting valid Python package names.
@@ -38,11 +45,26 @@ def clean_requirements_output(raw_text: str) -> str:
 def setup_virtualenv_and_install_requirements(
     requirements_text: str,
     python_version: str = None,
-    refactor_dir: str = 'temp_refactored_repo'
+    refactor_dir: str = 'temp_refactored_repo',
+    offline: bool = DEPENDENCY_OFFLINE,
+    resolve_only: bool = False
 ) -> Dict[str, Union[bool, str, List[str]]]:
     """
-    Creates a temporary virtual environment, installs packages, and writes
-    the frozen package list into a requirements.txt file inside refactor_dir.
+    Installs packages in a virtual environment and writes the frozen
+    package list into a requirements.txt file inside refactor_dir.
+
+    The environment comes from the persistent cache in `utils.venv_cache`: an
+    identical requirement set on the same interpreter reuses its environment,
+    and new ones install from the shared local wheelhouse. With `resolve_only`,
+    versions are resolved from package metadata (`pip install --dry-run`) and
+    nothing is installed; the pins have the same form as `pip freeze`.
+
+    Args:
+        requirements_text: Packages to install, one per line.
+        python_version: Interpreter version, e.g. "3.12"; the current Python is used if it is not installed.
+        refactor_dir: Directory the frozen requirements.txt is written to.
+        offline: Install only from the local wheelhouse, without contacting the package index.
+        resolve_only: Resolve the pins without creating an environment.
 
     Returns:
         Dict with keys:
@@ -64,65 +86,30 @@ def setup_virtualenv_and_install_requirements(
         msg = f"Using current Python: {python_executable}"
 
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            venv_dir = os.path.join(temp_dir, "venv")
-            requirements_file = os.path.join(temp_dir, "requirements.txt")
-
-            # Step 1: Write requirements
-            try:
-                with open(requirements_file, "w", encoding="utf-8") as f:
-                    f.write(requirements_text)
-            except Exception as e:
-                raise RuntimeError(f"Failed to write requirements.txt: {e}")
-
-            # Step 2: Create virtual environment
-            try:
-                subprocess.run([python_executable, "-m", "venv", venv_dir], check=True)
-            except subprocess.CalledProcessError as e:
-                raise RuntimeError(f"Failed to create virtual environment: {e}")
-
-            pip_path = os.path.join(venv_dir, "bin", "pip") if os.name != "nt" else os.path.join(venv_dir, "Scripts", "pip.exe")
-            python_path = os.path.join(venv_dir, "bin", "python") if os.name != "nt" else os.path.join(venv_dir, "Scripts", "python.exe")
-
-            # Step 3: Bootstrap pip
-            try:
-                subprocess.run([python_path, "-m", "ensurepip", "--upgrade"], check=True)
-            except subprocess.CalledProcessError:
-                raise RuntimeError("Failed to bootstrap pip in the virtual environment.")
-
-            # Step 4: Install dependencies
-            try:
-                subprocess.run(
-                    [pip_path, "install", "--only-binary=:all:", "-r", requirements_file],
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
-            except subprocess.CalledProcessError as e:
-                error_msg = e.stderr or e.stdout or str(e)
-                raise RuntimeError(f"Failed to install packages:\n{error_msg}")
-
-            # Step 5: Freeze installed packages
-            try:
-                result = subprocess.run([pip_path, "freeze"], stdout=subprocess.PIPE, check=True, text=True)
-                installed_packages = result.stdout.strip().splitlines()
-            except subprocess.CalledProcessError:
-                installed_packages = []
-
-            # Step 6: Save frozen requirements
-            try:
-                os.makedirs(refactor_dir, exist_ok=True)
-                final_reqs_path = os.path.join(refactor_dir, "requirements.txt")
-                with open(final_reqs_path, "w", encoding="utf-8") as f:
-                    f.write("\n".join(installed_packages))
-            except Exception as e:
-                raise RuntimeError(f"Failed to save frozen requirements.txt: {e}")
+        if resolve_only:
+            # A missing interpreter is resolved for by version instead of falling back to the current one
+            target_version = python_version if python_executable == sys.executable and python_version else None
+            installed_packages = resolve_requirements(requirements_text, python_executable, target_version, offline=offline)
+            result = f"Resolved {len(installed_packages)} packages without installing them."
+        else:
+            environment = get_environment(requirements_text, python_executable, offline=offline)
+            installed_packages = environment.installed_packages
+            result = "Reused a cached environment with the same requirements." if environment.reused else "Environment setup and installation successful."
+
+        # Save frozen requirements
+        try:
+            os.makedirs(refactor_dir, exist_ok=True)
+            final_reqs_path = os.path.join(refactor_dir, "requirements.txt")
+            with open(final_reqs_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(installed_packages))
+        except Exception as e:
+            raise RuntimeError(f"Failed to save frozen requirements.txt: {e}")
 
-            return {
-                "success": True,
-                "message": f"{msg}\nEnvironment setup and installation successful.",
-                "installed_packages": "\n".join(installed_packages)
-            }
+        return {
+            "success": True,
+            "message": f"{msg}\n{result}",
+            "installed_packages": "\n".join(installed_packages)
+        }
 
     except Exception as e:
         return {
@@ -135,13 +122,27 @@ def setup_virtualenv_and_install_requirements(
 
 def generate_dependencies(
     root_dir: str = 'temp_refactored_repo',
-    python_version: str = "3.12"
+    python_version: str = "3.12",
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    offline: bool = DEPENDENCY_OFFLINE,
+    resolve_only: bool = False
 ) -> Dict[str, str]:
     """
-    Scans Python files in a directory, extracts dependencies using LLM,
+    Scans Python files in a directory, extracts their dependencies,
     installs them in a temporary virtual environment, and writes the 
     frozen requirements to `requirements.txt` in the same directory.
 
+    Imports are read from the syntax tree of every file, in parallel. Standard
+    library modules of `python_version` and the project's own modules are
+    dropped, and the remaining names are mapped to PyPI distributions. The LLM
+    is asked, once, only about the names that cannot be mapped locally.
+
+    `progress_callback` is called after each scanned file, and setting
+    `cancel_event` stops the run between steps. With `offline`, the LLM is not
+    asked about unknown imports and packages come only from the local wheelhouse.
+    With `resolve_only`, the packages are resolved to pins without being installed.
+
     Returns:
         dict: {
             "message": str,
@@ -150,51 +151,56 @@ def generate_dependencies(
 
     Raises:
         FileNotFoundError: If the root_dir does not exist.
-        RuntimeError: If reading files, LLM extraction, or env setup fails.
+        RuntimeError: If extraction or env setup fails.
         ValueError: If no valid Python files found.
     """
-    key_index = 0  # Start with the first API key
     if not os.path.exists(root_dir):
         raise FileNotFoundError(f"Directory '{root_dir}' does not exist.")
 
-    package_summary: Dict[str, str] = {}
-
-    for dirpath, _, filenames in os.walk(root_dir):
-        for filename in filenames:
-            if not filename.endswith(".py") or filename == "requirements.txt":
-                logger.warning(f"Skipping non-Python file: {filename}")
-                continue
+    scanned = 0
+
+    def on_file(relative_path: str, names: List[str], error: Optional[str]) -> None:
+        nonlocal scanned
+        scanned += 1
+        if progress_callback is not None:
+            progress_callback({
+                "event": "scanned",
+                "file": relative_path,
+                "done": scanned,
+                "log": f"[x] Could not read: {relative_path}" if error else f"[✓] Extracted packages: {relative_path}",
+            })
+
+    check_cancelled(cancel_event)
+    imports = scan_imports(root_dir, on_file=on_file)
+    if not imports:
+        raise ValueError(f"No valid Python files found in directory '{root_dir}'.")
 
-            file_path = os.path.join(dirpath, filename)
+    names = third_party_imports(imports, python_version)
+    distributions = {name: resolve_distribution(name) for name in names}
+    packages = [distribution for distribution in distributions.values() if distribution]
+    unresolved = [name for name, distribution in distributions.items() if not distribution]
+    logger.info(f"Found {len(names)} third-party imports; {len(unresolved)} left for the LLM: {unresolved}")
 
+    check_cancelled(cancel_event)
+    if unresolved:
+        if DEPENDENCY_LLM_FALLBACK and not offline:
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    file_content = f.read()
+                packages += clean_requirements_output(get_distributions(unresolved, python_version)).splitlines()
             except Exception as e:
-                raise RuntimeError(f"Failed to read file {file_path}: {e}")
-
-            try:
-                packages, key_index = get_packages(file_content, python_version, key_index)
-                relative_path = os.path.relpath(file_path, root_dir)
-                package_summary[relative_path] = packages
-                logger.info(f"Extracted packages from : {relative_path}")
-            except Exception as e:
-                raise RuntimeError(f"Failed to extract packages from {file_path}: {e}")
-
-    if not package_summary:
-        raise ValueError(f"No valid Python files found in directory '{root_dir}'.")
-
-    try:
-        merged = merge_packages(package_summary, python_version)
-        cleaned = clean_requirements_output(merged)
-    except Exception as e:
-        raise RuntimeError(f"Failed to merge and clean dependencies: {e}")
+                raise RuntimeError(f"Failed to resolve packages for {', '.join(unresolved)}: {e}")
+        else:
+            # The import name is the distribution name more often than not
+            packages += unresolved
+    cleaned = "\n".join(dict.fromkeys(packages))
 
+    check_cancelled(cancel_event)
     try:
         response = setup_virtualenv_and_install_requirements(
             requirements_text=cleaned,
             python_version=python_version,
-            refactor_dir=root_dir
+            refactor_dir=root_dir,
+            offline=offline,
+            resolve_only=resolve_only
         )
         if not response["success"]:
             raise RuntimeError(f"Virtualenv setup failed: {response['message']}")
@@ -206,4 +212,3 @@ def generate_dependencies(
 
     except Exception as e:
         raise RuntimeError(f"Environment setup error: {e}")
-        
\ No newline at end of file
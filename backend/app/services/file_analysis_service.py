@@ -1,48 +1,57 @@
-import os
-import re
-import time
-from typing import List
-from dotenv import load_dotenv
-from utils.llm_utils.create_groq_client import get_groq_client
-from langchain.schema.messages import SystemMessage, HumanMessage, AIMessage
-from langchain.text_splitter import PythonCodeTextSplitter
+from utils.llm_utils.prompt_packing import (
+    split_into_chunks,
+    chunk_prompt,
+    chunked_protocol_tokens,
+    invoke_prompts,
+)
+from services.static_analysis_service import analyze_source, format_static_report, STATIC_RULES
 from loguru import logger
 
-def generate_file_analysis(file_path:str, code_content:str) -> str:
+ANALYSIS_MODES = ("static", "hybrid", "llm")
+
+
+def generate_file_analysis(file_path:str, code_content:str, mode:str = "hybrid") -> str:
     """
-    Analyzes a given Python source file using an LLM by chunking its content and passing it through a 
-    conversation-based prompt. Returns a detailed analysis of the file including structure, potential 
-    improvements, and insights.
+    Analyzes a given Python source file and returns a list of the issues
+    found (outdated syntax, magic numbers, code smells, anti-patterns, bad practices).
 
-    This function simulates a step-by-step interaction with the LLM where:
-    - The LLM is first instructed to remember incoming chunks.
-    - Each chunk of code is sent sequentially.
-    - A final instruction triggers the full analysis.
-    - Rate-limiting is handled gracefully with retry logic.
+    In "static" mode only the AST rule engine runs and the report comes back
+    without any LLM call. In "hybrid" mode the rule engine's findings are
+    returned as well and passed to the LLM as context, which is asked only for
+    the issues the rules cannot see. "llm" mode sends the code to the LLM alone.
+
+    The whole file is sent in a single request when it fits the model's context.
+    Larger files are split into AST-bounded chunks, each chunk is analyzed
+    on its own, and the per-chunk reports are joined in order.
+    Rate limits are handled by the shared LLM scheduler, which waits for a key with headroom.
 
     Args:
         file_path (str): File name of selelcted file like (main.py, utils.py) 
         code_content (str): Content of selected file
+        mode (str): One of "static", "hybrid" or "llm"
 
     Raises:
-        e: If an error other than rate-limiting occurs during communication with the LLM.
+        ValueError: If mode is unknown.
+        Exception: If the LLM call fails with a non-retryable error or retries run out.
 
     Returns:
-        str: Response from LLM 
+        str: Response from LLM, preceded by the static report unless mode is "llm"
     """    
-    
-    llm = get_groq_client()
-
-    # Prompts
-    system_prompt = SystemMessage(content="You are a senior Python code reviewer.Your job is to identify issues in Python code chunks.")
+    if mode not in ANALYSIS_MODES:
+        raise ValueError(f"Unknown analysis mode '{mode}', expected one of {', '.join(ANALYSIS_MODES)}")
 
-    init_prompt = f"""
-        I will send you a large file by chunking. File name is : {file_path}. you just read all the chunks also remember issues in code. whenever I will say that all chunks are provided, then you should analyze the full code file. No need to say anything, you can say just next.. ok?
-    """
+    static_report = ""
+    if mode != "llm":
+        analysis = analyze_source(code_content, file_path)
+        static_report = format_static_report(analysis)
+        logger.info(f"Static analysis of {file_path}: {len(analysis.findings)} findings")
+        if mode == "static":
+            return static_report
 
-    final_instruction ="""
-            You now have the full code.
+    # Prompts
+    system_prompt = "You are a senior Python code reviewer.Your job is to identify issues in Python code chunks."
 
+    instruction ="""
             Your task:
             "Focus on detecting the following problems:
                 - Outdated or deprecated Python syntax
@@ -54,35 +63,32 @@ def generate_file_analysis(file_path:str, code_content:str) -> str:
                 Do not refactor. Only analyze problems.
                 response in markdown format.
             """
-    text_splitter = PythonCodeTextSplitter(chunk_size=100000, chunk_overlap=0)
-    chunks = text_splitter.split_text(code_content)
-    chunks.insert(0, init_prompt)
-    chunks.append(final_instruction)
+    if static_report:
+        findings = "\n".join(line for line in static_report.splitlines() if line.startswith("- Line"))
+        instruction += f"""
+            A static analyzer already checked the whole file for: {", ".join(STATIC_RULES.values())}.
+            Its findings are below. Do not repeat them or report those categories again;
+            list only other problems, and say so if there are none.
+            {findings or "- No issues found by the static checks."}
+            """
 
-    messages = [system_prompt]
-    final_output = ''
-    
-    for chunk in chunks:
-        messages.append(HumanMessage(content=chunk))
-        while True:
-            try:
-                response = llm.invoke(messages) 
-                break  # Exit loop on success
-            except Exception as e:
-                msg = str(e)
-                if "rate limit" in msg.lower() or "Rate limit reached" in msg:
-                    # Extract retry time from error message
-                    wait_match = re.search(r"in (\d+m\d+\.\d+s)", msg)
-                    wait_time = 180  # fallback: wait 3 minutes
-                    if wait_match:
-                        wait_str = wait_match.group(1)
-                        minutes = int(wait_str.split("m")[0])
-                        seconds = float(wait_str.split("m")[1].replace("s", ""))
-                        wait_time = int(minutes * 60 + seconds)
-                    logger.info(f"Rate limit hit, waiting {wait_time} seconds before retrying...")
-                    time.sleep(wait_time)
-                else:
-                    raise e
+    chunks = split_into_chunks(code_content, system_prompt + instruction, rewrites_code=False)
+    prompts = [
+        f"File: `{file_path}`\n{instruction}\n{chunk_prompt(chunk, part, len(chunks))}"
+        for part, chunk in enumerate(chunks, start=1)
+    ]
 
-        messages.append(AIMessage(content=response.content))
-    return response.content
+    outputs, _ = invoke_prompts(
+        "analysis",
+        system_prompt,
+        prompts,
+        file_path=file_path,
+        baseline_tokens=chunked_protocol_tokens(system_prompt, instruction, code_content),
+    )
+    if len(outputs) == 1:
+        review = outputs[0]
+    else:
+        review = "\n\n".join(f"### Part {part} of {len(outputs)}\n{output.strip()}" for part, output in enumerate(outputs, start=1))
+    if static_report:
+        return f"{static_report}\n\n### Review\n{review.strip()}"
+    return review
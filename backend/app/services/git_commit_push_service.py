@@ -1,26 +1,32 @@
 import os
 import base64
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
 from dotenv import load_dotenv
 from loguru import logger
 
-from utils.github_utils import create_branch
-from services.local_drive_service import get_all_refactored_files
+from utils.github_client import github_client
+from utils.github_utils import create_branch, get_branch_tree, git_blob_sha
+from services.local_drive_service import list_refactored_files, BASE_DIR
 
 load_dotenv()
+BLOB_WORKERS = int(os.getenv("GITHUB_BLOB_WORKERS", "8"))
 
 def commit_and_push_file_service(
     owner: str,
     repo: str,
     commit_message: str = "Auto commit",
     branch: str = "auto-refactored-branch",
-    base_branch: str = "main"
+    base_branch: str = "main",
+    base_path: str = BASE_DIR
 ) -> str:
     """
     Commits and pushes all files from 'temp_refactored_repo' to the specified GitHub branch.
 
     If the branch doesn't exist, it is created from the base branch. Each file is created or 
-    updated in the repo via the GitHub API.
+    updated in the repo via the GitHub API. Files whose git blob SHA already matches the
+    branch tree are skipped, so unchanged files cost no API call. Files are read and
+    pushed as raw bytes, so CRLF and non-UTF-8 files match their remote blob.
 
     Args:
         owner: GitHub username or org.
@@ -28,13 +34,13 @@ def commit_and_push_file_service(
         commit_message: Message to use for commits.
         branch: Target branch name.
         base_branch: Source branch to create target branch from if needed.
+        base_path: Local directory holding the files to push.
 
     Returns:
         Success message or error string.
     """
     token = os.getenv("GITHUB_TOKEN")
     headers = {"Authorization": f"token {token}"}
-    base_path = "temp_refactored_repo"
 
     try:
         # Ensure branch exists (create if needed)
@@ -44,33 +50,44 @@ def commit_and_push_file_service(
         return f"Failed to create or verify branch '{branch}': {e}"
 
     try:
-        # Get all files & contents from helper
-        all_files = get_all_refactored_files(base_path)
+        file_paths = list_refactored_files(base_path)
     except Exception as e:
         logger.error(f"Failed to get files from '{base_path}': {e}")
         return f"Failed to get files from '{base_path}': {e}"
 
-    for file_path, content in all_files.items():
+    try:
+        # One recursive tree call gives the current blob SHA of every file on the branch
+        remote_shas = {path: sha for path, (sha, _) in get_branch_tree(owner, repo, branch).items()}
+    except Exception as e:
+        logger.error(f"Failed to list files of branch '{branch}': {e}")
+        return f"Failed to list files of branch '{branch}': {e}"
+
+    skipped = 0
+    for file_path in file_paths:
         try:
-            if content.startswith("Error:"):
-                logger.warning(f"Skipping {file_path} due to read error: {content}")
+            try:
+                with open(os.path.join(base_path, file_path), "rb") as f:
+                    encoded = f.read()
+            except OSError as e:
+                logger.warning(f"Skipping {file_path} due to read error: {e}")
                 continue
 
-            file_url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
+            sha = remote_shas.get(file_path)
+            if sha == git_blob_sha(encoded):
+                skipped += 1
+                continue
 
-            # Check if file exists on GitHub to get sha for update
-            res = requests.get(f"{file_url}?ref={branch}", headers=headers)
-            sha = res.json().get("sha") if res.status_code == 200 else None
+            file_url = f"{github_client.api_url}/repos/{owner}/{repo}/contents/{file_path}"
 
             data = {
                 "message": f"{commit_message}: {file_path}",
-                "content": base64.b64encode(content.encode()).decode(),
+                "content": base64.b64encode(encoded).decode(),
                 "branch": branch
             }
             if sha:
                 data["sha"] = sha
 
-            put_res = requests.put(file_url, headers=headers, json=data)
+            put_res = github_client.put(file_url, headers=headers, json=data)
 
             if put_res.status_code in [200, 201]:
                 logger.info(f"Committed {file_path} successfully.")
@@ -80,5 +97,130 @@ def commit_and_push_file_service(
         except Exception as e:
             logger.error(f"Exception committing {file_path}: {e}")
             return f"Exception committing {file_path}: {e}"
-        
+
+    logger.info(f"Skipped {skipped} files identical to '{branch}'.")
     return "Committed all file successfully"
+
+
+def _expect_json(response, expected_status: int, action: str) -> Dict[str, Any]:
+    """
+    Returns the JSON body of a GitHub response, or raises if the status is unexpected.
+
+    Raises:
+        RuntimeError: If the response status differs from expected_status.
+    """
+    if response.status_code != expected_status:
+        raise RuntimeError(f"Failed to {action}: {response.status_code} {response.text}")
+    return response.json()
+
+
+def commit_and_push_batch_service(
+    owner: str,
+    repo: str,
+    commit_message: str = "Auto commit",
+    branch: str = "auto-refactored-branch",
+    base_branch: str = "main",
+    base_path: str = BASE_DIR
+) -> str:
+    """
+    Pushes all files from 'temp_refactored_repo' to the branch as one single commit.
+
+    Uses the Git Data API: blobs are created concurrently, then one tree is built on
+    top of the branch's current tree, one commit is created and the branch ref is
+    fast-forwarded to it. The number of sequential round-trips does not grow with
+    the number of files. Files whose git blob SHA already matches the branch tree
+    are left out; if nothing changed, no commit is created.
+
+    Args:
+        owner: GitHub username or org.
+        repo: Repository name.
+        commit_message: Message of the commit.
+        branch: Target branch name.
+        base_branch: Source branch to create target branch from if needed.
+        base_path: Local directory holding the files to push.
+
+    Returns:
+        Success message or error string.
+    """
+    token = os.getenv("GITHUB_TOKEN")
+    headers = {"Authorization": f"token {token}"}
+    repo_url = f"{github_client.api_url}/repos/{owner}/{repo}"
+
+    try:
+        # Ensure branch exists (create if needed)
+        create_branch(owner, repo, branch, from_branch=base_branch)
+    except Exception as e:
+        logger.error(f"Failed to create or verify branch '{branch}': {e}")
+        return f"Failed to create or verify branch '{branch}': {e}"
+
+    try:
+        file_paths = list_refactored_files(base_path)
+    except Exception as e:
+        logger.error(f"Failed to get files from '{base_path}': {e}")
+        return f"Failed to get files from '{base_path}': {e}"
+
+    if not file_paths:
+        return f"No files to commit in '{base_path}'"
+
+    def read_file(file_path: str) -> bytes:
+        with open(os.path.join(base_path, file_path), "rb") as f:
+            return f.read()
+
+    def create_blob(item: Tuple[str, bytes]) -> str:
+        file_path, data = item
+        content = base64.b64encode(data).decode()
+        res = github_client.post(
+            f"{repo_url}/git/blobs", headers=headers, json={"content": content, "encoding": "base64"}
+        )
+        return _expect_json(res, 201, f"create blob for {file_path}")["sha"]
+
+    try:
+        head_sha = _expect_json(
+            github_client.get(f"{repo_url}/git/ref/heads/{branch}", headers=headers), 200, f"get branch '{branch}'"
+        )["object"]["sha"]
+        base_tree_sha = _expect_json(
+            github_client.get(f"{repo_url}/git/commits/{head_sha}", headers=headers), 200, "get head commit"
+        )["tree"]["sha"]
+
+        remote_entries = get_branch_tree(owner, repo, base_tree_sha)
+        changed: List[Tuple[str, bytes]] = []
+        for path in file_paths:
+            data = read_file(path)
+            if remote_entries.get(path, (None, None))[0] != git_blob_sha(data):
+                changed.append((path, data))
+        file_paths = [path for path, _ in changed]
+        if not file_paths:
+            logger.info(f"All files are identical to '{branch}'; nothing to commit.")
+            return f"No changes to commit on '{branch}'"
+
+        with ThreadPoolExecutor(max_workers=BLOB_WORKERS) as executor:
+            blob_shas = list(executor.map(create_blob, changed))
+
+        tree_sha = _expect_json(github_client.post(
+            f"{repo_url}/git/trees",
+            headers=headers,
+            json={
+                "base_tree": base_tree_sha,
+                "tree": [
+                    # Existing files keep their mode (executable bit, symlink); new files are regular files
+                    {"path": path, "mode": remote_entries.get(path, (None, "100644"))[1], "type": "blob", "sha": sha}
+                    for path, sha in zip(file_paths, blob_shas)
+                ],
+            }
+        ), 201, "create tree")["sha"]
+
+        commit_sha = _expect_json(github_client.post(
+            f"{repo_url}/git/commits",
+            headers=headers,
+            json={"message": commit_message, "tree": tree_sha, "parents": [head_sha]}
+        ), 201, "create commit")["sha"]
+
+        _expect_json(github_client.patch(
+            f"{repo_url}/git/refs/heads/{branch}", headers=headers, json={"sha": commit_sha, "force": False}
+        ), 200, f"update branch '{branch}'")
+    except Exception as e:
+        logger.error(f"Batch commit to '{branch}' failed: {e}")
+        return f"Batch commit to '{branch}' failed: {e}"
+
+    logger.info(f"Committed {len(file_paths)} files to '{branch}' in commit {commit_sha}.")
+    return f"Committed {len(file_paths)} files in a single commit {commit_sha}"
@@ -1,8 +1,8 @@
 import os
 from typing import Dict
 from dotenv import load_dotenv
-import requests
 from loguru import logger
+from utils.github_client import github_client
 
 
 
@@ -41,14 +41,14 @@ def git_pull_request(
         "Accept": "application/vnd.github+json"
     }
 
-    url = f"https://api.github.com/repos/{owner}/{repo}/pulls"
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/pulls"
     data = {
         "title": title,
         "head": head_branch,
         "base": base_branch,
         "body": body
     }
-    response = requests.post(url, headers=headers, json=data)
+    response = github_client.post(url, headers=headers, json=data)
 
     if response.status_code == 201:
         pr_url = response.json().get("html_url", "N/A")
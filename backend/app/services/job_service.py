@@ -0,0 +1,371 @@
+import os
+import json
+import time
+import asyncio
+import uuid
+import threading
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "2"))
+MAX_QUEUED_JOBS = int(os.getenv("MAX_QUEUED_JOBS", "20"))
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "100"))
+# Recent live-only events kept per running job for streams that fall slightly behind
+LIVE_EVENT_BUFFER = max(1, int(os.getenv("LIVE_EVENT_BUFFER", "256")))
+
+FINISHED_STATES = ("succeeded", "failed", "cancelled")
+# High-volume events (streamed code text) that are sent to connected streams but never kept
+LIVE_ONLY_EVENTS = ("llm-delta",)
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+
+
+class JobCancelledError(Exception):
+    """Raised inside a job's work function once the job has been cancelled."""
+
+
+class JobQueueFullError(Exception):
+    """Raised when too many jobs are already waiting to run."""
+
+
+class JobConflictError(Exception):
+    """Raised when an unfinished job already works in the same directory."""
+
+
+def check_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    """
+    Stops the current work if its job was cancelled.
+
+    Args:
+        cancel_event: Event set by JobManager.cancel, or None when not running as a job.
+
+    Raises:
+        JobCancelledError: If the event is set.
+    """
+    if cancel_event is not None and cancel_event.is_set():
+        raise JobCancelledError("Job was cancelled")
+
+
+class Job:
+    """
+    State, progress, logs and result of one background operation.
+
+    Every reported event is also kept, numbered, in `events` so clients can
+    stream them (see `wait_for_events`) and resume after a reconnect. Live-only
+    events share the numbering but only sit in a small ring buffer while the
+    job runs, so the streamed output of finished jobs is not held in memory.
+    """
+
+    def __init__(self, kind: str, params: Dict[str, Any], workspace: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.workspace = workspace
+        self.state = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Dict[str, Optional[int]] = {"done": 0, "total": None}
+        self.logs: List[str] = []
+        self.events: List[Dict[str, Any]] = []
+        self._live: deque = deque(maxlen=LIVE_EVENT_BUFFER)
+        self._last_id = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        # (event loop, asyncio.Event) of every async stream waiting for this job
+        self._waiters: Set[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def report(self, event: Dict[str, Any]) -> None:
+        """
+        Progress callback handed to the work function. Safe to call from worker threads.
+
+        Args:
+            event: Dict with an 'event' type, and optionally 'log' (a log line),
+                'done' and 'total' (file counts) and any per-file details.
+        """
+        with self._lock:
+            started = self.started_at or self.created_at
+            self._last_id += 1
+            record = {**event, "id": self._last_id, "ts": round(time.time() - started, 3)}
+            if event.get("event") in LIVE_ONLY_EVENTS:
+                self._live.append(record)
+                self._notify()
+                return
+            self.events.append(record)
+            if event.get("log"):
+                self.logs.append(event["log"])
+            if event.get("total") is not None:
+                self.progress["total"] = event["total"]
+            if event.get("done") is not None:
+                self.progress["done"] = event["done"]
+            self._notify()
+
+    def finish(self, state: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """
+        Marks the job as finished and wakes up event streams.
+
+        Returns:
+            False, changing nothing, if the job had already finished.
+        """
+        with self._lock:
+            return self._finish(state, result, error)
+
+    def _finish(self, state: str, result: Any = None, error: Optional[str] = None) -> bool:
+        """Finishes the job unless it already is. Caller holds the lock."""
+        if self.finished:
+            return False
+        self.state = state
+        self.result, self.error = result, error
+        self.finished_at = time.time()
+        self._live.clear()
+        self._notify()
+        return True
+
+    def _notify(self) -> None:
+        """Wakes up threads in wait_for_events and async streams in next_events. Caller holds the lock."""
+        self._changed.notify_all()
+        for loop, changed in self._waiters:
+            try:
+                loop.call_soon_threadsafe(changed.set)
+            except RuntimeError:
+                # The stream's event loop is already closed
+                pass
+
+    def _events_after(self, after_id: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Returns the kept and live events newer than `after_id`, in id order. Caller holds the lock."""
+        events = self.events[bisect_right(self.events, after_id, key=lambda e: e["id"]):]
+        live = [event for event in self._live if event["id"] > after_id]
+        if live:
+            events = sorted(events + live, key=lambda e: e["id"])
+        return events, self.finished
+
+    def wait_for_events(self, after_id: int = 0, timeout: float = 15.0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Blocks until events newer than `after_id` exist, the job finishes, or the timeout passes.
+
+        Args:
+            after_id: Id of the last event the client already has.
+            timeout: Seconds to wait before returning with no events.
+
+        Returns:
+            A tuple: (new events in id order, whether the job is finished). Live-only
+            events older than the ring buffer, or of a finished job, are not returned.
+        """
+        with self._lock:
+            self._changed.wait_for(lambda: self._last_id > after_id or self.finished, timeout=timeout)
+            return self._events_after(after_id)
+
+    async def next_events(self, after_id: int = 0, timeout: float = 15.0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Async version of `wait_for_events`: waits on the event loop without holding a thread.
+
+        Args:
+            after_id: Id of the last event the client already has.
+            timeout: Seconds to wait before returning with no events.
+
+        Returns:
+            A tuple: (new events in id order, whether the job is finished).
+        """
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            if self._last_id > after_id or self.finished:
+                return self._events_after(after_id)
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+        with self._lock:
+            return self._events_after(after_id)
+
+    def to_dict(self, log_offset: int = 0) -> Dict[str, Any]:
+        """
+        Serializes the job for the API.
+
+        Args:
+            log_offset: Only include log lines from this index on, for polling clients.
+
+        Returns:
+            Dict with state, timings, progress, logs and (once finished) result or error.
+        """
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "state": self.state,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "progress": dict(self.progress),
+                "log_offset": log_offset,
+                "logs": self.logs[log_offset:],
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    """
+    Runs long operations in a bounded background thread pool.
+
+    At most `max_workers` jobs run at the same time; further jobs wait in the
+    'queued' state, and submitting beyond `max_queued` waiting jobs is refused.
+    Finished jobs are kept for polling up to `max_finished`, oldest dropped first.
+    Jobs that write to the same directory are refused while one of them is unfinished.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = MAX_CONCURRENT_JOBS,
+        max_queued: int = MAX_QUEUED_JOBS,
+        max_finished: int = MAX_FINISHED_JOBS
+    ):
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, func: Callable[..., Any], workspace: Optional[str] = None, **params: Any) -> Job:
+        """
+        Queues `func(**params, progress_callback=..., cancel_event=...)` as a background job.
+
+        Args:
+            kind: Job type shown to clients, e.g. 'refactor'.
+            func: Work function; it must accept `progress_callback` and `cancel_event`.
+            workspace: Directory the job writes to, if any.
+            params: Keyword arguments for the work function.
+
+        Returns:
+            The queued Job.
+
+        Raises:
+            JobQueueFullError: If too many jobs are already waiting.
+            JobConflictError: If an unfinished job already uses the same workspace.
+        """
+        workspace = os.path.realpath(workspace) if workspace else None
+        job = Job(kind, params, workspace)
+        with self._lock:
+            if workspace is not None:
+                busy = next((
+                    existing for existing in self._jobs.values()
+                    if existing.workspace == workspace and not existing.finished
+                ), None)
+                if busy is not None:
+                    raise JobConflictError(f"{busy.kind} job {busy.id} is still using '{workspace}'.")
+            queued = sum(1 for existing in self._jobs.values() if existing.state == "queued")
+            if queued >= self.max_queued:
+                raise JobQueueFullError(f"Too many queued jobs ({queued}); try again later.")
+            self._jobs[job.id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, func, params)
+        logger.info(f"Queued {kind} job {job.id}")
+        return job
+
+    def _run(self, job: Job, func: Callable[..., Any], params: Dict[str, Any]) -> None:
+        with job._lock:
+            # Cancelled while queued
+            if job.finished:
+                return
+            job.state = "running"
+            job.started_at = time.time()
+
+        result, error = None, None
+        try:
+            result = func(**params, progress_callback=job.report, cancel_event=job.cancel_event)
+            state = "cancelled" if job.cancel_event.is_set() else "succeeded"
+        except Exception as e:
+            if job.cancel_event.is_set():
+                state = "cancelled"
+            else:
+                state, error = "failed", str(e)
+                logger.error(f"{job.kind} job {job.id} failed: {e}")
+
+        if job.finish(state, result, error):
+            logger.info(f"{job.kind} job {job.id} {state}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Returns the job with this id, or None."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        """Returns all known jobs, oldest first."""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """
+        Requests cancellation of a job.
+
+        Queued jobs never start; running jobs stop at their next cancellation check.
+
+        Args:
+            job_id: Id of the job to cancel.
+
+        Returns:
+            The job, or None if it does not exist.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return job
+
+        with job._lock:
+            if job.finished:
+                return job
+            job.cancel_event.set()
+            # A running job finishes itself at its next cancellation check
+            if job.state == "queued":
+                job._finish("cancelled")
+        return job
+
+    async def stream_events(self, job: Job, after_id: int = 0, heartbeat: float = 15.0) -> AsyncIterator[str]:
+        """
+        Yields a job's events as Server-Sent Events until the job finishes.
+
+        The stream waits on the event loop, woken up by the job's thread, so open
+        streams do not tie up the threadpool that serves the API's sync endpoints.
+
+        Args:
+            job: Job to follow.
+            after_id: Last event id the client has seen (from Last-Event-ID), to resume a stream.
+            heartbeat: Seconds between keep-alive comments while nothing happens.
+
+        Yields:
+            SSE-formatted messages; the last one is an 'end' event with the final state.
+        """
+        while True:
+            events, finished = await job.next_events(after_id, timeout=heartbeat)
+            for event in events:
+                after_id = event["id"]
+                yield f"id: {event['id']}\nevent: {event.get('event', 'message')}\ndata: {json.dumps(event)}\n\n"
+            if finished and not events:
+                yield f"event: end\ndata: {json.dumps({'state': job.state, 'error': job.error})}\n\n"
+                return
+            if not events:
+                yield ": keep-alive\n\n"
+
+    def _prune(self) -> None:
+        """Drops the oldest finished jobs beyond `max_finished`. Caller holds the lock."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
@@ -1,40 +1,269 @@
 import os
-from typing import Dict
+import re
+import hashlib
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 BASE_DIR = "temp_refactored_repo"
+# Written by incremental refactor runs; internal bookkeeping, not part of the repo
+MANIFEST_FILE = ".refactor_manifest.json"
+# Streamed refactors are written next to their output file until they are complete
+PARTIAL_SUFFIX = ".partial"
+# Files are hashed and served in blocks of this size, so memory does not grow with file size
+READ_BLOCK_SIZE = 64 * 1024
 
-def get_all_refactored_files(base_path: str = BASE_DIR) -> Dict[str, str]:
+_BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Raised when a requested byte range starts past the end of the file."""
+
+
+def is_internal_file(relative_path: str) -> bool:
     """
-    Reads all files under a directory and returns a mapping of relative paths to their contents.
+    Checks whether a path is bookkeeping left by refactor runs rather than a repository file.
 
     Args:
-        base_path: Directory to read files from.
+        relative_path: '/'-separated path relative to the output directory.
 
     Returns:
-        A dictionary of file paths and their contents or error messages.
+        True for the manifest (and its temporary copy) at the root and for unfinished streamed files.
+    """
+    return relative_path in (MANIFEST_FILE, MANIFEST_FILE + ".tmp") or relative_path.endswith(PARTIAL_SUFFIX)
+
+def _links_inside(root: str, path: str) -> bool:
+    """Checks that a symlink resolves to a file inside `root` (a real path), as resolve_refactored_path requires."""
+    target = os.path.realpath(path)
+    return os.path.commonpath([root, target]) == root and os.path.isfile(target)
+
+
+def list_refactored_files(base_path: str = BASE_DIR) -> List[str]:
+    """
+    Lists the files under a directory as sorted, '/'-separated relative paths.
+
+    Args:
+        base_path: Directory to list.
+
+    Returns:
+        Relative paths of every file, excluding internal bookkeeping files and
+        symlinks that lead outside the directory.
+
+    Raises:
+        FileNotFoundError: If the directory does not exist.
     """
     if not os.path.exists(base_path):
         raise FileNotFoundError(f"Directory '{base_path}' does not exist.")
 
-    all_files = {}
-
+    real_base = os.path.realpath(base_path)
+    paths = []
     for root, _, files in os.walk(base_path):
         for file in files:
             full_path = os.path.join(root, file)
-            relative_path = os.path.relpath(full_path, base_path)
+            if os.path.islink(full_path) and not _links_inside(real_base, full_path):
+                continue
+            relative_path = os.path.relpath(full_path, base_path).replace('\\', '/')
+            if not is_internal_file(relative_path):
+                paths.append(relative_path)
+    return sorted(paths)
+
+
+def iter_refactored_files(base_path: str = BASE_DIR) -> Iterator[Tuple[str, os.stat_result]]:
+    """
+    Walks a directory lazily, yielding its files in a stable order.
+
+    Entries of each directory are visited in name order, so only the directories
+    on the current path are held in memory, never the whole listing.
+
+    Args:
+        base_path: Directory to walk.
+
+    Yields:
+        ('/'-separated relative path, stat result) of every file, excluding internal bookkeeping
+        files and symlinks that lead outside the directory (see resolve_refactored_path).
+
+    Raises:
+        FileNotFoundError: If the directory does not exist.
+    """
+    if not os.path.isdir(base_path):
+        raise FileNotFoundError(f"Directory '{base_path}' does not exist.")
+
+    def walk(directory: str, prefix: str) -> Iterator[Tuple[str, os.stat_result]]:
+        with os.scandir(directory) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            relative_path = prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk(entry.path, relative_path + "/")
+            elif entry.is_symlink():
+                if _links_inside(real_base, entry.path) and not is_internal_file(relative_path):
+                    yield relative_path, entry.stat()
+            elif entry.is_file(follow_symlinks=False) and not is_internal_file(relative_path):
+                yield relative_path, entry.stat(follow_symlinks=False)
+
+    real_base = os.path.realpath(base_path)
+    yield from walk(base_path, "")
+
+
+def file_sha256(path: str) -> str:
+    """Returns the hex SHA-256 of a file, read block by block."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def list_refactored_page(
+    base_path: str = BASE_DIR,
+    pattern: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 100
+) -> Dict[str, Any]:
+    """
+    Lists one page of the files under a directory, with metadata but no contents.
+
+    Only the files of the requested page are stat-ed into the result and hashed,
+    so memory stays bounded by the page size whatever the size of the repo.
+
+    Args:
+        base_path: Directory to list.
+        pattern: Glob matched against the relative path (e.g. "*.py", "utils/*"); '*' also matches '/'.
+        offset: Number of matching files to skip.
+        limit: Maximum number of files to return.
+
+    Returns:
+        Dict with the total number of matching files, the offset and limit, and
+        the page's files as {"path", "size", "mtime", "sha256"}.
 
+    Raises:
+        FileNotFoundError: If the directory does not exist.
+    """
+    files = []
+    total = 0
+    for relative_path, stat in iter_refactored_files(base_path):
+        if pattern and not fnmatchcase(relative_path, pattern):
+            continue
+        if offset <= total < offset + limit:
             try:
-                with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-                    # relative_path = os.path.relpath(full_path, base_path).replace('\\', '/')
-                    all_files[os.path.relpath(full_path, base_path).replace('\\', '/')] = f.read()
-            except UnicodeDecodeError:
-                all_files[relative_path] = "Error: Binary or non-text file. Cannot decode as UTF-8."
-            except PermissionError:
-                all_files[relative_path] = "Error: Permission denied when reading this file."
-            except FileNotFoundError:
-                all_files[relative_path] = "Error: File was removed before it could be read."
-            except Exception as e:
-                all_files[relative_path] = f"Error reading file: {type(e).__name__}: {str(e)}"
+                sha256 = file_sha256(os.path.join(base_path, relative_path))
+            except OSError:
+                # Removed or unreadable since the walk; listed without a hash
+                sha256 = None
+            files.append({"path": relative_path, "size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256})
+        total += 1
+    return {"total": total, "offset": offset, "limit": limit, "files": files}
+
+
+def resolve_refactored_path(relative_path: str, base_path: str = BASE_DIR) -> str:
+    """
+    Maps a client-supplied relative path to a file inside the directory.
+
+    Args:
+        relative_path: '/'-separated path relative to base_path.
+        base_path: Directory the file must be inside.
+
+    Returns:
+        The real path of the file.
+
+    Raises:
+        ValueError: If the path is absolute or resolves outside base_path (including through symlinks).
+        FileNotFoundError: If the file does not exist.
+    """
+    if not relative_path or os.path.isabs(relative_path) or "\0" in relative_path:
+        raise ValueError(f"Invalid file path '{relative_path}'.")
+    root = os.path.realpath(base_path)
+    full_path = os.path.realpath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, full_path]) != root or full_path == root:
+        raise ValueError(f"File path '{relative_path}' is outside the refactored repository.")
+    if not os.path.isfile(full_path):
+        raise FileNotFoundError(f"File '{relative_path}' does not exist.")
+    return full_path
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parses a single-range HTTP Range header.
+
+    Headers that are missing, malformed or ask for several ranges are ignored,
+    as HTTP allows, and the whole file is served instead.
+
+    Args:
+        header: Value of the Range header, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-500".
+        size: Size of the file in bytes.
+
+    Returns:
+        Inclusive (start, end) byte offsets, or None to serve the whole file.
+
+    Raises:
+        RangeNotSatisfiableError: If the range does not overlap the file.
+    """
+    match = _BYTE_RANGE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiableError(f"Range '{header}' is empty for a {size}-byte file.")
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(f"Range '{header}' starts past the end of the {size}-byte file.")
+    return start, end
+
+
+def iter_file_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    """
+    Reads the bytes start..end (inclusive) of a file in blocks of READ_BLOCK_SIZE.
+
+    Args:
+        path: File to read.
+        start: First byte offset.
+        end: Last byte offset.
+
+    Yields:
+        Consecutive blocks of the range.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            block = f.read(min(READ_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def get_all_refactored_files(base_path: str = BASE_DIR) -> Dict[str, str]:
+    """
+    Reads all files under a directory and returns a mapping of relative paths to their contents.
+
+    Args:
+        base_path: Directory to read files from.
+
+    Returns:
+        A dictionary of file paths and their contents or error messages.
+    """
+    all_files = {}
+
+    for relative_path in list_refactored_files(base_path):
+        full_path = os.path.join(base_path, relative_path)
+        try:
+            with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+                all_files[relative_path] = f.read()
+        except UnicodeDecodeError:
+            all_files[relative_path] = "Error: Binary or non-text file. Cannot decode as UTF-8."
+        except PermissionError:
+            all_files[relative_path] = "Error: Permission denied when reading this file."
+        except FileNotFoundError:
+            all_files[relative_path] = "Error: File was removed before it could be read."
+        except Exception as e:
+            all_files[relative_path] = f"Error reading file: {type(e).__name__}: {str(e)}"
 
     return all_files
 
@@ -1,43 +1,167 @@
 import os
-from typing import List  , Dict
-from utils.llm_utils.readme_generation_prompt import generate_readme_from_repo_summary, file_summary 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+from utils.llm_utils.readme_generation_prompt import (
+    generate_readme_from_repo_summary,
+    file_summary,
+    package_summary,
+    reduce_summaries,
+    pack_summaries,
+    readme_summary_budget,
+    package_summary_budget,
+)
+from utils.llm_utils.create_groq_client import API_KEYS
+from services.job_service import check_cancelled
 from loguru import logger
 
-def generate_repo_summary(root_dir: str, files_path: List[str]) -> Dict[str, str]:
+load_dotenv()
+README_MAX_WORKERS = int(os.getenv("README_MAX_WORKERS", "8"))
+# Upper bound on the summaries sent in one request, below the context window
+README_REDUCE_TOKENS = int(os.getenv("README_REDUCE_TOKENS", "32768"))
+
+def generate_repo_summary(
+    root_dir: str,
+    files_path: List[str],
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    max_workers: int = README_MAX_WORKERS
+) -> Dict[str, str]:
     """
     Generates summaries for a list of Python files in a repository.
 
+    Files are summarized by up to `max_workers` threads, spread over the API
+    keys; results and progress events still come in the order of `files_path`.
+
     Args:
         root_dir: Root directory of the repository.
         files_path: List of relative file paths to summarize. 
+        progress_callback: Called with a progress event after each file.
+        cancel_event: When set, stops before the next file.
+        max_workers: Number of files summarized at the same time.
 
     Returns:
         A dictionary mapping each file path to its summary or an error message.
     """
     repo_summary = {}
-    key_index = 1  # Start with the first API key
 
-    for file_path in files_path:
+    def summarize(item: Tuple[int, str]) -> Tuple[str, str]:
+        index, file_path = item
+        if cancel_event is not None and cancel_event.is_set():
+            return "", "[!] Cancelled"
         full_path = os.path.join(root_dir, file_path)
         try:
             with open(full_path, "r", encoding="utf-8") as f:
                 file_content = f.read()
-            repo_summary[file_path], key_index = file_summary(file_content, file_path, key_index)
+            summary, _ = file_summary(file_content, file_path, index % max(1, len(API_KEYS)))
             logger.info(f"Summarized file: {file_path}")
+            return summary, f"[✓] Summarized: {file_path}"
         except Exception as e:
-            repo_summary[file_path] = f"Error reading or summarizing file: {e}"
+            return f"Error reading or summarizing file: {e}", f"[x] Failed {file_path}: {e}"
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = executor.map(summarize, enumerate(files_path))
+        for done, file_path in enumerate(files_path, start=1):
+            if cancel_event is not None and cancel_event.is_set():
+                executor.shutdown(wait=False, cancel_futures=True)
+            check_cancelled(cancel_event)
+            repo_summary[file_path], log_message = next(results)
+
+            if progress_callback is not None:
+                progress_callback({"event": "summarized", "file": file_path, "done": done, "total": len(files_path), "log": log_message})
 
     return repo_summary  # ✅ Return the raw dictionary, not a formatted string
 
 
-def generate_readme(root_dir: str = "temp_refactored_repo", python_version: str = "3.12") -> str:
+def reduce_repo_summary(
+    repo_summary: Dict[str, str],
+    budget: int,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    max_workers: int = README_MAX_WORKERS
+) -> Dict[str, str]:
+    """
+    Shrinks file summaries until they fit one README request.
+
+    Summaries that already fit are returned unchanged. Otherwise every package
+    (directory) is summarized from its files and the summaries of its
+    sub-packages, deepest packages first and the packages of one depth in
+    parallel. The top-level package summaries and the root files' summaries
+    are then reduced further by token budget if they still do not fit.
+
+    Args:
+        repo_summary: Relative file path -> summary.
+        budget: Token budget of the summaries in one request.
+        progress_callback: Called with a 'reduced' event after each package.
+        cancel_event: When set, stops before the next depth.
+        max_workers: Number of packages summarized at the same time.
+
+    Returns:
+        Path -> summary that fits the budget; package paths end with '/'.
+    """
+    if len(pack_summaries(repo_summary, budget)) == 1:
+        return repo_summary
+
+    packages = set()
+    for path in repo_summary:
+        directory = os.path.dirname(path)
+        while directory:
+            packages.add(directory)
+            directory = os.path.dirname(directory)
+
+    # Each package is summarized from its direct files and sub-packages
+    children: Dict[str, Dict[str, str]] = {package: {} for package in packages}
+    roots: Dict[str, str] = {}
+    for path, summary in repo_summary.items():
+        (children[os.path.dirname(path)] if os.path.dirname(path) else roots)[path] = summary
+
+    depths = sorted({package.count(os.sep) for package in packages}, reverse=True)
+    done = 0
+    for depth in depths:
+        check_cancelled(cancel_event)
+        level = sorted(package for package in packages if package.count(os.sep) == depth)
+
+        def summarize(item: Tuple[int, str]) -> str:
+            index, package = item
+            summary, _ = package_summary(package, children[package], budget, index % max(1, len(API_KEYS)))
+            return summary
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(level)))) as executor:
+            for package, summary in zip(level, executor.map(summarize, enumerate(level))):
+                parent = os.path.dirname(package)
+                (children[parent] if parent else roots)[f"{package}/"] = summary
+                done += 1
+                logger.info(f"Summarized package: {package}/")
+                if progress_callback is not None:
+                    progress_callback({
+                        "event": "reduced", "package": package, "done": done, "total": len(packages),
+                        "log": f"[✓] Summarized package: {package}/",
+                    })
+
+    reduced, _ = reduce_summaries("the repository", dict(sorted(roots.items())), budget)
+    return reduced
+
+
+def generate_readme(
+    root_dir: str = "temp_refactored_repo",
+    python_version: str = "3.12",
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> str:
     """
     Generates a professional README.md for the full repository using an LLM
     and saves it to the root directory.
 
+    Files are summarized in parallel. When their summaries do not fit one
+    request, they are first combined into package summaries (map-reduce), so
+    no request outgrows the context window however large the repository is.
+
     Args:
         root_dir (str): Path to the root directory of the repository.
         python_version (str): Python version to target in README context.
+        progress_callback (Callable, optional): Called with a progress event after each file.
+        cancel_event (threading.Event, optional): When set, stops before the next file.
 
     Returns:
         str: Generated README content.
@@ -56,8 +180,12 @@ def generate_readme(root_dir: str = "temp_refactored_repo", python_version: str
                     files_path.append(relative_path)
 
         # Generate summary and README content
-        repo_summary = generate_repo_summary(root_dir, files_path)
+        repo_summary = generate_repo_summary(root_dir, sorted(files_path), progress_callback, cancel_event)
         logger.info("Generated repository summary successfully.")
+        check_cancelled(cancel_event)
+        budget = min(README_REDUCE_TOKENS, readme_summary_budget(python_version), package_summary_budget())
+        repo_summary = reduce_repo_summary(repo_summary, budget, progress_callback, cancel_event)
+        check_cancelled(cancel_event)
         readme_content = generate_readme_from_repo_summary(repo_summary, python_version)
 
         # Save README.md to root_dir
@@ -1,22 +1,171 @@
-import os 
+import os
+import json
+import time
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Tuple, Optional
-from utils.github_utils import get_github_file_content
-from utils.llm_utils.refactor_file import refactor_code_or_test_file
+from typing import Any, Callable, Dict, List, Tuple, Optional
+from utils.github_utils import (
+    get_github_file_content,
+    get_branch_tree,
+    get_branch_head_sha,
+    branch_snapshot,
+    read_snapshot_file,
+)
+from utils.llm_utils.refactor_file import refactor_code_or_test_file, PROMPT_VERSION
+from utils.llm_utils.llm_cache import get_cache
+from utils.llm_utils.create_groq_client import API_KEYS
+from utils.llm_utils.prompt_packing import token_usage
+from services.local_drive_service import MANIFEST_FILE, PARTIAL_SUFFIX
 from loguru import logger
 
+MAX_WORKERS = int(os.getenv("REFACTOR_MAX_WORKERS", "4"))
+
+
+def is_test_file(file_path: str) -> bool:
+    """
+    Checks whether a repository path points to a test file.
+
+    Args:
+        file_path: Path of the file inside the repository.
+
+    Returns:
+        True if the file lives under a 'tests' folder or is named 'test_*'.
+    """
+    return "tests" in Path(file_path).parts or Path(file_path).name.startswith("test_")
+
+
+def load_manifest(output_dir: str) -> Optional[Dict[str, Any]]:
+    """
+    Loads the manifest written by the previous incremental run.
+
+    Args:
+        output_dir: Local output directory of the previous run.
+
+    Returns:
+        The manifest dictionary, or None if it is missing or unreadable.
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable manifest '{manifest_path}': {e}")
+        return None
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, Any]) -> None:
+    """
+    Writes the manifest of the current run into the output directory.
+
+    Args:
+        output_dir: Local output directory.
+        manifest: Source commit, settings and per-file blob SHAs of this run.
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def refactor_single_file(
+    owner: str,
+    repo: str,
+    branch: str,
+    file_path: str,
+    python_version: str,
+    key_index: int = 1,
+    snapshot_path: Optional[str] = None,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    stream_path: Optional[str] = None
+) -> Tuple[str, str, bool]:
+    """
+    Fetches one file from GitHub and refactors it if it is a Python file.
+
+    Never raises: failures are reported through the returned log message so
+    that one broken file does not abort the whole repository run.
+
+    Args:
+        owner: GitHub repo owner.
+        repo: GitHub repo name.
+        branch: Branch name or commit SHA to fetch the file from.
+        file_path: Path of the file in the repo.
+        python_version: Target Python version for refactoring.
+        key_index: API key index to start with.
+        snapshot_path: Local branch snapshot to read the file from instead of GitHub.
+        progress_callback: Receives 'fetching', 'fetched', 'cache-hit', 'llm-chunk' and 'llm-delta' events for this file.
+        stream_path: Where the refactored code is written while it streams (with LLM_STREAMING on).
+
+    Returns:
+        A tuple: (content to write, or None when it is already in stream_path; log message; success_flag)
+    """
+    try:
+        fetch_start = time.perf_counter()
+        if progress_callback is not None:
+            progress_callback({"event": "fetching", "file": file_path})
+        if snapshot_path:
+            content = read_snapshot_file(snapshot_path, file_path)
+        else:
+            content = get_github_file_content(owner, repo, file_path, branch)
+        if progress_callback is not None:
+            progress_callback({
+                "event": "fetched",
+                "file": file_path,
+                "bytes": len(content),
+                "seconds": round(time.perf_counter() - fetch_start, 3),
+            })
+
+        if os.path.splitext(file_path)[1] != ".py":
+            return content, f"[-] Skipped (not .py): {file_path}", True
+
+        refactored, _ = refactor_code_or_test_file(
+            code=content,
+            file_path=file_path,
+            python_version=python_version,
+            file_type='test' if is_test_file(file_path) else 'code',
+            key_index=key_index,
+            progress_callback=progress_callback,
+            stream_path=stream_path
+        )
+        return refactored, f"[✓] Refactored: {file_path}", True
+
+    except Exception as err:
+        return "", f"[x] Failed {file_path}: {err}", False
+
+
 def refactor_all_python_files_in_repo(
     owner: str,
     repo: str,
     branch: str,
     all_files: List[str],
     python_version: str,
-    output_dir: str = "temp_refactored_repo"
+    output_dir: str = "temp_refactored_repo",
+    max_workers: int = MAX_WORKERS,
+    incremental: bool = False,
+    use_snapshot: bool = False,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    cancel_event: Optional[threading.Event] = None
 ) -> Tuple[bool, Optional[str], List[str]]:
     """
     Refactors all Python files in a GitHub repository using LLM.
 
+    Files are fetched and refactored concurrently by a bounded pool of
+    `max_workers` threads, but results are written and logged in the order
+    of `all_files`, so the output is the same as a sequential run.
+
+    In incremental mode the blob SHAs of the branch are compared with the
+    manifest left in `output_dir` by the previous run: only added or modified
+    files are processed again, and files deleted from the branch are removed.
+    Without a usable manifest the whole repository is processed.
+
+    With `use_snapshot`, the branch is downloaded once as a tarball and files
+    are read from the local snapshot instead of one request per file.
+
     Args:
         owner: GitHub repo owner.
         repo: GitHub repo name.
@@ -24,55 +173,152 @@ def refactor_all_python_files_in_repo(
         all_files: List of file paths in the repo.
         python_version: Target Python version for refactoring.
         output_dir: Local output directory for refactored files.
+        max_workers: Number of files processed at the same time.
+        incremental: Only process files changed since the previous run.
+        use_snapshot: Read files from a single branch archive download.
+        progress_callback: Called with per-file events: 'queued' for every file up front,
+            'fetching'/'fetched'/'cache-hit'/'llm-chunk' from the workers (possibly out of
+            order), then 'written', 'unchanged' or 'failed' in file order with the file's
+            duration and the run's files-per-second so far.
+        cancel_event: When set, stops before the next file; finished files are kept.
 
     Returns:
         A tuple: (success_flag, output_dir_path or None, log_messages)
     """
-    if os.path.exists(output_dir):
+    manifest = load_manifest(output_dir) if incremental else None
+    if manifest and (
+        manifest.get("owner") != owner
+        or manifest.get("repo") != repo
+        or manifest.get("python_version") != python_version
+        or manifest.get("prompt_version") != PROMPT_VERSION
+    ):
+        logger.info("Previous manifest was made for another repo or settings; running a full refactor.")
+        manifest = None
+
+    if manifest is None and os.path.exists(output_dir):
         shutil.rmtree(output_dir)
 
     output_root = Path(output_dir)
     output_root.mkdir(parents=True, exist_ok=True)
 
     refactor_log: List[str] = []
-    key_index = 1
 
     try:
-        for file_path in all_files:
-            file_ext = os.path.splitext(file_path)[1]
-            try:
-                content = get_github_file_content(owner, repo, file_path, branch)
-
-                if file_ext == ".py":
-                    is_test_file = (
-                        "tests" in Path(file_path).parts or
-                        Path(file_path).name.startswith("test_")
-                    )
-                    file_type = 'test' if is_test_file else 'code'
-
-                    refactored, key_index = refactor_code_or_test_file(
-                        code=content,
-                        file_path=file_path,
-                        python_version=python_version,
-                        file_type=file_type,
-                        key_index=key_index
-                    )
-                    refactor_log.append(f"[✓] Refactored: {file_path}")
+        previous_files: Dict[str, str] = manifest["files"] if manifest else {}
+        blob_shas: Dict[str, str] = {}
+        commit_sha = None
+        ref = branch
+        if incremental:
+            # Pin the run to one commit: the tree, the contents and the manifest all describe
+            # the same state even if the branch moves while files are being refactored
+            commit_sha = get_branch_head_sha(owner, repo, branch)
+            ref = commit_sha
+            blob_shas = {path: sha for path, (sha, _) in get_branch_tree(owner, repo, commit_sha).items()}
+
+        unchanged = {
+            file_path for file_path in all_files
+            if file_path in previous_files
+            and previous_files[file_path] == blob_shas.get(file_path)
+            and (output_root / file_path).exists()
+        }
+        pending = [file_path for file_path in all_files if file_path not in unchanged]
+        if progress_callback is not None:
+            for file_path in all_files:
+                progress_callback({"event": "queued", "file": file_path, "total": len(all_files)})
+
+        # Held until the pool is done, so a concurrent refresh of the branch cannot remove files being read
+        snapshot = (
+            branch_snapshot(owner, repo, branch, refresh=True, ref=ref) if use_snapshot and pending else nullcontext()
+        )
+        processed_files: Dict[str, str] = {}
+        run_start = time.perf_counter()
+        file_starts: Dict[str, float] = {}
+
+        def process(item: Tuple[int, str]) -> Tuple[str, str, bool]:
+            index, file_path = item
+            file_starts[file_path] = time.perf_counter()
+            # Spread the files over the API keys so parallel workers don't
+            # all start on the same key.
+            return refactor_single_file(
+                owner, repo, ref, file_path, python_version,
+                key_index=index % max(1, len(API_KEYS)), snapshot_path=snapshot_path,
+                progress_callback=progress_callback,
+                stream_path=str(output_root / f"{file_path}{PARTIAL_SUFFIX}")
+            )
+
+        cancelled = False
+        with snapshot as snapshot_path, ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            results = executor.map(process, enumerate(pending))
+
+            for done, file_path in enumerate(all_files, start=1):
+                if cancel_event is not None and cancel_event.is_set():
+                    refactor_log.append(f"[!] Cancelled after {done - 1} of {len(all_files)} files")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    cancelled = True
+                    break
+
+                if file_path in unchanged:
+                    event, log_message, ok = "unchanged", f"[=] Unchanged: {file_path}", True
+                    refactor_log.append(log_message)
+                    processed_files[file_path] = previous_files[file_path]
                 else:
-                    refactored = content
-                    refactor_log.append(f"[-] Skipped (not .py): {file_path}")
-                logger.info(f"Processed {refactor_log[-1]} successfully.")
+                    refactored, log_message, ok = next(results)
+                    event = "written" if ok else "failed"
+                    refactor_log.append(log_message)
+                    logger.info(f"Processed {log_message}")
+                    if ok and file_path in blob_shas:
+                        processed_files[file_path] = blob_shas[file_path]
+
+                    # Write to output; a streamed refactor already holds the same content in its partial file
+                    full_path = output_root / Path(file_path)
+                    full_path.parent.mkdir(parents=True, exist_ok=True)
+                    partial_path = output_root / f"{file_path}{PARTIAL_SUFFIX}"
+                    if ok and partial_path.exists():
+                        os.replace(partial_path, full_path)
+                    else:
+                        with open(full_path, "w", encoding="utf-8") as f:
+                            f.write(refactored)
+
+                if progress_callback is not None:
+                    now = time.perf_counter()
+                    progress_callback({
+                        "event": event,
+                        "file": file_path,
+                        "done": done,
+                        "total": len(all_files),
+                        "log": log_message,
+                        "seconds": round(now - file_starts.get(file_path, now), 3),
+                        "files_per_second": round(done / max(now - run_start, 1e-6), 3),
+                    })
+
+        if cancelled:
+            # Leaving the pool waited for the files already in flight; drop what they streamed
+            for file_path in pending:
+                partial_path = output_root / f"{file_path}{PARTIAL_SUFFIX}"
+                if partial_path.exists():
+                    partial_path.unlink()
 
-            except Exception as err:
-                refactored = ""
-                refactor_log.append(f"[x] Failed {file_path}: {err}")
+        if incremental:
+            for removed_path in sorted(set(previous_files) - set(blob_shas)):
+                removed_file = output_root / removed_path
+                if removed_file.exists():
+                    removed_file.unlink()
+                refactor_log.append(f"[-] Removed: {removed_path}")
 
-            # Write to output
-            full_path = output_root / Path(file_path)
-            full_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(full_path, "w", encoding="utf-8") as f:
-                f.write(refactored)
+            save_manifest(output_dir, {
+                "owner": owner,
+                "repo": repo,
+                "branch": branch,
+                "python_version": python_version,
+                "prompt_version": PROMPT_VERSION,
+                "commit_sha": commit_sha,
+                "files": processed_files,
+            })
 
+        cache = get_cache("refactor")
+        if cache is not None:
+            logger.info(f"Refactor cache stats: {cache.stats()}")
+        logger.info(f"LLM token usage: {token_usage.stats()}")
         return True, str(output_root), refactor_log
 
     except Exception as e:
@@ -0,0 +1,391 @@
+import os
+import ast
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+ANALYSIS_MAX_FUNCTION_LINES = int(os.getenv("ANALYSIS_MAX_FUNCTION_LINES", "50"))
+ANALYSIS_MAX_COMPLEXITY = int(os.getenv("ANALYSIS_MAX_COMPLEXITY", "10"))
+ANALYSIS_MAX_NESTING = int(os.getenv("ANALYSIS_MAX_NESTING", "4"))
+ANALYSIS_MAX_ARGS = int(os.getenv("ANALYSIS_MAX_ARGS", "6"))
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", str(os.cpu_count() or 1)))
+
+# Numbers common enough that they are not "magic"
+ALLOWED_NUMBERS = {-1, 0, 1, 2, 10, 100}
+MAX_MAGIC_NUMBER_FINDINGS = 20
+# Below this many files, starting worker processes costs more than it saves
+MIN_FILES_PER_WORKER = 8
+
+OUTDATED_TYPING = {"List", "Dict", "Set", "FrozenSet", "Tuple", "Type", "DefaultDict", "Deque"}
+NESTING_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.With, ast.AsyncWith, ast.Try, ast.Match)
+BRANCH_NODES = (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler, ast.match_case, ast.Assert)
+MUTABLE_LITERALS = (ast.List, ast.Dict, ast.Set, ast.ListComp, ast.DictComp, ast.SetComp)
+
+# Categories the static pass covers, so the LLM can be told to skip them
+STATIC_RULES = {
+    "mutable-default-arg": "mutable default arguments",
+    "bare-except": "bare `except:` clauses",
+    "broad-except": "catching `Exception`/`BaseException`",
+    "swallowed-exception": "exceptions silently ignored",
+    "long-function": "long functions",
+    "high-complexity": "high cyclomatic complexity",
+    "deep-nesting": "deep nesting",
+    "too-many-args": "functions with too many parameters",
+    "magic-number": "magic numbers",
+    "hardcoded-address": "hard-coded IP addresses and URLs",
+    "none-comparison": "`== None` comparisons",
+    "type-comparison": "`type(x) == ...` comparisons",
+    "wildcard-import": "wildcard imports",
+    "outdated-typing": "`typing.List`/`Dict`-style annotations",
+    "percent-format": "`%` string formatting",
+    "eval-used": "`eval`/`exec` calls",
+    "global-statement": "`global` statements",
+    "assert-tuple": "asserts on a tuple (always true)",
+}
+
+
+class Finding(NamedTuple):
+    rule: str
+    line: int
+    message: str
+    symbol: Optional[str] = None
+
+
+class FunctionMetrics(NamedTuple):
+    name: str
+    line: int
+    lines: int
+    complexity: int
+    max_nesting: int
+    args: int
+
+
+class StaticAnalysis(NamedTuple):
+    file_path: str
+    findings: List[Finding]
+    functions: List[FunctionMetrics]
+    metrics: Dict[str, Any]
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "file_path": self.file_path,
+            "findings": [finding._asdict() for finding in self.findings],
+            "functions": [function._asdict() for function in self.functions],
+            "metrics": self.metrics,
+            "error": self.error,
+        }
+
+
+class _Scope:
+    """Metrics of the function being walked."""
+
+    def __init__(self, node: ast.AST):
+        self.node = node
+        self.complexity = 1
+        self.depth = 0
+        self.max_nesting = 0
+
+
+class _Analyzer(ast.NodeVisitor):
+    """Collects findings and per-function metrics in a single walk of the tree."""
+
+    def __init__(self):
+        self.findings: List[Finding] = []
+        self.functions: List[FunctionMetrics] = []
+        self.scopes: List[_Scope] = []
+        self.names: List[str] = []
+        self.magic_numbers = 0
+        self.constant_assignments: set = set()
+
+    def add(self, rule: str, node: ast.AST, message: str) -> None:
+        symbol = ".".join(self.names) or None
+        self.findings.append(Finding(rule, getattr(node, "lineno", 0), message, symbol))
+
+    # Definitions
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.names.append(node.name)
+        self.generic_visit(node)
+        self.names.pop()
+
+    def visit_FunctionDef(self, node: ast.AST) -> None:
+        self.names.append(node.name)
+        args = node.args
+        for default in [*args.defaults, *(d for d in args.kw_defaults if d is not None)]:
+            if isinstance(default, MUTABLE_LITERALS) or (
+                isinstance(default, ast.Call) and isinstance(default.func, ast.Name)
+                and default.func.id in ("list", "dict", "set") and not default.args
+            ):
+                self.add("mutable-default-arg", default, f"`{node.name}` has a mutable default argument; use None and create it inside.")
+
+        count = len(args.posonlyargs) + len(args.args) + len(args.kwonlyargs)
+        if args.args and args.args[0].arg in ("self", "cls"):
+            count -= 1
+
+        scope = _Scope(node)
+        self.scopes.append(scope)
+        for statement in node.body:
+            self.visit(statement)
+        self.scopes.pop()
+        for decorator in node.decorator_list:
+            self.visit(decorator)
+        self.visit(node.args)
+
+        lines = (node.end_lineno or node.lineno) - node.lineno + 1
+        self.functions.append(FunctionMetrics(".".join(self.names), node.lineno, lines, scope.complexity, scope.max_nesting, count))
+        if lines > ANALYSIS_MAX_FUNCTION_LINES:
+            self.add("long-function", node, f"`{node.name}` is {lines} lines long (limit {ANALYSIS_MAX_FUNCTION_LINES}).")
+        if scope.complexity > ANALYSIS_MAX_COMPLEXITY:
+            self.add("high-complexity", node, f"`{node.name}` has cyclomatic complexity {scope.complexity} (limit {ANALYSIS_MAX_COMPLEXITY}).")
+        if scope.max_nesting > ANALYSIS_MAX_NESTING:
+            self.add("deep-nesting", node, f"`{node.name}` nests blocks {scope.max_nesting} levels deep (limit {ANALYSIS_MAX_NESTING}).")
+        if count > ANALYSIS_MAX_ARGS:
+            self.add("too-many-args", node, f"`{node.name}` takes {count} parameters (limit {ANALYSIS_MAX_ARGS}).")
+        self.names.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    # Complexity and nesting
+
+    def generic_visit(self, node: ast.AST) -> None:
+        scope = self.scopes[-1] if self.scopes else None
+        if scope is not None:
+            if isinstance(node, BRANCH_NODES):
+                scope.complexity += 1
+            elif isinstance(node, ast.BoolOp):
+                scope.complexity += len(node.values) - 1
+            elif isinstance(node, ast.comprehension):
+                scope.complexity += 1 + len(node.ifs)
+
+        nests = scope is not None and isinstance(node, NESTING_NODES)
+        if nests:
+            # `elif` is a nested If in the tree but not deeper in the code
+            scope.depth += 1
+            scope.max_nesting = max(scope.max_nesting, scope.depth)
+        super().generic_visit(node)
+        if nests:
+            scope.depth -= 1
+
+    def visit_If(self, node: ast.If) -> None:
+        scope = self.scopes[-1] if self.scopes else None
+        if scope is not None and len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+            scope.complexity += 1
+            scope.depth += 1
+            scope.max_nesting = max(scope.max_nesting, scope.depth)
+            self.visit(node.test)
+            for statement in node.body:
+                self.visit(statement)
+            scope.depth -= 1
+            self.visit_If(node.orelse[0])
+            return
+        self.generic_visit(node)
+
+    # Rules
+
+    def visit_ExceptHandler(self, node: ast.ExceptHandler) -> None:
+        if node.type is None:
+            self.add("bare-except", node, "Bare `except:` also catches SystemExit and KeyboardInterrupt; catch specific exceptions.")
+        elif isinstance(node.type, ast.Name) and node.type.id in ("Exception", "BaseException"):
+            self.add("broad-except", node, f"Catching `{node.type.id}` hides unrelated errors; catch specific exceptions.")
+        if all(isinstance(s, ast.Pass) or (isinstance(s, ast.Expr) and isinstance(s.value, ast.Constant)) for s in node.body):
+            self.add("swallowed-exception", node, "The exception is silently ignored.")
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare) -> None:
+        for op, right in zip(node.ops, node.comparators):
+            if isinstance(op, (ast.Eq, ast.NotEq)):
+                if isinstance(right, ast.Constant) and right.value is None:
+                    self.add("none-comparison", node, "Compare with None using `is` / `is not`.")
+                if isinstance(node.left, ast.Call) and isinstance(node.left.func, ast.Name) and node.left.func.id == "type":
+                    self.add("type-comparison", node, "Use `isinstance()` instead of comparing `type()`.")
+        self.generic_visit(node)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        if any(alias.name == "*" for alias in node.names):
+            self.add("wildcard-import", node, f"`from {node.module} import *` hides where names come from.")
+        if node.module == "typing":
+            outdated = sorted(alias.name for alias in node.names if alias.name in OUTDATED_TYPING)
+            if outdated:
+                self.add("outdated-typing", node, f"`typing.{', typing.'.join(outdated)}` are deprecated; use the built-in generics (list[int], dict[str, int]...).")
+        self.generic_visit(node)
+
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        if isinstance(node.op, ast.Mod) and isinstance(node.left, ast.Constant) and isinstance(node.left.value, str):
+            self.add("percent-format", node, "`%` string formatting is outdated; use an f-string.")
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        if isinstance(node.func, ast.Name) and node.func.id in ("eval", "exec"):
+            self.add("eval-used", node, f"`{node.func.id}()` runs arbitrary code.")
+        self.generic_visit(node)
+
+    def visit_Global(self, node: ast.Global) -> None:
+        self.add("global-statement", node, f"`global {', '.join(node.names)}` couples functions through module state.")
+        self.generic_visit(node)
+
+    def visit_Assert(self, node: ast.Assert) -> None:
+        if isinstance(node.test, ast.Tuple) and node.test.elts:
+            self.add("assert-tuple", node, "Asserting a non-empty tuple is always true.")
+        self.generic_visit(node)
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        # NAME = 42 at any level is a named constant, not a magic number
+        if all(isinstance(t, ast.Name) and t.id.isupper() for t in node.targets):
+            self.constant_assignments.add(id(node.value))
+        self.generic_visit(node)
+
+    def visit_Constant(self, node: ast.Constant) -> None:
+        value = node.value
+        if isinstance(value, str):
+            if _looks_like_address(value):
+                self.add("hardcoded-address", node, f"Hard-coded address `{value}`; read it from configuration.")
+        elif (
+            isinstance(value, (int, float)) and not isinstance(value, bool)
+            and value not in ALLOWED_NUMBERS and id(node) not in self.constant_assignments
+            and self.scopes and self.magic_numbers < MAX_MAGIC_NUMBER_FINDINGS
+        ):
+            self.magic_numbers += 1
+            self.add("magic-number", node, f"Magic number `{value}`; give it a named constant.")
+
+
+def _looks_like_address(value: str) -> bool:
+    if value.startswith(("http://", "https://")) and "localhost" not in value and len(value) < 300:
+        return True
+    parts = value.split(".")
+    return len(parts) == 4 and all(part.isdigit() and int(part) < 256 for part in parts) and value != "0.0.0.0"
+
+
+def analyze_source(code: str, file_path: str = "") -> StaticAnalysis:
+    """
+    Finds common issues in Python code and computes its complexity metrics, without running it.
+
+    The tree is walked once. Findings cover mutable default arguments, bare or
+    broad excepts, long, complex or deeply nested functions, magic numbers,
+    hard-coded addresses and a few outdated idioms (see STATIC_RULES).
+
+    Args:
+        code: Python source code.
+        file_path: Path of the file, for the report.
+
+    Returns:
+        StaticAnalysis with findings sorted by line, per-function metrics and file
+        metrics; `error` is set when the code does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        line = getattr(e, "lineno", 0) or 0
+        return StaticAnalysis(file_path, [Finding("syntax-error", line, f"The file does not parse: {e}")], [], {"lines": len(code.splitlines())}, str(e))
+
+    analyzer = _Analyzer()
+    analyzer.visit(tree)
+
+    functions = sorted(analyzer.functions, key=lambda f: f.line)
+    complexities = [f.complexity for f in functions]
+    metrics = {
+        "lines": len(code.splitlines()),
+        "functions": len(functions),
+        "classes": sum(isinstance(node, ast.ClassDef) for node in ast.walk(tree)),
+        "max_complexity": max(complexities, default=0),
+        "mean_complexity": round(sum(complexities) / len(complexities), 2) if complexities else 0.0,
+        "max_nesting": max((f.max_nesting for f in functions), default=0),
+        "max_function_lines": max((f.lines for f in functions), default=0),
+    }
+    findings = sorted(analyzer.findings, key=lambda f: (f.line, f.rule))
+    return StaticAnalysis(file_path, findings, functions, metrics)
+
+
+def format_static_report(analysis: StaticAnalysis) -> str:
+    """
+    Renders a static analysis as Markdown.
+
+    Args:
+        analysis: Result of `analyze_source`.
+
+    Returns:
+        A 'Static analysis' section listing findings by line, followed by the file metrics.
+    """
+    lines = ["### Static analysis"]
+    if analysis.findings:
+        lines += [
+            f"- Line {f.line}: {f.message} (`{f.rule}`{f', in `' + f.symbol + '`' if f.symbol else ''})"
+            for f in analysis.findings
+        ]
+    else:
+        lines.append("- No issues found by the static checks.")
+    metrics = analysis.metrics
+    if "functions" in metrics:
+        lines.append(
+            f"\n**Metrics:** {metrics['lines']} lines, {metrics['functions']} functions, {metrics['classes']} classes; "
+            f"max complexity {metrics['max_complexity']} (mean {metrics['mean_complexity']}), "
+            f"max nesting {metrics['max_nesting']}, longest function {metrics['max_function_lines']} lines."
+        )
+    return "\n".join(lines)
+
+
+def _analyze_path(item: tuple) -> Dict[str, Any]:
+    root_dir, relative_path = item
+    try:
+        with open(os.path.join(root_dir, relative_path), "r", encoding="utf-8") as f:
+            code = f.read()
+    except (OSError, UnicodeDecodeError) as e:
+        return StaticAnalysis(relative_path, [], [], {}, f"Could not read file: {e}").to_dict()
+    return analyze_source(code, relative_path).to_dict()
+
+
+def analyze_directory(root_dir: str, max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Statically analyzes every Python file under a directory, in a process pool.
+
+    Args:
+        root_dir: Directory to scan recursively.
+        max_workers: Worker processes (default ANALYSIS_WORKERS); small directories are analyzed in-process.
+
+    Returns:
+        Dict with 'files' (relative path -> analysis dict) and 'summary' (file,
+        finding and per-rule counts, and the most complex functions).
+
+    Raises:
+        FileNotFoundError: If root_dir does not exist.
+    """
+    if not os.path.isdir(root_dir):
+        raise FileNotFoundError(f"Directory '{root_dir}' does not exist.")
+
+    paths = sorted(
+        os.path.relpath(os.path.join(dirpath, filename), root_dir)
+        for dirpath, _, filenames in os.walk(root_dir)
+        for filename in filenames
+        if filename.endswith(".py")
+    )
+    items = [(root_dir, path) for path in paths]
+    workers = max(1, min(max_workers or ANALYSIS_WORKERS, len(items) // MIN_FILES_PER_WORKER))
+    if workers == 1:
+        results = [_analyze_path(item) for item in items]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_analyze_path, items, chunksize=max(1, len(items) // (workers * 4))))
+    logger.info(f"Statically analyzed {len(items)} files in {root_dir} with {workers} process(es).")
+
+    rules: Dict[str, int] = {}
+    for result in results:
+        for finding in result["findings"]:
+            rules[finding["rule"]] = rules.get(finding["rule"], 0) + 1
+    functions = sorted(
+        ({**function, "file_path": result["file_path"]} for result in results for function in result["functions"]),
+        key=lambda f: f["complexity"],
+        reverse=True,
+    )
+    return {
+        "files": {result["file_path"]: result for result in results},
+        "summary": {
+            "files": len(results),
+            "findings": sum(rules.values()),
+            "rules": dict(sorted(rules.items(), key=lambda item: -item[1])),
+            "unparsable": [result["file_path"] for result in results if result["error"]],
+            "most_complex": functions[:10],
+        },
+    }
@@ -0,0 +1,74 @@
+import ast
+import textwrap
+
+from utils.llm_utils.ast_chunker import chunk_python_source, join_chunks, import_header
+
+MODULE = '''import os
+from typing import List
+
+
+@decorator
+def first() -> None:
+    return None
+
+
+class Second(Base):
+    """A class with many methods."""
+
+    def one(self):
+        return os.getcwd()
+
+    def two(self):
+        return 2
+
+    def three(self):
+        return 3
+
+
+def third(values: List[int]) -> int:
+    return sum(values)
+'''
+
+
+def non_blank(text):
+    return [line for line in text.splitlines() if line.strip()]
+
+
+def test_small_file_is_one_chunk_without_context():
+    chunks = chunk_python_source(MODULE, max_tokens=10_000)
+    assert len(chunks) == 1
+    assert chunks[0].body == MODULE and chunks[0].context == ""
+
+
+def test_chunks_follow_top_level_boundaries_and_rebuild_the_file():
+    chunks = chunk_python_source(MODULE, max_tokens=60)
+
+    assert len(chunks) > 1
+    rebuilt = "".join(textwrap.indent(chunk.body, chunk.indent) for chunk in chunks)
+    assert non_blank(rebuilt) == non_blank(MODULE)
+    for chunk in chunks:
+        ast.parse(chunk.body)
+
+
+def test_large_class_is_split_between_methods_with_its_signature():
+    chunks = chunk_python_source(MODULE, max_tokens=45)
+
+    members = [chunk for chunk in chunks if chunk.indent]
+    assert members
+    assert all(chunk.body.startswith("def ") for chunk in members)
+    assert all("class Second(Base):" in chunk.context for chunk in members)
+    assert all("import os" in chunk.context for chunk in members)
+    ast.parse(join_chunks([chunk.body for chunk in chunks], chunks))
+
+
+def test_syntax_errors_fall_back_to_line_chunks():
+    code = "import os\n\ndef broken(:\n" + "x = 1\n" * 200
+    chunks = chunk_python_source(code, max_tokens=50)
+
+    assert len(chunks) > 1
+    assert "".join(chunk.body for chunk in chunks) == code
+    assert chunks[1].context == "import os"
+
+
+def test_import_header():
+    assert import_header(MODULE) == "import os\nfrom typing import List"
@@ -0,0 +1,157 @@
+import os
+import random
+import threading
+from unittest.mock import patch
+
+import pytest
+
+import utils.llm_utils.create_groq_client as groq_client
+from devtools.fake_llm_server import FakeLLMServer
+from utils.llm_utils.ast_chunker import chunk_python_source, join_chunks
+from utils.llm_utils.code_stream import FencedCodeExtractor, StreamingCodeWriter, LLMOutputTruncatedError
+from utils.llm_utils.llm_cache import LLMResultCache
+from utils.llm_utils.llm_scheduler import StopStream
+from utils.llm_utils.refactor_file import clean_llm_code_output, refactor_code_or_test_file
+
+MODULE = '''import os
+
+
+class Store:
+    def load(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def save(self, path, data):
+        with open(path, "w") as f:
+            f.write(data)
+
+        return len(data)
+
+
+def main():
+    return Store().load(os.sep)
+'''
+
+
+def feed_in_pieces(extractor, text, seed=0):
+    rng = random.Random(seed)
+    out, i = "", 0
+    while i < len(text):
+        size = rng.randint(1, 7)
+        out += extractor.feed(text[i:i + size])
+        i += size
+    return out + extractor.finish()
+
+
+@pytest.mark.parametrize("reply", [
+    "Sure!\n```python\n\n    x = 1\n\ndef f():\n    return '``'\n```\nHope this helps.",
+    "```\nplain = True\n```",
+    "```bash\npip install x\n```\n```python\r\ny = 2\r\n```",
+    "no fences at all\n",
+])
+def test_extractor_matches_whole_reply_cleaning(reply):
+    assert feed_in_pieces(FencedCodeExtractor(), reply) == clean_llm_code_output(reply)
+
+
+def test_writer_streams_parallel_chunks_in_file_order(tmp_path):
+    chunks = chunk_python_source(MODULE, max_tokens=25)
+    assert len(chunks) > 2 and any(chunk.indent for chunk in chunks)
+    replies = [f"Here you go:\n```python\n{chunk.body}\n```\nDone." for chunk in chunks]
+    path = str(tmp_path / "out.py.partial")
+    sent = []
+    writer = StreamingCodeWriter(chunks, path=path, on_text=sent.append, event_interval=0)
+
+    def stream(part, reply):
+        try:
+            for i in range(0, len(reply), 5):
+                writer.feed(part, reply[i:i + 5])
+        except StopStream:
+            pass
+
+    # Later chunks finish first; their code must wait for the earlier ones
+    threads = [threading.Thread(target=stream, args=(part, reply)) for part, reply in reversed(list(enumerate(replies, 1)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Written to the file only, not kept in memory
+    assert writer.finish() is None
+    code = join_chunks([clean_llm_code_output(reply) for reply in replies], chunks)
+    assert open(path).read() == code == "".join(sent)
+    assert writer.chars_written == len(code)
+
+    in_memory = StreamingCodeWriter(chunks)
+    for part, reply in enumerate(replies, 1):
+        try:
+            in_memory.feed(part, reply)
+        except StopStream:
+            pass
+    assert in_memory.finish() == code
+
+
+def test_writer_rejects_truncated_and_runaway_replies(tmp_path):
+    chunks = chunk_python_source("x = 1\n", max_tokens=100)
+    path = str(tmp_path / "out.py.partial")
+
+    writer = StreamingCodeWriter(chunks, path=path)
+    writer.feed(1, "```python\nx = 1\ny = ")
+    with pytest.raises(LLMOutputTruncatedError):
+        writer.finish()
+    writer.abort()
+    assert not os.path.exists(path)
+
+    writer = StreamingCodeWriter(chunks, max_growth=1)
+    with pytest.raises(LLMOutputTruncatedError):
+        writer.feed(1, "```python\n" + "z = 0\n" * 1000)
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    with FakeLLMServer(tokens_per_second=20000) as server:
+        monkeypatch.setattr(groq_client, "API_KEYS", ["key-a"])
+        monkeypatch.setattr(groq_client, "MODEL", "fake-model")
+        monkeypatch.setattr(groq_client, "BASE_URL", server.url)
+        monkeypatch.setattr(groq_client, "_clients", {})
+        yield server
+
+
+@patch("utils.llm_utils.refactor_file.get_cache", return_value=None)
+@patch("utils.llm_utils.refactor_file.LLM_STREAMING", True)
+def test_streamed_refactor_writes_file_as_it_arrives(mock_cache, fake_llm, tmp_path):
+    path = str(tmp_path / "a.py.partial")
+    events = []
+
+    code, _ = refactor_code_or_test_file(MODULE, "a.py", progress_callback=events.append, stream_path=path)
+
+    # Without a cache the code is only in the file
+    assert code is None
+    assert open(path).read() == MODULE.strip()
+    assert "".join(e["text"] for e in events if e["event"] == "llm-delta") == MODULE.strip()
+    chunk_event = next(e for e in events if e["event"] == "llm-chunk")
+    assert 0 <= chunk_event["first_token_seconds"] <= chunk_event["seconds"]
+
+
+@patch("utils.llm_utils.refactor_file.LLM_STREAMING", True)
+def test_streamed_refactor_is_read_back_for_the_cache(fake_llm, tmp_path):
+    cache = LLMResultCache(path=str(tmp_path / "cache.sqlite3"), namespace="refactor")
+    path = str(tmp_path / "a.py.partial")
+
+    with patch("utils.llm_utils.refactor_file.get_cache", return_value=cache):
+        code, _ = refactor_code_or_test_file(MODULE, "a.py", stream_path=path)
+        cached, _ = refactor_code_or_test_file(MODULE, "a.py")
+
+    assert code == cached == open(path).read() == MODULE.strip()
+    assert cache.stats()["hits"] == 1
+
+
+@patch("utils.llm_utils.refactor_file.get_cache", return_value=None)
+@patch("utils.llm_utils.refactor_file.LLM_STREAMING", True)
+@patch("utils.llm_utils.refactor_file.LLM_MAX_OUTPUT_TOKENS", 20)
+def test_streamed_refactor_cut_at_output_limit_fails(mock_cache, fake_llm, tmp_path):
+    path = str(tmp_path / "a.py.partial")
+
+    with pytest.raises(LLMOutputTruncatedError):
+        refactor_code_or_test_file(MODULE, "a.py", stream_path=path)
+
+    assert not os.path.exists(path)
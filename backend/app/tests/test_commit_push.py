@@ -2,14 +2,15 @@ import os
 import pytest
 from unittest.mock import patch, MagicMock
 
-from services.git_commit_push_service import commit_and_push_file_service
+from devtools.fake_github_server import FakeGitHubServer
+from services.git_commit_push_service import commit_and_push_file_service, commit_and_push_batch_service
+from utils.github_client import github_client
+from utils.github_utils import git_blob_sha
 
-# Mock get_all_refactored_files to avoid actual file reads
-def mock_get_all_refactored_files(base_path):
-    return {
-        "file1.py": "print('Hello World')",
-        "file2.txt": "Some text content"
-    }
+# Local files to push
+def write_refactored_files(base_path):
+    (base_path / "file1.py").write_bytes(b"print('Hello World')")
+    (base_path / "file2.txt").write_bytes(b"Some text content")
 
 # Mock create_branch to just return True
 def mock_create_branch(owner, repo, branch, from_branch="main"):
@@ -21,13 +22,13 @@ def set_env_token():
     yield
     del os.environ["GITHUB_TOKEN"]
 
-@patch("services.git_commit_push_service.get_all_refactored_files", side_effect=mock_get_all_refactored_files)
 @patch("services.git_commit_push_service.create_branch", side_effect=mock_create_branch)
-@patch("services.git_commit_push_service.requests.put")
-@patch("services.git_commit_push_service.requests.get")
-def test_commit_and_push(mock_get, mock_put, mock_create_branch_func, mock_get_files):
-    # Mock GET request to simulate that file does not already exist (so no sha needed)
-    mock_get.return_value = MagicMock(status_code=404, json=lambda: {})
+@patch("services.git_commit_push_service.github_client.put")
+@patch("services.git_commit_push_service.get_branch_tree")
+def test_commit_and_push(mock_get_tree, mock_put, mock_create_branch_func, tmp_path):
+    write_refactored_files(tmp_path)
+    # Mock the branch tree to simulate that the files do not already exist (so no sha needed)
+    mock_get_tree.return_value = {}
 
     # Mock PUT request to simulate successful commit
     mock_put.return_value = MagicMock(status_code=201, text="Success")
@@ -37,8 +38,118 @@ def test_commit_and_push(mock_get, mock_put, mock_create_branch_func, mock_get_f
         repo="test_repo",
         commit_message="Test commit",
         branch="test_branch",
-        base_branch="main"
+        base_branch="main",
+        base_path=str(tmp_path)
     )
 
     assert result == "Committed all file successfully"
     mock_create_branch_func.assert_called_once_with("test_owner", "test_repo", "test_branch", from_branch="main")
+
+
+# ---------------------single commit push against a fake GitHub API----------------
+
+def test_git_blob_sha_matches_git():
+    # `printf 'hello world\n' | git hash-object --stdin`
+    assert git_blob_sha(b"hello world\n") == "3b18e512dba79e4c8300dd08aeb37f8e728b8dad"
+
+
+@patch("services.git_commit_push_service.create_branch", side_effect=mock_create_branch)
+@patch("services.git_commit_push_service.github_client.put")
+@patch("services.git_commit_push_service.get_branch_tree")
+def test_commit_and_push_skips_unchanged_files(mock_get_tree, mock_put, mock_create_branch_func, tmp_path):
+    write_refactored_files(tmp_path)
+    mock_get_tree.return_value = {
+        "file1.py": (git_blob_sha(b"print('Hello World')"), "100644"),
+        "file2.txt": (git_blob_sha(b"Old text content"), "100644"),
+    }
+    mock_put.return_value = MagicMock(status_code=200, text="Success")
+
+    result = commit_and_push_file_service("test_owner", "test_repo", "Test commit", "test_branch", base_path=str(tmp_path))
+
+    assert result == "Committed all file successfully"
+    assert mock_put.call_count == 1
+    payload = mock_put.call_args.kwargs["json"]
+    assert mock_put.call_args.args[0].endswith("/contents/file2.txt")
+    assert payload["sha"] == git_blob_sha(b"Old text content")
+
+
+def test_batch_commit_creates_single_commit(monkeypatch, tmp_path):
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("print('refactored')\n")
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00")
+    (tmp_path / "README.md").write_bytes(b"# Demo\n")
+
+    with FakeGitHubServer() as server:
+        fake_repo = server.add_repo("owner", "repo", {"README.md": b"# Demo\n", "src/app.py": b"print('old')\n"})
+        monkeypatch.setattr(github_client, "api_url", server.url)
+
+        result = commit_and_push_batch_service(
+            "owner", "repo", "Refactor", branch="refactored", base_branch="main", base_path=str(tmp_path)
+        )
+
+    assert result.startswith("Committed 2 files in a single commit")
+    head = fake_repo.commits[fake_repo.branches["refactored"]]
+    assert head["message"] == "Refactor"
+    assert head["parents"] == [fake_repo.branches["main"]]
+
+    files = fake_repo.branch_files("refactored")
+    assert fake_repo.blobs[files["src/app.py"]] == b"print('refactored')\n"
+    assert fake_repo.blobs[files["logo.png"]] == b"\x89PNG\r\n\x1a\n\x00"
+    assert fake_repo.blobs[files["README.md"]] == b"# Demo\n"
+    assert server.requests["POST git/commits"] == 1
+    assert server.requests["PATCH git/refs"] == 1
+    # README.md is identical to the branch, so no blob is uploaded for it
+    assert server.requests["POST git/blobs"] == 2
+    assert "PUT contents" not in server.requests
+
+
+def test_batch_commit_skips_when_nothing_changed(monkeypatch, tmp_path):
+    (tmp_path / "README.md").write_bytes(b"# Demo\n")
+
+    with FakeGitHubServer() as server:
+        fake_repo = server.add_repo("owner", "repo", {"README.md": b"# Demo\n"})
+        monkeypatch.setattr(github_client, "api_url", server.url)
+
+        result = commit_and_push_batch_service(
+            "owner", "repo", "Refactor", branch="refactored", base_branch="main", base_path=str(tmp_path)
+        )
+
+    assert result == "No changes to commit on 'refactored'"
+    assert fake_repo.branches["refactored"] == fake_repo.branches["main"]
+    assert "POST git/blobs" not in server.requests
+
+
+def test_batch_commit_keeps_file_modes(monkeypatch, tmp_path):
+    (tmp_path / "run.sh").write_bytes(b"#!/bin/sh\necho refactored\n")
+    (tmp_path / "new.py").write_bytes(b"print('new')\n")
+
+    with FakeGitHubServer() as server:
+        fake_repo = server.add_repo(
+            "owner", "repo", {"run.sh": b"#!/bin/sh\necho old\n"}, modes={"run.sh": "100755"}
+        )
+        monkeypatch.setattr(github_client, "api_url", server.url)
+
+        result = commit_and_push_batch_service(
+            "owner", "repo", "Refactor", branch="refactored", base_branch="main", base_path=str(tmp_path)
+        )
+
+    assert result.startswith("Committed 2 files in a single commit")
+    assert fake_repo.branch_modes("refactored") == {"run.sh": "100755", "new.py": "100644"}
+
+
+def test_commit_and_push_compares_raw_bytes(monkeypatch, tmp_path):
+    crlf, latin1 = b"print('hi')\r\n", "caf\xe9 = 1\n".encode("latin-1")
+    (tmp_path / "crlf.py").write_bytes(crlf)
+    (tmp_path / "latin1.py").write_bytes(latin1)
+
+    with FakeGitHubServer() as server:
+        fake_repo = server.add_repo("owner", "repo", {"crlf.py": crlf, "latin1.py": b"old\n"})
+        monkeypatch.setattr(github_client, "api_url", server.url)
+
+        result = commit_and_push_file_service("owner", "repo", "Refactor", "refactored", base_path=str(tmp_path))
+
+    assert result == "Committed all file successfully"
+    # crlf.py is byte-identical to the branch, so only latin1.py is pushed, unchanged
+    assert server.requests["PUT contents"] == 1
+    assert fake_repo.blobs[fake_repo.branch_files("refactored")["latin1.py"]] == latin1
+
@@ -0,0 +1,94 @@
+import zipfile
+
+import pytest
+
+from utils.distribution_index import (
+    CURATED_DISTRIBUTIONS, DEFAULT_INDEX_PATH, DistributionIndex, write_index, rebuild_index, load_package_list,
+    distribution_index
+)
+from utils.import_scanner import resolve_distribution
+
+
+def make_wheel(path, name, files, top_level=None):
+    dist_info = f"{name.replace('-', '_')}-1.0.dist-info"
+    with zipfile.ZipFile(path, "w") as wheel:
+        for file in files:
+            wheel.writestr(file, "")
+        wheel.writestr(f"{dist_info}/METADATA", f"Metadata-Version: 2.1\nName: {name}\nVersion: 1.0\n")
+        if top_level is not None:
+            wheel.writestr(f"{dist_info}/top_level.txt", top_level)
+        wheel.writestr(f"{dist_info}/RECORD", "")
+
+
+def test_index_round_trip(tmp_path):
+    path = str(tmp_path / "index.bin")
+    mapping = {f"module_{i}": [f"dist-{i}"] for i in range(500)}
+    mapping["google"] = ["protobuf", "google-auth"]
+
+    assert write_index(mapping, path) == 501
+    index = DistributionIndex(path)
+    assert not index._loaded
+
+    assert index.get("module_123") == ["dist-123"]
+    assert index.get("google") == ["protobuf", "google-auth"]
+    assert index.get("module_500") == []
+    # Curated renames do not need the file
+    assert index.get("sklearn") == ["scikit-learn"]
+    assert len(index) == 501
+    index.close()
+
+
+def test_missing_index_falls_back_to_curated_table(tmp_path):
+    index = DistributionIndex(str(tmp_path / "missing.bin"))
+
+    assert index.get("cv2") == ["opencv-python"]
+    assert index.get("requests") == [] and len(index) == 0
+
+
+def test_rebuild_from_wheel_cache(tmp_path):
+    wheels = tmp_path / "wheels" / "ab" / "cd"
+    wheels.mkdir(parents=True)
+    make_wheel(wheels / "fancy_lib-1.0-py3-none-any.whl", "fancy-lib", ["fancylib/__init__.py", "fancylib/core.py"])
+    make_wheel(wheels / "tool-1.0-py3-none-any.whl", "tool", ["tool.py", "_speedups.so"], top_level="tool\n_speedups\n")
+    path = str(tmp_path / "index.bin")
+
+    count = rebuild_index(str(tmp_path / "wheels"), include_installed=False, path=path)
+
+    index = DistributionIndex(path)
+    assert index.get("fancylib") == ["fancy-lib"] and index.get("tool") == ["tool"]
+    assert index.get("_speedups") == [] and index.get("yaml") == ["PyYAML"]
+    assert count == len(index)
+
+
+def test_package_list_wins_over_collected_metadata(tmp_path):
+    wheels = tmp_path / "wheels"
+    wheels.mkdir()
+    make_wheel(wheels / "pytest-1.0-py3-none-any.whl", "pytest", ["py.py", "pytest/__init__.py"])
+    packages = tmp_path / "packages.txt"
+    packages.write_text("# comment\npytest\njinja2 Jinja2  # renamed\n\n")
+    path = str(tmp_path / "index.bin")
+
+    rebuild_index(str(wheels), include_installed=False, path=path, packages_file=str(packages))
+
+    index = DistributionIndex(path)
+    assert index.get("jinja2") == ["Jinja2"] and index.get("pytest") == ["pytest"]
+    assert index.get("py") == ["pytest"]
+
+
+def test_bundled_index_is_built_from_the_package_list_only():
+    expected = {**{name: [dist] for name, dist in load_package_list().items()},
+                **{name: [dist] for name, dist in CURATED_DISTRIBUTIONS.items()}}
+
+    assert len(distribution_index) == len(expected)
+    assert all(distribution_index.get(name) == dists for name, dists in expected.items())
+    # Nothing from the environment it was built in
+    assert distribution_index.get("py") == [] and distribution_index.get("opentelemetry") == []
+    assert distribution_index.get("langchain_groq") == ["langchain-groq"]
+    assert resolve_distribution("dotenv") == "python-dotenv"
+
+
+def test_collected_metadata_is_never_written_to_the_bundled_index(tmp_path):
+    with pytest.raises(ValueError, match="bundled index"):
+        rebuild_index(include_installed=True)
+    with pytest.raises(ValueError, match="bundled index"):
+        rebuild_index(str(tmp_path), path=DEFAULT_INDEX_PATH)
@@ -0,0 +1,139 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import groq
+import httpx
+import pytest
+
+import utils.llm_utils.create_groq_client as groq_client
+from langchain.schema.messages import SystemMessage, HumanMessage
+from devtools.fake_llm_server import FakeLLMServer, format_duration, synthetic_reply
+from utils.llm_utils.create_groq_client import get_groq_client
+from utils.llm_utils.llm_scheduler import LLMScheduler
+from utils.llm_utils.refactor_file import SYSTEM_PROMPT
+
+
+CODE = "import os\nimport requests\nfrom yaml import safe_load\n\n\ndef load(path):\n    return safe_load(open(path))\n"
+
+
+def use_server(monkeypatch, server, keys=("key-a",)):
+    monkeypatch.setattr(groq_client, "API_KEYS", list(keys))
+    monkeypatch.setattr(groq_client, "MODEL", "fake-model")
+    monkeypatch.setattr(groq_client, "BASE_URL", server.url)
+    monkeypatch.setattr(groq_client, "_clients", {})
+
+
+def prompt(code=CODE):
+    return [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content=f"Refactor this:\n```python\n{code}```")]
+
+
+def test_synthetic_replies_follow_the_prompt_type():
+    refactor = synthetic_reply([{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": f"```python\n{CODE}```"}])
+    packages = synthetic_reply([{"role": "system", "content": "You are a powerfull packages manager."}, {"role": "user", "content": f"```python\n{CODE}```"}])
+
+    assert refactor == f"```python\n{CODE.rstrip()}\n```"
+    assert packages.split() == ["requests", "yaml"]
+    assert format_duration(179.56) == "2m59.56s" and format_duration(7.661) == "7.66s"
+
+
+def test_client_talks_to_fake_server(monkeypatch):
+    with FakeLLMServer() as server:
+        use_server(monkeypatch, server)
+        response = get_groq_client(0).invoke(prompt(), max_tokens=1000)
+
+    assert response.content == f"```python\n{CODE.rstrip()}\n```"
+    assert response.usage_metadata["total_tokens"] > 0
+    assert server.requests["completed"] == 1
+
+
+def test_replies_are_cut_at_max_tokens(monkeypatch):
+    with FakeLLMServer() as server:
+        use_server(monkeypatch, server)
+        response = get_groq_client(0).invoke(prompt(CODE * 20), max_tokens=10)
+
+    assert response.response_metadata["finish_reason"] == "length"
+    assert len(response.content) <= 40
+
+
+def test_injected_rate_limit_moves_scheduler_to_next_key(monkeypatch):
+    with FakeLLMServer(rate_limit_every=2, retry_after=30) as server:
+        use_server(monkeypatch, server, keys=("key-a", "key-b"))
+        scheduler = LLMScheduler(key_indices=[0, 1], rpm_limit=10, tpm_limit=100000)
+
+        scheduler.invoke(prompt(), key_index=0)
+        # The second request goes to the idle key 1 and is rate limited
+        response, key_index = scheduler.invoke(prompt())
+        with pytest.raises(groq.RateLimitError) as error:
+            get_groq_client(0).invoke(prompt())
+
+    stats = scheduler.stats()
+    assert key_index == 0 and response.content.startswith("```python")
+    assert stats[1]["rate_limited"] == 1 and 29 < stats[1]["blocked_for"] <= 30
+    assert error.value.response.headers["retry-after"] == "30"
+    assert "Please try again in 30.00s" in str(error.value)
+
+
+def test_tpm_limit_returns_groq_style_429(monkeypatch):
+    with FakeLLMServer(tpm_limit=150) as server:
+        use_server(monkeypatch, server, keys=("key-a", "key-b"))
+        get_groq_client(0).invoke(prompt())
+        scheduler = LLMScheduler(key_indices=[0, 1], rpm_limit=10, tpm_limit=100000)
+
+        _, key_index = scheduler.invoke(prompt(), key_index=0)
+
+    stats = scheduler.stats()
+    assert key_index == 1
+    assert stats[0]["rate_limited"] == 1 and stats[0]["blocked_for"] > 50
+    assert scheduler.budgets[0].tpm_limit == 150
+    assert server.requests["rate_limited"] == 1
+
+
+def test_record_then_replay(monkeypatch, tmp_path):
+    recording = str(tmp_path / "recording.jsonl")
+
+    with FakeLLMServer() as upstream, FakeLLMServer(upstream=upstream.url, record_path=recording) as recorder:
+        use_server(monkeypatch, recorder)
+        recorded = get_groq_client(0).invoke(prompt()).content
+    assert recorder.requests["recorded"] == 1
+
+    with FakeLLMServer(replay_path=recording) as replay:
+        use_server(monkeypatch, replay)
+        replayed = get_groq_client(0).invoke(prompt()).content
+        with pytest.raises(groq.NotFoundError):
+            get_groq_client(0).invoke(prompt("x = 1\n"))
+
+    assert replayed == recorded
+    assert replay.requests["replayed"] == 1 and replay.requests["replay_miss"] == 1
+
+
+def test_non_json_upstream_errors_pass_through(tmp_path):
+    page = b"<html><body>502 Bad Gateway</body></html>"
+
+    class BadGateway(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(502)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, *args):
+            pass
+
+    upstream = ThreadingHTTPServer(("127.0.0.1", 0), BadGateway)
+    threading.Thread(target=upstream.serve_forever, daemon=True).start()
+    try:
+        upstream_url = f"http://127.0.0.1:{upstream.server_port}"
+        with FakeLLMServer(upstream=upstream_url, record_path=str(tmp_path / "recording.jsonl")) as recorder:
+            response = httpx.post(
+                f"{recorder.url}/openai/v1/chat/completions",
+                json={"model": "fake-model", "messages": [{"role": "user", "content": "hi"}]},
+            )
+    finally:
+        upstream.shutdown()
+
+    assert response.status_code == 502
+    assert response.content == page and response.headers["content-type"] == "text/html"
+    assert recorder.requests["recorded"] == 0
+
@@ -18,7 +18,7 @@ s.close()
 file_path = "network_scan.py"
 
 
-@patch("services.file_analysis_service.get_groq_client")
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
 def test_generate_file_analysis(mock_get_client):
     
     # Mock the LLM client and its response
@@ -31,8 +31,30 @@ def test_generate_file_analysis(mock_get_client):
     mock_get_client.return_value = mock_llm
 
     # Run the function
-    result = generate_file_analysis(file_path, sample_code)
+    result = generate_file_analysis(file_path, sample_code, mode="llm")
 
     # Assert that the result is as expected
     assert result == "Mocked analysis result"
     assert mock_llm.invoke.call_count >= 1
+
+
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_static_mode_skips_llm(mock_get_client):
+    result = generate_file_analysis(file_path, sample_code, mode="static")
+
+    assert result.startswith("### Static analysis")
+    assert "`bare-except`" in result and "`hardcoded-address`" in result
+    mock_get_client.assert_not_called()
+
+
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_hybrid_mode_passes_findings_to_llm(mock_get_client):
+    mock_llm = MagicMock()
+    mock_llm.invoke.return_value.content = "Mocked analysis result"
+    mock_get_client.return_value = mock_llm
+
+    result = generate_file_analysis(file_path, sample_code, mode="hybrid")
+
+    prompt = mock_llm.invoke.call_args[0][0][-1].content
+    assert "Line 8: Bare `except:`" in prompt
+    assert result.startswith("### Static analysis") and result.endswith("### Review\nMocked analysis result")
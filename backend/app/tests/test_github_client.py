@@ -0,0 +1,132 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from utils.github_client import GitHubClient
+
+
+@pytest.fixture
+def flaky_server():
+    """Serves the queued (status, headers) responses in order, then 200."""
+    queue = []
+    hits = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            hits.append(self.client_address[1])
+            status, headers = queue.pop(0) if queue else (200, {})
+            body = b"ok" if status == 200 else b"error"
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}", queue, hits
+    server.shutdown()
+
+
+def make_client(**kwargs):
+    return GitHubClient(backoff_base=0.01, backoff_max=2, **kwargs)
+
+
+def test_retries_server_errors_then_succeeds(flaky_server):
+    url, queue, hits = flaky_server
+    queue.extend([(503, {}), (502, {})])
+    client = make_client()
+
+    response = client.get(f"{url}/repos")
+
+    assert response.status_code == 200
+    assert len(hits) == 3
+    assert client.metrics()[f"GET {url[7:]}"]["calls"] == 3
+    assert client.metrics()[f"GET {url[7:]}"]["errors"] == 2
+
+
+def test_honours_retry_after_on_rate_limit(flaky_server):
+    url, queue, hits = flaky_server
+    queue.append((403, {"Retry-After": "1", "X-RateLimit-Remaining": "0"}))
+    client = make_client()
+
+    start = time.perf_counter()
+    response = client.get(f"{url}/repos")
+
+    assert response.status_code == 200
+    assert time.perf_counter() - start >= 1
+
+
+def test_gives_up_when_rate_limit_resets_too_late(flaky_server):
+    url, queue, hits = flaky_server
+    reset = str(int(time.time()) + 3600)
+    queue.append((403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}))
+    client = make_client()
+
+    assert client.get(f"{url}/repos").status_code == 403
+    assert len(hits) == 1
+
+
+def test_does_not_retry_client_errors(flaky_server):
+    url, queue, hits = flaky_server
+    queue.append((404, {}))
+    client = make_client()
+
+    assert client.get(f"{url}/repos").status_code == 404
+    assert len(hits) == 1
+
+
+def test_reuses_connections(flaky_server):
+    url, queue, hits = flaky_server
+    client = make_client()
+
+    for _ in range(3):
+        client.get(f"{url}/repos")
+
+    # Same client port for every call means keep-alive reused the connection
+    assert len(set(hits)) == 1
+
+
+def test_does_not_retry_non_idempotent_requests_on_server_errors(flaky_server):
+    url, queue, hits = flaky_server
+    queue.append((502, {}))
+    client = make_client()
+
+    # The pull request may have been created before the 502; a retry would fail with 422
+    assert client.post(f"{url}/pulls", json={"title": "PR"}).status_code == 502
+    assert len(hits) == 1
+
+
+def test_retries_non_idempotent_requests_rejected_with_retry_after(flaky_server):
+    url, queue, hits = flaky_server
+    queue.extend([(429, {"Retry-After": "0"}), (403, {"Retry-After": "0"})])
+    client = make_client()
+
+    assert client.post(f"{url}/pulls", json={"title": "PR"}).status_code == 200
+    assert len(hits) == 3
+
+
+def test_retries_non_idempotent_requests_that_never_connected():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    client = make_client(max_retries=2)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        client.post(f"http://127.0.0.1:{port}/pulls", json={})
+    assert client.metrics()[f"POST 127.0.0.1:{port}"]["calls"] == 3
+
@@ -1,18 +1,28 @@
 import pytest
 import requests
+import io
 import os
 import sys
+import tarfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from requests import RequestException, HTTPError
 # from utils.github_utils import get_owner_and_repo, get_github_file_content
 
 from unittest.mock import patch, Mock
+from utils.github_client import github_client
 
 # Ensure 'src' is in sys.path for import
+import utils.github_utils as github_utils
 from utils.github_utils import (
     get_owner_and_repo, 
     get_github_file_content,
     get_branch_list,
-    get_branch_files
+    get_branch_files,
+    get_branch_tree,
+    download_branch_snapshot,
+    get_snapshot_file_content,
+    branch_snapshot,
     )
 
 #——— Tests for get_owner_and_repo ——————————————————
@@ -52,14 +62,14 @@ class DummyResponse:
 
 def test_get_github_file_content_success(monkeypatch):
     dummy = DummyResponse(200, text="hello world")
-    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: dummy)
+    monkeypatch.setattr(github_client, "get", lambda *args, **kwargs: dummy)
 
     content = get_github_file_content("owner", "repo", "path/to/file.txt")
     assert content == "hello world"
 
 def test_get_github_file_content_not_found(monkeypatch):
     dummy = DummyResponse(404)
-    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: dummy)
+    monkeypatch.setattr(github_client, "get", lambda *args, **kwargs: dummy)
 
     with pytest.raises(FileNotFoundError) as exc:
         get_github_file_content("o", "r", "missing.txt")
@@ -67,7 +77,7 @@ def test_get_github_file_content_not_found(monkeypatch):
 
 def test_get_github_file_content_api_error(monkeypatch):
     dummy = DummyResponse(500)
-    monkeypatch.setattr(requests, "get", lambda *args, **kwargs: dummy)
+    monkeypatch.setattr(github_client, "get", lambda *args, **kwargs: dummy)
 
     with pytest.raises(RuntimeError) as exc:
         get_github_file_content("o", "r", "file.txt")
@@ -76,7 +86,7 @@ def test_get_github_file_content_api_error(monkeypatch):
 def test_get_github_file_content_network_error(monkeypatch):
     def raise_req(*args, **kwargs):
         raise RequestException("connection broke")
-    monkeypatch.setattr(requests, "get", raise_req)
+    monkeypatch.setattr(github_client, "get", raise_req)
 
     with pytest.raises(ConnectionError) as exc:
         get_github_file_content("o", "r", "file.txt")
@@ -85,7 +95,7 @@ def test_get_github_file_content_network_error(monkeypatch):
 
 #------Tests for get_branch_list and get_branch_files-----------------
 
-@patch("utils.github_utils.requests.get")
+@patch("utils.github_utils.github_client.get")
 def test_get_branch_list_success(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -96,7 +106,7 @@ def test_get_branch_list_success(mock_get):
     assert branches == ["main", "dev"]
 
 
-@patch("utils.github_utils.requests.get")
+@patch("utils.github_utils.github_client.get")
 def test_get_branch_list_404(mock_get):
     mock_response = Mock()
     mock_response.status_code = 404
@@ -106,7 +116,7 @@ def test_get_branch_list_404(mock_get):
         get_branch_list("user", "repo")
 
 
-@patch("utils.github_utils.requests.get")
+@patch("utils.github_utils.github_client.get")
 def test_get_branch_list_network_error(mock_get):
     mock_get.side_effect = requests.exceptions.RequestException("Network down")
     
@@ -115,7 +125,7 @@ def test_get_branch_list_network_error(mock_get):
 
 
 # --- Test get_branch_files ---
-@patch("utils.github_utils.requests.get")
+@patch("utils.github_utils.github_client.get")
 def test_get_branch_files_success(mock_get):
     mock_response = Mock()
     mock_response.status_code = 200
@@ -132,7 +142,7 @@ def test_get_branch_files_success(mock_get):
     assert files == ["README.md", "src/main.py"]
 
 
-@patch("utils.github_utils.requests.get")
+@patch("utils.github_utils.github_client.get")
 def test_get_branch_files_404(mock_get):
     mock_response = Mock()
     mock_response.status_code = 404
@@ -142,10 +152,114 @@ def test_get_branch_files_404(mock_get):
         get_branch_files("user", "repo", "main")
 
 
-@patch("utils.github_utils.requests.get")
+@patch("utils.github_utils.github_client.get")
 def test_get_branch_files_network_error(mock_get):
     mock_get.side_effect = requests.exceptions.RequestException("Timeout")
 
     with pytest.raises(requests.exceptions.RequestException):
         get_branch_files("user", "repo", "main")
 
+
+
+# --- Test get_branch_tree ---
+@patch("utils.github_utils.github_client.get")
+def test_get_branch_tree_success(mock_get):
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "tree": [
+            {"path": "README.md", "type": "blob", "mode": "100644", "sha": "abc"},
+            {"path": "src", "type": "tree", "mode": "040000", "sha": "def"},
+            {"path": "src/main.py", "type": "blob", "mode": "100755", "sha": "123"}
+        ]
+    }
+    mock_get.return_value = mock_response
+
+    assert get_branch_tree("user", "repo", "main") == {"README.md": ("abc", "100644"), "src/main.py": ("123", "100755")}
+
+
+#------Tests for branch snapshots (served by a local HTTP stand-in)-----------------
+
+COMMIT_SHA = "a" * 40
+
+
+def build_tarball(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for path, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(f"repo-main/{path}")
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def archive_server(monkeypatch, tmp_path):
+    tarball = build_tarball({"README.md": "# Demo", "src/app.py": "print('hi')\n"})
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            if self.path not in ("/owner/repo/tar.gz/main", f"/owner/repo/tar.gz/{COMMIT_SHA}"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-gzip")
+            self.send_header("Content-Length", str(len(tarball)))
+            self.end_headers()
+            self.wfile.write(tarball)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    monkeypatch.setattr(github_utils, "GITHUB_ARCHIVE_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(github_utils, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    yield requests_seen
+    server.shutdown()
+
+
+def test_download_branch_snapshot_extracts_files(archive_server):
+    snapshot = download_branch_snapshot("owner", "repo", "main")
+
+    with open(os.path.join(snapshot, "src", "app.py")) as f:
+        assert f.read() == "print('hi')\n"
+    assert get_snapshot_file_content("owner", "repo", "README.md") == "# Demo"
+    # The second read is served locally without another download
+    assert archive_server == ["/owner/repo/tar.gz/main"]
+
+
+def test_download_branch_snapshot_not_found(archive_server):
+    with pytest.raises(FileNotFoundError):
+        download_branch_snapshot("owner", "repo", "missing")
+
+
+def test_snapshot_rejects_paths_outside_snapshot(archive_server):
+    download_branch_snapshot("owner", "repo", "main")
+    with pytest.raises(ValueError):
+        get_snapshot_file_content("owner", "repo", "../../../etc/passwd")
+
+
+def test_refresh_keeps_snapshot_in_use(archive_server):
+    with branch_snapshot("owner", "repo", "main") as held:
+        refreshed = download_branch_snapshot("owner", "repo", "main", refresh=True)
+
+        assert refreshed != held
+        # The snapshot being read is not removed by the refresh
+        assert github_utils.read_snapshot_file(held, "README.md") == "# Demo"
+
+    assert not os.path.exists(held)
+    assert get_snapshot_file_content("owner", "repo", "README.md") == "# Demo"
+    assert os.path.isdir(refreshed)
+
+
+def test_commit_snapshot_is_reused(archive_server):
+    first = download_branch_snapshot("owner", "repo", "main", refresh=True, ref=COMMIT_SHA)
+    second = download_branch_snapshot("owner", "repo", "main", refresh=True, ref=COMMIT_SHA)
+
+    assert first == second and os.path.basename(first) == COMMIT_SHA
+    assert archive_server == [f"/owner/repo/tar.gz/{COMMIT_SHA}"]
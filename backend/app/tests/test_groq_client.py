@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+import utils.llm_utils.create_groq_client as groq_client
+from utils.llm_utils.create_groq_client import get_groq_client, load_api_keys
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(groq_client, "API_KEYS", ["key-a", "key-b"])
+    monkeypatch.setattr(groq_client, "MODEL", "test-model")
+    monkeypatch.setattr(groq_client, "_clients", {})
+
+
+def test_load_api_keys_from_numbered_variables(monkeypatch):
+    monkeypatch.delenv("GROQ_API_KEYS", raising=False)
+    for name in [n for n in list(os.environ) if n.startswith("GROQ_API_KEY")]:
+        monkeypatch.delenv(name)
+    monkeypatch.setenv("GROQ_API_KEY", "k0")
+    monkeypatch.setenv("GROQ_API_KEY10", "k10")
+    monkeypatch.setenv("GROQ_API_KEY2", "k2")
+    monkeypatch.setenv("GROQ_API_KEY3", "k0")
+
+    assert load_api_keys() == ["k0", "k2", "k10"]
+
+    monkeypatch.setenv("GROQ_API_KEYS", "x, y,,z")
+    assert load_api_keys() == ["x", "y", "z"]
+
+
+def test_clients_are_reused_per_key_and_settings(registry):
+    first = get_groq_client(0)
+
+    assert get_groq_client(0) is first
+    assert get_groq_client(2) is first  # wraps around the configured keys
+    assert get_groq_client(1) is not first
+    assert get_groq_client(0, streaming=True) is not first
+    assert first.max_retries == 0
+
+
+def test_missing_keys_raise(monkeypatch):
+    monkeypatch.setattr(groq_client, "API_KEYS", [])
+    with pytest.raises(ValueError):
+        get_groq_client()
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+import pytest
+
+from services.dependency_management_services import generate_dependencies
+from utils.import_scanner import extract_imports, scan_imports, third_party_imports, resolve_distribution
+
+MAIN = """import os, json
+import numpy as np
+from yaml import safe_load
+from services.loader import load
+from . import helpers
+from .helpers import util
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+def plot():
+    import matplotlib.pyplot as plt
+    return plt
+"""
+
+
+def write_repo(root, files=40):
+    (root / "app" / "services").mkdir(parents=True)
+    (root / "app" / "main.py").write_text(MAIN)
+    (root / "app" / "services" / "loader.py").write_text("import requests\nfrom somecorp_sdk import Client\n")
+    (root / "legacy.py").write_text("import urllib2\nprint 'python 2'\n")
+    for i in range(files):
+        (root / "app" / "services" / f"module_{i}.py").write_text(f"import sys\nfrom .loader import load as load_{i}\n")
+
+
+def test_extract_imports():
+    assert extract_imports(MAIN) == {"os", "json", "numpy", "yaml", "services", "ujson", "matplotlib"}
+    # Python 2 code does not parse and is read line by line
+    assert extract_imports("import urllib2, cv2 as cv  # old\nfrom foo.bar import baz\nprint 'x'\n") == {"urllib2", "cv2", "foo"}
+
+
+def test_third_party_imports_drop_stdlib_and_local_modules(tmp_path):
+    write_repo(tmp_path, files=70)
+
+    imports = scan_imports(str(tmp_path), max_workers=2)
+
+    assert len(imports) == 73
+    assert third_party_imports(imports, "3.11") == ["matplotlib", "numpy", "requests", "somecorp_sdk", "ujson", "urllib2", "yaml"]
+    assert resolve_distribution("yaml") == "PyYAML" and resolve_distribution("somecorp_sdk") is None
+
+
+@patch("services.dependency_management_services.resolve_distribution", side_effect=lambda name: {"yaml": "PyYAML", "numpy": "numpy"}.get(name))
+@patch("services.dependency_management_services.get_distributions", return_value="matplotlib\nrequests\nsomecorp-sdk\nujson\n")
+@patch("services.dependency_management_services.setup_virtualenv_and_install_requirements")
+def test_generate_dependencies_asks_llm_only_for_unresolved(mock_setup, mock_llm, mock_resolve, tmp_path):
+    write_repo(tmp_path, files=2)
+    mock_setup.return_value = {"success": True, "message": "ok", "installed_packages": "numpy==2.0"}
+    events = []
+
+    result = generate_dependencies(str(tmp_path), "3.11", progress_callback=events.append)
+
+    assert result["installed_packages"] == "numpy==2.0"
+    mock_llm.assert_called_once_with(["matplotlib", "requests", "somecorp_sdk", "ujson", "urllib2"], "3.11")
+    assert mock_setup.call_args.kwargs["requirements_text"].splitlines() == [
+        "numpy", "PyYAML", "matplotlib", "requests", "somecorp-sdk", "ujson"
+    ]
+    assert [e["done"] for e in events] == [1, 2, 3, 4, 5]
+
+
+def test_generate_dependencies_missing_dir(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        generate_dependencies(str(tmp_path / "missing"))
@@ -0,0 +1,171 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.job_service import (
+    Job, JobManager, JobConflictError, JobQueueFullError, LIVE_EVENT_BUFFER, check_cancelled
+)
+
+
+def wait_for(job, states, timeout=5):
+    deadline = time.time() + timeout
+    while job.state not in states:
+        assert time.time() < deadline, f"job stuck in {job.state}"
+        time.sleep(0.01)
+
+
+async def collect(stream):
+    return [message async for message in stream]
+
+
+def count_files(total, progress_callback=None, cancel_event=None):
+    for done in range(1, total + 1):
+        check_cancelled(cancel_event)
+        progress_callback({"done": done, "total": total, "log": f"file {done}"})
+    return {"files": total}
+
+
+def test_job_reports_progress_logs_and_result():
+    manager = JobManager(max_workers=1)
+    job = manager.submit("count", count_files, total=3)
+
+    wait_for(job, ("succeeded",))
+    details = job.to_dict(log_offset=1)
+    assert details["result"] == {"files": 3}
+    assert details["progress"] == {"done": 3, "total": 3}
+    assert details["logs"] == ["file 2", "file 3"]
+
+
+def test_failed_job_keeps_error():
+    def broken(progress_callback=None, cancel_event=None):
+        raise RuntimeError("boom")
+
+    job = JobManager(max_workers=1).submit("broken", broken)
+
+    wait_for(job, ("failed",))
+    assert job.error == "boom"
+
+
+def test_cancel_running_and_queued_jobs():
+    started = threading.Event()
+
+    def wait_until_cancelled(progress_callback=None, cancel_event=None):
+        started.set()
+        while True:
+            check_cancelled(cancel_event)
+            time.sleep(0.01)
+
+    manager = JobManager(max_workers=1)
+    running = manager.submit("slow", wait_until_cancelled)
+    queued = manager.submit("count", count_files, total=1)
+    started.wait(5)
+    assert queued.state == "queued"
+
+    manager.cancel(queued.id)
+    manager.cancel(running.id)
+
+    wait_for(running, ("cancelled",))
+    assert queued.state == "cancelled"
+    assert queued.result is None
+
+
+def test_queue_is_bounded():
+    release = threading.Event()
+
+    def block(progress_callback=None, cancel_event=None):
+        release.wait(5)
+
+    manager = JobManager(max_workers=1, max_queued=1)
+    manager.submit("block", block)
+    time.sleep(0.05)
+    manager.submit("block", block)
+
+    with pytest.raises(JobQueueFullError):
+        manager.submit("block", block)
+    release.set()
+
+
+def test_stream_events_replays_and_resumes():
+    manager = JobManager(max_workers=1)
+    job = manager.submit("count", count_files, total=2)
+
+    messages = asyncio.run(collect(manager.stream_events(job, heartbeat=0.1)))
+    wait_for(job, ("succeeded",))
+
+    events = [m for m in messages if m.startswith("id: ")]
+    assert len(events) == 2
+    assert events[0].startswith("id: 1\n") and '"log": "file 1"' in events[0]
+    assert messages[-1].startswith("event: end\n") and '"succeeded"' in messages[-1]
+
+    resumed = [m for m in asyncio.run(collect(manager.stream_events(job, after_id=1, heartbeat=0.1))) if m.startswith("id: ")]
+    assert len(resumed) == 1 and resumed[0].startswith("id: 2\n")
+
+
+def test_stream_is_woken_up_by_the_job_thread():
+    job = Job("refactor", {})
+
+    async def first_events():
+        waiting = asyncio.ensure_future(job.next_events(0, timeout=10))
+        await asyncio.sleep(0.05)
+        threading.Thread(target=job.report, args=({"event": "written", "file": "a.py"},)).start()
+        return await asyncio.wait_for(waiting, timeout=2)
+
+    start = time.monotonic()
+    events, finished = asyncio.run(first_events())
+
+    assert [e["event"] for e in events] == ["written"] and not finished
+    assert time.monotonic() - start < 2
+    assert not job._waiters
+
+
+def test_live_only_events_are_streamed_but_not_kept():
+    job = Job("refactor", {})
+    job.report({"event": "llm-delta", "file": "a.py", "text": "x" * 1000})
+    job.report({"event": "written", "file": "a.py", "log": "done"})
+
+    events, _ = job.wait_for_events(0, timeout=0)
+    assert [(e["id"], e["event"]) for e in events] == [(1, "llm-delta"), (2, "written")]
+    assert [e["event"] for e in job.events] == ["written"]
+
+    for _ in range(LIVE_EVENT_BUFFER + 10):
+        job.report({"event": "llm-delta", "file": "a.py", "text": "y"})
+    events, _ = job.wait_for_events(2, timeout=0)
+    assert len(events) == LIVE_EVENT_BUFFER
+
+    job.finish("succeeded")
+    events, finished = job.wait_for_events(2, timeout=0)
+    assert events == [] and finished
+
+
+def test_cancel_does_not_overwrite_a_finished_job():
+    manager = JobManager(max_workers=1)
+    job = manager.submit("count", count_files, total=1)
+    wait_for(job, ("succeeded",))
+
+    manager.cancel(job.id)
+
+    assert job.state == "succeeded" and job.result == {"files": 1}
+    assert job.finish("failed") is False and job.state == "succeeded"
+
+
+def test_jobs_sharing_a_directory_are_refused(tmp_path):
+    release = threading.Event()
+
+    def block(progress_callback=None, cancel_event=None):
+        release.wait(5)
+
+    manager = JobManager(max_workers=2)
+    first = manager.submit("refactor", block, workspace=str(tmp_path / "out"))
+
+    with pytest.raises(JobConflictError):
+        manager.submit("refactor", block, workspace=str(tmp_path / "out" / "."))
+    other = manager.submit("refactor", block, workspace=str(tmp_path / "other"))
+
+    release.set()
+    wait_for(first, ("succeeded",))
+    wait_for(other, ("succeeded",))
+    # Once the first job is done the directory can be used again
+    wait_for(manager.submit("readme", block, workspace=str(tmp_path / "out")), ("succeeded",))
+
@@ -0,0 +1,56 @@
+from unittest.mock import patch, MagicMock
+
+from utils.llm_utils.llm_cache import LLMResultCache, make_cache_key
+from utils.llm_utils.refactor_file import refactor_code_or_test_file
+
+
+def test_cache_hit_and_miss_counters(tmp_path):
+    cache = LLMResultCache(path=str(tmp_path / "cache.sqlite3"), namespace="refactor")
+    key = make_cache_key("content-hash", "code", "3.12", "model", "prompt-v1")
+
+    assert cache.get(key) is None
+    cache.put(key, "refactored")
+    assert cache.get(key) == "refactored"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_cache_key_changes_with_python_version():
+    assert make_cache_key("h", "code", "3.11") != make_cache_key("h", "code", "3.12")
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = LLMResultCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=10, namespace="refactor")
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a")  # 'b' is now the least recently used entry
+    cache.put("c", "cccc")
+
+    assert cache.get("a") == "aaaa"
+    assert cache.get("b") is None
+    assert cache.get("c") == "cccc"
+
+
+def test_cache_is_persistent(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    LLMResultCache(path=path, namespace="refactor").put("k", "v")
+    assert LLMResultCache(path=path, namespace="refactor").get("k") == "v"
+    assert LLMResultCache(path=path, namespace="summary").get("k") is None
+
+
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_refactor_reuses_cached_result(mock_get_client, tmp_path):
+    cache = LLMResultCache(path=str(tmp_path / "cache.sqlite3"), namespace="refactor")
+    mock_llm = MagicMock()
+    mock_llm.invoke.return_value.content = "```python\nx: int = 1\n```"
+    mock_get_client.return_value = mock_llm
+
+    with patch("utils.llm_utils.refactor_file.get_cache", return_value=cache):
+        first, _ = refactor_code_or_test_file("x = 1", "a.py", "3.12")
+        calls = mock_llm.invoke.call_count
+        second, _ = refactor_code_or_test_file("x = 1", "other/a.py", "3.12")
+
+    assert first == second == "x: int = 1"
+    assert mock_llm.invoke.call_count == calls
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,147 @@
+import time
+from unittest.mock import MagicMock, patch
+
+import httpx
+import groq
+import pytest
+
+from utils.llm_utils.llm_scheduler import LLMScheduler, LLMRateLimitError, parse_duration
+
+
+def rate_limit_error(headers=None, message="Rate limit reached. Please try again in 1m2.5s."):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(429, headers=headers or {}, request=request)
+    return groq.RateLimitError(message, response=response, body=None)
+
+
+def fake_clients(behaviour):
+    """Builds a get_groq_client replacement; behaviour maps key index to a list of results or errors."""
+    calls = []
+
+    def get_client(key_index):
+        llm = MagicMock()
+
+        def invoke(messages, **kwargs):
+            calls.append(key_index)
+            outcome = behaviour[key_index].pop(0) if behaviour.get(key_index) else None
+            if isinstance(outcome, Exception):
+                raise outcome
+            response = MagicMock(content=f"ok from {key_index}", usage_metadata={"total_tokens": 100})
+            return response
+
+        llm.invoke.side_effect = invoke
+        return llm
+
+    return get_client, calls
+
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("1h2m") == pytest.approx(3720)
+    assert parse_duration("250ms") == pytest.approx(0.25)
+    assert parse_duration("12") == 12
+    assert parse_duration("soon") is None
+
+
+def test_routes_calls_to_key_with_most_headroom():
+    get_client, calls = fake_clients({})
+    scheduler = LLMScheduler(key_indices=[0, 1], rpm_limit=10, tpm_limit=1000)
+
+    with patch("utils.llm_utils.llm_scheduler.get_groq_client", side_effect=get_client):
+        _, first = scheduler.invoke(["hello"], key_index=1, estimated_tokens=100)
+        _, second = scheduler.invoke(["hello"], key_index=1, estimated_tokens=100)
+
+    assert (first, second) == (1, 0)
+    assert scheduler.stats()[1]["tokens"] == 100
+
+
+def test_rate_limited_key_is_blocked_and_call_moves_on():
+    get_client, calls = fake_clients({0: [rate_limit_error({"retry-after": "30"})]})
+    scheduler = LLMScheduler(key_indices=[0, 1], rpm_limit=10, tpm_limit=1000)
+
+    with patch("utils.llm_utils.llm_scheduler.get_groq_client", side_effect=get_client):
+        response, key_index = scheduler.invoke(["hello"], key_index=0, estimated_tokens=10)
+
+    assert calls == [0, 1]
+    assert key_index == 1 and response.content == "ok from 1"
+    stats = scheduler.stats()[0]
+    assert stats["rate_limited"] == 1 and 29 < stats["blocked_for"] <= 30
+
+
+def test_waits_when_every_key_is_exhausted():
+    get_client, calls = fake_clients({})
+    scheduler = LLMScheduler(key_indices=[0], rpm_limit=1, tpm_limit=1000, window=0.2)
+
+    with patch("utils.llm_utils.llm_scheduler.get_groq_client", side_effect=get_client):
+        scheduler.invoke(["hello"], estimated_tokens=10)
+        start = time.monotonic()
+        scheduler.invoke(["hello"], estimated_tokens=10)
+
+    assert time.monotonic() - start >= 0.15
+    assert calls == [0, 0]
+
+
+def test_queue_wait_is_bounded():
+    scheduler = LLMScheduler(key_indices=[0], rpm_limit=1, tpm_limit=1000, max_queue_wait=0.05)
+    scheduler.acquire(10)
+
+    with pytest.raises(LLMRateLimitError):
+        scheduler.acquire(10)
+
+
+def test_non_retryable_errors_are_raised():
+    get_client, calls = fake_clients({0: [ValueError("bad request")]})
+    scheduler = LLMScheduler(key_indices=[0, 1], rpm_limit=10, tpm_limit=1000)
+
+    with patch("utils.llm_utils.llm_scheduler.get_groq_client", side_effect=get_client):
+        with pytest.raises(ValueError):
+            scheduler.invoke(["hello"], key_index=0, estimated_tokens=10)
+
+    assert calls == [0]
+
+
+def test_connection_errors_retry_with_bounded_backoff():
+    get_client, calls = fake_clients({0: [ConnectionError("reset")] * 3})
+    scheduler = LLMScheduler(key_indices=[0], rpm_limit=10, tpm_limit=1000, max_retries=2, backoff_base=0.01)
+
+    with patch("utils.llm_utils.llm_scheduler.get_groq_client", side_effect=get_client):
+        with pytest.raises(ConnectionError):
+            scheduler.invoke(["hello"], estimated_tokens=10)
+
+    assert calls == [0, 0, 0]
+
+
+def test_stream_retries_only_before_output():
+    from langchain_core.messages import AIMessageChunk
+
+    calls = []
+
+    def get_client(key_index):
+        llm = MagicMock()
+
+        def stream(messages, **kwargs):
+            calls.append(key_index)
+            if len(calls) == 1:
+                raise rate_limit_error({"retry-after": "30"})
+            yield AIMessageChunk(content="ab")
+            if len(calls) == 3:
+                raise ConnectionError("reset mid-stream")
+            yield AIMessageChunk(content="cd")
+
+        llm.stream.side_effect = stream
+        return llm
+
+    scheduler = LLMScheduler(key_indices=[0, 1], rpm_limit=10, tpm_limit=1000, backoff_base=0.01)
+    deltas = []
+    with patch("utils.llm_utils.llm_scheduler.get_groq_client", side_effect=get_client):
+        response, key_index = scheduler.stream(["hello"], deltas.append, key_index=0, estimated_tokens=10)
+        # The text only goes to the callback, so the reply is not held twice
+        assert (response.content, key_index, deltas) == ("", 1, ["ab", "cd"])
+
+        # Output already handed to the caller is never replayed by a retry
+        with pytest.raises(ConnectionError):
+            scheduler.stream(["hello"], deltas.append, key_index=1, estimated_tokens=10)
+
+    assert calls == [0, 1, 1]
+    assert deltas == ["ab", "cd", "ab"]
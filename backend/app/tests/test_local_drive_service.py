@@ -10,6 +10,16 @@ import sys
 
 from requests import RequestException, HTTPError
 from services.local_drive_service import get_all_refactored_files,write_all_refactored_files, BASE_DIR 
+from services.local_drive_service import (
+    list_refactored_page,
+    resolve_refactored_path,
+    parse_byte_range,
+    iter_file_range,
+    RangeNotSatisfiableError,
+    list_refactored_files,
+    MANIFEST_FILE,
+    PARTIAL_SUFFIX,
+)
 
 def test_get_all_refactored_files_reads_text_and_binary_files():
     # Create a temporary directory and sample files
@@ -108,6 +118,81 @@ def test_write_invalid_path_raises_exception(monkeypatch):
     assert "Error writing to fail.py" in str(e.value)
 
 
+# ---------------------test for the paginated listing and ranged reads----------------
 
 
+def make_tree(root):
+    internal = [MANIFEST_FILE, MANIFEST_FILE + ".tmp", "a/x.py" + PARTIAL_SUFFIX]
+    for path in ["b.py", "a/z.py", "a/y.txt", "c/d/e.py"] + internal:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(path)
+
+
+def test_list_refactored_page_paginates_and_filters(tmp_path):
+    make_tree(tmp_path)
+
+    first = list_refactored_page(str(tmp_path), offset=0, limit=2)
+    second = list_refactored_page(str(tmp_path), offset=2, limit=2)
+
+    assert first["total"] == 4
+    assert [f["path"] for f in first["files"] + second["files"]] == ["a/y.txt", "a/z.py", "b.py", "c/d/e.py"]
+    entry = first["files"][0]
+    assert entry["size"] == len("a/y.txt") and entry["mtime"] > 0 and len(entry["sha256"]) == 64
+    assert "content" not in entry
+
+    assert list_refactored_files(str(tmp_path)) == ["a/y.txt", "a/z.py", "b.py", "c/d/e.py"]
+
+    python_files = list_refactored_page(str(tmp_path), pattern="*.py")
+    assert python_files["total"] == 3
+    assert [f["path"] for f in python_files["files"]] == ["a/z.py", "b.py", "c/d/e.py"]
+
+
+def test_resolve_refactored_path_rejects_traversal(tmp_path):
+    make_tree(tmp_path)
+    (tmp_path.parent / "secret.txt").write_text("secret")
+    (tmp_path / "link.txt").symlink_to(tmp_path.parent / "secret.txt")
+
+    assert resolve_refactored_path("a/z.py", str(tmp_path)) == os.path.realpath(tmp_path / "a/z.py")
+    for path in ["../secret.txt", "a/../../secret.txt", "/etc/passwd", "link.txt", "."]:
+        with pytest.raises(ValueError):
+            resolve_refactored_path(path, str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        resolve_refactored_path("missing.py", str(tmp_path))
+
+
+def test_listings_skip_symlinks_leading_outside(tmp_path):
+    root = tmp_path / "repo"
+    root.mkdir()
+    make_tree(root)
+    (tmp_path / "secret.txt").write_text("secret")
+    (root / "leak.txt").symlink_to(tmp_path / "secret.txt")
+    (root / "alias.py").symlink_to(root / "b.py")
+
+    expected = ["a/y.txt", "a/z.py", "alias.py", "b.py", "c/d/e.py"]
+    assert list_refactored_files(str(root)) == expected
+    page = list_refactored_page(str(root))
+    assert [f["path"] for f in page["files"]] == expected
+    # Everything listed can be served
+    assert all(resolve_refactored_path(path, str(root)) for path in expected)
+
+
+def test_parse_byte_range_and_read_range(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(bytes(range(256)) * 1024)
+    size = 256 * 1024
+
+    assert parse_byte_range(None, size) is None
+    assert parse_byte_range("bytes=0-99", size) == (0, 99)
+    assert parse_byte_range("bytes=1000-", size) == (1000, size - 1)
+    assert parse_byte_range("bytes=-10", size) == (size - 10, size - 1)
+    assert parse_byte_range("bytes=0-99999999", size) == (0, size - 1)
+    # Malformed and multi-range headers fall back to the whole file
+    assert parse_byte_range("bytes=0-1,5-6", size) is None
+    assert parse_byte_range("items=0-1", size) is None
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_byte_range(f"bytes={size}-", size)
+
+    blocks = list(iter_file_range(str(path), 100, 200000))
+    assert b"".join(blocks) == path.read_bytes()[100:200001]
+    assert max(len(block) for block in blocks) <= 64 * 1024
 
@@ -0,0 +1,55 @@
+from unittest.mock import MagicMock, patch
+
+from utils.llm_utils.prompt_packing import chunked_protocol_tokens, count_tokens, token_usage
+from utils.llm_utils.refactor_file import refactor_code_or_test_file
+
+MODULE = '''import os
+from typing import List
+
+
+@decorator
+def first() -> None:
+    return None
+
+
+class Second:
+    def method(self):
+        return os.getcwd()
+
+
+def third(values: List[int]) -> int:
+    return sum(values)
+'''
+
+
+def test_chunked_protocol_grows_quadratically():
+    code = "x = 1\n" * 100_000
+    one_pass = count_tokens(code)
+    assert chunked_protocol_tokens("system", "do it", code) > 3 * one_pass
+
+
+@patch("utils.llm_utils.refactor_file.get_cache", return_value=None)
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_refactor_sends_one_request_per_section(mock_get_client, mock_cache):
+    mock_llm = MagicMock()
+    mock_llm.invoke.side_effect = lambda messages, **kwargs: MagicMock(
+        content=f"```python\n# part {mock_llm.invoke.call_count}\n```"
+    )
+    mock_get_client.return_value = mock_llm
+    token_usage.reset()
+
+    small, _ = refactor_code_or_test_file("x = 1\n", "small.py")
+    assert mock_llm.invoke.call_count == 1
+    assert small == "# part 1"
+
+    with patch("utils.llm_utils.prompt_packing.chunk_budget", return_value=30), \
+         patch("utils.llm_utils.prompt_packing.LLM_CHUNK_WORKERS", 1):
+        big, _ = refactor_code_or_test_file(MODULE, "big.py")
+
+    parts = mock_llm.invoke.call_count - 1
+    assert parts > 1
+    assert big.startswith("# part 2") and big.endswith(f"# part {parts + 1}")
+    # Each request carries one system and one user message, never the previous replies
+    assert all(len(call.args[0]) == 2 for call in mock_llm.invoke.call_args_list)
+    stats = token_usage.stats()["refactor"]
+    assert stats["calls"] == parts + 1 and stats["saved_prompt_tokens"] > 0
@@ -4,7 +4,7 @@ from unittest.mock import patch, MagicMock
 from services.git_pr_service import git_pull_request  # Replace 'your_module' with actual module name
 
 
-@patch("services.git_pr_service.requests.post")
+@patch("services.git_pr_service.github_client.post")
 @patch("services.git_pr_service.os.getenv")
 def test_git_pull_request_success(mock_getenv, mock_post):
     # Setup mock environment
@@ -22,7 +22,7 @@ def test_git_pull_request_success(mock_getenv, mock_post):
     assert "https://github.com/user/repo/pull/1" in result["url"]
 
 
-@patch("services.git_pr_service.requests.post")
+@patch("services.git_pr_service.github_client.post")
 @patch("services.git_pr_service.os.getenv")
 def test_git_pull_request_already_exists(mock_getenv, mock_post):
     mock_getenv.return_value = "dummy_token"
@@ -39,7 +39,7 @@ def test_git_pull_request_already_exists(mock_getenv, mock_post):
     assert "already exists" in result["message"]
 
 
-@patch("services.git_pr_service.requests.post")
+@patch("services.git_pr_service.github_client.post")
 @patch("services.git_pr_service.os.getenv")
 def test_git_pull_request_failure(mock_getenv, mock_post):
     mock_getenv.return_value = "dummy_token"
@@ -0,0 +1,150 @@
+import re
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from services.readme_generation_service import generate_readme
+from utils.llm_utils.readme_generation_prompt import format_summaries, pack_summaries, reduce_summaries
+from utils.llm_utils.llm_scheduler import LLMScheduler
+from utils.llm_utils.llm_cache import LLMResultCache
+from utils.llm_utils.token_counter import count_tokens
+
+FILES = ["main.py", "a/__init__.py", "a/core.py", "a/b/one.py", "a/b/two.py", "a/b/three.py", "c/tool.py", "c/extra.py"]
+
+
+def write_repo(root):
+    for path in FILES:
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text(f"def {path.replace('/', '_').replace('.', '_')}():\n    return 1\n")
+
+
+@pytest.fixture(autouse=True)
+def fresh_scheduler(monkeypatch):
+    # The shared scheduler's request window is filled by earlier tests
+    scheduler = LLMScheduler(key_indices=[0], rpm_limit=1000, tpm_limit=10 ** 9)
+    monkeypatch.setattr("utils.llm_utils.prompt_packing.llm_scheduler", scheduler)
+    monkeypatch.setattr("utils.llm_utils.readme_generation_prompt.llm_scheduler", scheduler)
+    monkeypatch.setattr("utils.llm_utils.readme_generation_prompt.get_cache", lambda namespace: None)
+
+
+def fake_client(summary_of_code=lambda prompt: "This file defines a helper that returns one. " * 4):
+    client = MagicMock()
+
+    def invoke(messages, **kwargs):
+        prompt = messages[-1].content
+        if "README.md" in messages[0].content:
+            return MagicMock(content="# Project Title")
+        if "Combine the summaries" in prompt:
+            return MagicMock(content="A package summary. " * 10)
+        return MagicMock(content=summary_of_code(prompt))
+
+    client.invoke.side_effect = invoke
+    return client
+
+
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_small_repo_sends_file_summaries_directly(mock_get_client, tmp_path):
+    client = fake_client()
+    mock_get_client.return_value = client
+    write_repo(tmp_path)
+    events = []
+
+    generate_readme(str(tmp_path), progress_callback=events.append)
+
+    readme_prompt = client.invoke.call_args_list[-1].args[0][-1].content
+    assert all(f"`{path}`" in readme_prompt for path in FILES)
+    assert [e["file"] for e in events if e["event"] == "summarized"] == sorted(FILES)
+    assert not any(e["event"] == "reduced" for e in events)
+    assert (tmp_path / "README.md").read_text() == "# Project Title"
+
+
+@patch("services.readme_generation_service.README_REDUCE_TOKENS", 120)
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_large_repo_is_reduced_by_package_within_budget(mock_get_client, tmp_path):
+    client = fake_client()
+    mock_get_client.return_value = client
+    write_repo(tmp_path)
+    events = []
+
+    generate_readme(str(tmp_path), progress_callback=events.append)
+
+    assert sorted(e["package"] for e in events if e["event"] == "reduced") == ["a", "a/b", "c"]
+    readme_prompt = client.invoke.call_args_list[-1].args[0][-1].content
+    # The package summaries and main.py still do not fit together, so they are reduced in parts too
+    assert "the repository (part 1 of" in readme_prompt and "`a/b/one.py`" not in readme_prompt
+    # a/b has three summaries that do not fit together, so it is reduced in parts first
+    assert any("the package `a/b/` (part 1 of" in call.args[0][-1].content for call in client.invoke.call_args_list)
+    # No request carries more summaries than the budget
+    for call in client.invoke.call_args_list:
+        summaries = call.args[0][-1].content.split("### ", 1)
+        if len(summaries) == 2:
+            assert count_tokens("### " + summaries[1].split("Make sure the README")[0]) <= 120 + 10
+
+
+@patch("services.readme_generation_service.README_REDUCE_TOKENS", 120)
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_rerun_after_one_change_only_resummarizes_its_ancestors(mock_get_client, tmp_path, monkeypatch):
+    cache = LLMResultCache(path=str(tmp_path / "cache.sqlite3"), namespace="summary")
+    monkeypatch.setattr("utils.llm_utils.readme_generation_prompt.get_cache", lambda namespace: cache)
+    client = fake_client(lambda prompt: f"This file defines {prompt.split('def ')[-1].split('(')[0]}. " * 6)
+    mock_get_client.return_value = client
+    repo = tmp_path / "repo"
+    write_repo(repo)
+    generate_readme(str(repo))
+    first_run = client.invoke.call_count
+    assert any("the package `c/`" in call.args[0][-1].content for call in client.invoke.call_args_list)
+
+    client.invoke.reset_mock()
+    (repo / "a/b/one.py").write_text("def changed():\n    return 2\n")
+    generate_readme(str(repo))
+
+    prompts = [call.args[0][-1].content for call in client.invoke.call_args_list]
+    file_prompts = [p for p in prompts if "Analyze the code" in p]
+    assert len(file_prompts) == 1 and "`a/b/one.py`" in file_prompts[0]
+    # Only the rollups above a/b/one.py are redone; c/ keeps its cached summary
+    assert not any("the package `c/`" in p for p in prompts)
+    assert any("the package `a/b/`" in p for p in prompts)
+    assert len(prompts) < first_run
+
+
+def test_pack_summaries_by_budget():
+    summaries = {f"f{i}.py": "word " * 40 for i in range(5)}
+
+    groups = pack_summaries(summaries, budget=120)
+
+    assert [list(group) for group in groups] == [["f0.py", "f1.py"], ["f2.py", "f3.py"], ["f4.py"]]
+    assert pack_summaries({"big.py": "x" * 10000}, budget=50)[0]["big.py"] == "x" * ((50 - count_tokens("big.py") - 16) * 4)
+
+
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_reduce_stops_when_replies_do_not_shrink(mock_get_client):
+    # Every reply is longer than the budget, so packing them never needs fewer groups
+    client = fake_client()
+    client.invoke.side_effect = lambda messages, **kwargs: MagicMock(content="long reply " * 60)
+    mock_get_client.return_value = client
+    summaries = {f"f{i}.py": "word " * 40 for i in range(6)}
+
+    reduced, _ = reduce_summaries("the package `x/`", summaries, budget=120)
+
+    assert client.invoke.call_count <= 12
+    assert len(pack_summaries(reduced, 120)) == 1
+    assert len(reduced) == 3 and all(reduced.values())
+
+
+@patch("utils.llm_utils.llm_scheduler.get_groq_client")
+def test_reduce_merges_parts_whose_headers_exceed_the_budget(mock_get_client):
+    client = fake_client()
+    # Each group's reply is tagged with the first file of the group
+    client.invoke.side_effect = lambda messages, **kwargs: MagicMock(
+        content=re.search(r"`(f\d+)\.py`", messages[-1].content).group(1) + "-reply " + "long reply " * 60
+    )
+    mock_get_client.return_value = client
+    summaries = {f"f{i}.py": "word " * 40 for i in range(40)}
+
+    reduced, _ = reduce_summaries("the package `x/`", summaries, budget=120)
+
+    # 20 part summaries do not fit as sections, so they are merged with a share each rather than dropped
+    assert list(reduced) == ["the package `x/`"]
+    assert all(f"f{i}-reply " in reduced["the package `x/`"] for i in range(0, 40, 2))
+    assert count_tokens(format_summaries(reduced)) <= 120
+
@@ -0,0 +1,141 @@
+import os
+import threading
+import time
+from unittest.mock import patch
+
+from services.refactor_full_repo_service import refactor_all_python_files_in_repo, load_manifest, PARTIAL_SUFFIX
+
+
+def fake_fetch(owner, repo, file_path, branch="main", timeout=10.0):
+    if file_path == "broken.py":
+        raise FileNotFoundError(f"File '{file_path}' not found")
+    return f"# {file_path}"
+
+
+def fake_refactor(code, file_path, python_version="3.12", file_type="code", key_index=1, progress_callback=None, stream_path=None):
+    # Earlier files finish last, so ordering can't come from completion order
+    time.sleep(0.05 if file_path.startswith("a") else 0.0)
+    if progress_callback is not None:
+        progress_callback({"event": "llm-chunk", "file": file_path, "chunk": 1, "chunks": 1})
+    return f"{code} ({file_type})", key_index
+
+
+@patch("services.refactor_full_repo_service.get_cache", return_value=None)
+@patch("services.refactor_full_repo_service.refactor_code_or_test_file", side_effect=fake_refactor)
+@patch("services.refactor_full_repo_service.get_github_file_content", side_effect=fake_fetch)
+def test_concurrent_refactor_keeps_file_order(mock_fetch, mock_refactor, mock_cache, tmp_path):
+    files = ["a.py", "README.md", "broken.py", "tests/test_b.py", "c.py"]
+    output_dir = tmp_path / "out"
+
+    success, out, logs = refactor_all_python_files_in_repo(
+        "owner", "repo", "main", files, "3.12", output_dir=str(output_dir), max_workers=4
+    )
+
+    assert success is True
+    assert out == str(output_dir)
+    assert logs == [
+        "[✓] Refactored: a.py",
+        "[-] Skipped (not .py): README.md",
+        "[x] Failed broken.py: File 'broken.py' not found",
+        "[✓] Refactored: tests/test_b.py",
+        "[✓] Refactored: c.py",
+    ]
+    assert (output_dir / "a.py").read_text() == "# a.py (code)"
+    assert (output_dir / "tests" / "test_b.py").read_text() == "# tests/test_b.py (test)"
+    assert (output_dir / "README.md").read_text() == "# README.md"
+    assert os.path.getsize(output_dir / "broken.py") == 0
+
+
+@patch("services.refactor_full_repo_service.get_cache", return_value=None)
+@patch("services.refactor_full_repo_service.refactor_code_or_test_file", side_effect=fake_refactor)
+@patch("services.refactor_full_repo_service.get_github_file_content", side_effect=fake_fetch)
+@patch("services.refactor_full_repo_service.get_branch_head_sha")
+@patch("services.refactor_full_repo_service.get_branch_tree")
+def test_incremental_refactor_only_processes_changed_files(
+    mock_tree, mock_head, mock_fetch, mock_refactor, mock_cache, tmp_path
+):
+    output_dir = str(tmp_path / "out")
+
+    mock_head.return_value = "commit1"
+    mock_tree.return_value = {"a.py": ("sha-a1", "100644"), "b.py": ("sha-b1", "100644"), "old.py": ("sha-old", "100644")}
+    refactor_all_python_files_in_repo(
+        "owner", "repo", "main", ["a.py", "b.py", "old.py"], "3.12",
+        output_dir=output_dir, incremental=True
+    )
+    assert mock_fetch.call_count == 3
+
+    # b.py modified, old.py deleted, new.py added
+    mock_fetch.reset_mock()
+    mock_head.return_value = "commit2"
+    mock_tree.return_value = {"a.py": ("sha-a1", "100644"), "b.py": ("sha-b2", "100644"), "new.py": ("sha-new", "100644")}
+    success, _, logs = refactor_all_python_files_in_repo(
+        "owner", "repo", "main", ["a.py", "b.py", "new.py"], "3.12",
+        output_dir=output_dir, incremental=True
+    )
+
+    assert success is True
+    assert sorted(call.args[2] for call in mock_fetch.call_args_list) == ["b.py", "new.py"]
+    # Tree and contents are read at the head commit, not by branch name
+    assert mock_tree.call_args.args == ("owner", "repo", "commit2")
+    assert {call.args[3] for call in mock_fetch.call_args_list} == {"commit2"}
+    assert logs == [
+        "[=] Unchanged: a.py",
+        "[✓] Refactored: b.py",
+        "[✓] Refactored: new.py",
+        "[-] Removed: old.py",
+    ]
+    assert not (tmp_path / "out" / "old.py").exists()
+    assert (tmp_path / "out" / "a.py").read_text() == "# a.py (code)"
+
+    manifest = load_manifest(output_dir)
+    assert manifest["commit_sha"] == "commit2"
+    assert manifest["files"] == {"a.py": "sha-a1", "b.py": "sha-b2", "new.py": "sha-new"}
+
+
+@patch("services.refactor_full_repo_service.get_cache", return_value=None)
+@patch("services.refactor_full_repo_service.refactor_code_or_test_file", side_effect=fake_refactor)
+@patch("services.refactor_full_repo_service.get_github_file_content", side_effect=fake_fetch)
+def test_refactor_reports_per_file_events(mock_fetch, mock_refactor, mock_cache, tmp_path):
+    events = []
+    refactor_all_python_files_in_repo(
+        "owner", "repo", "main", ["a.py", "broken.py"], "3.12",
+        output_dir=str(tmp_path / "out"), max_workers=2, progress_callback=events.append
+    )
+
+    def kinds(file_path):
+        return [e["event"] for e in events if e["file"] == file_path]
+
+    assert kinds("a.py") == ["queued", "fetching", "fetched", "llm-chunk", "written"]
+    assert kinds("broken.py") == ["queued", "fetching", "failed"]
+    finished = [e for e in events if e["event"] in ("written", "failed")]
+    assert [e["done"] for e in finished] == [1, 2]
+    assert all(e["seconds"] >= 0 and e["files_per_second"] > 0 for e in finished)
+
+
+def fake_streaming_refactor(code, file_path, python_version="3.12", file_type="code", key_index=1, progress_callback=None, stream_path=None):
+    with open(stream_path, "w", encoding="utf-8") as f:
+        f.write(code)
+    time.sleep(0.05)
+    return code, key_index
+
+
+@patch("services.refactor_full_repo_service.get_cache", return_value=None)
+@patch("services.refactor_full_repo_service.refactor_code_or_test_file", side_effect=fake_streaming_refactor)
+@patch("services.refactor_full_repo_service.get_github_file_content", side_effect=fake_fetch)
+def test_cancel_removes_partial_files(mock_fetch, mock_refactor, mock_cache, tmp_path):
+    cancel_event = threading.Event()
+
+    def cancel_after_first(event):
+        if event["event"] == "written":
+            cancel_event.set()
+
+    success, out, logs = refactor_all_python_files_in_repo(
+        "owner", "repo", "main", ["a.py", "b.py", "c.py", "d.py"], "3.12", output_dir=str(tmp_path / "out"),
+        max_workers=2, progress_callback=cancel_after_first, cancel_event=cancel_event
+    )
+
+    assert success is True
+    assert logs == ["[✓] Refactored: a.py", "[!] Cancelled after 1 of 4 files"]
+    written = sorted(str(path.relative_to(out)) for path in (tmp_path / "out").rglob("*"))
+    assert written == ["a.py"]
+    assert not any(name.endswith(PARTIAL_SUFFIX) for name in written)
@@ -0,0 +1,94 @@
+import pytest
+
+from services.static_analysis_service import analyze_source, analyze_directory, format_static_report
+
+CODE = '''from typing import List, Dict
+from os.path import *
+
+TIMEOUT = 30
+
+
+def handle(items=[], options={}):
+    global counter
+    for item in items:
+        if item == None:
+            continue
+        elif type(item) == str:
+            while item:
+                if item.startswith("a"):
+                    try:
+                        item = item[1:]
+                    except:
+                        pass
+        else:
+            return item * 42 if item and options else 0
+    return "%s done" % TIMEOUT
+
+
+class Client:
+    def connect(self, a, b, c, d, e, f, g):
+        return ("10.0.0.12", 8080)
+'''
+
+
+def rules(analysis):
+    return {finding.rule for finding in analysis.findings}
+
+
+def test_rules_found_in_one_pass():
+    analysis = analyze_source(CODE, "sample.py")
+
+    assert rules(analysis) == {
+        "outdated-typing", "wildcard-import", "mutable-default-arg", "global-statement", "none-comparison",
+        "type-comparison", "bare-except", "swallowed-exception", "magic-number", "percent-format",
+        "too-many-args", "hardcoded-address", "deep-nesting",
+    }
+    # TIMEOUT = 30 is a named constant; 42 and 8080 are magic
+    assert [f.line for f in analysis.findings if f.rule == "magic-number"] == [20, 26]
+    assert len([f for f in analysis.findings if f.rule == "mutable-default-arg"]) == 2
+    assert next(f for f in analysis.findings if f.rule == "too-many-args").symbol == "Client.connect"
+
+
+def test_function_metrics():
+    analysis = analyze_source(CODE, "sample.py")
+    handle, connect = analysis.functions
+
+    # for, if, elif, while, if, except, if-expression, `and`
+    assert (handle.name, handle.complexity, handle.lines) == ("handle", 9, 15)
+    # for > if/elif > while > if > try
+    assert handle.max_nesting == 5
+    assert (connect.name, connect.complexity, connect.args) == ("Client.connect", 1, 7)
+    assert analysis.metrics["max_complexity"] == 9 and analysis.metrics["classes"] == 1
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("def f(x):\n    return [y for y in x if y]\n", 3),
+    ("def f(a, b, c):\n    if a or b or c:\n        return 1\n", 4),
+    ("def f(x):\n    match x:\n        case 1:\n            return 1\n        case _:\n            return 0\n", 3),
+])
+def test_cyclomatic_complexity(code, expected):
+    assert analyze_source(code).functions[0].complexity == expected
+
+
+def test_syntax_error_is_reported():
+    analysis = analyze_source("def f(:\n", "broken.py")
+
+    assert analysis.error and rules(analysis) == {"syntax-error"}
+    assert "does not parse" in format_static_report(analysis)
+
+
+def test_directory_analysis_in_process_pool(tmp_path):
+    for i in range(16):
+        package = tmp_path / f"pkg{i % 2}"
+        package.mkdir(exist_ok=True)
+        (package / f"module_{i}.py").write_text(CODE if i == 0 else f"def f{i}():\n    return {i}\n")
+    (tmp_path / "notes.txt").write_text("not python")
+
+    result = analyze_directory(str(tmp_path), max_workers=2)
+
+    assert result["summary"]["files"] == 16
+    assert result["files"]["pkg0/module_0.py"]["functions"][0]["complexity"] == 9
+    assert result["summary"]["rules"]["bare-except"] == 1
+    assert result["summary"]["most_complex"][0]["file_path"] == "pkg0/module_0.py"
+    with pytest.raises(FileNotFoundError):
+        analyze_directory(str(tmp_path / "missing"))
@@ -0,0 +1,57 @@
+from unittest.mock import MagicMock, patch
+
+from utils.llm_utils.token_counter import TokenCounter, MESSAGE_OVERHEAD_TOKENS
+from utils.llm_utils.prompt_packing import invoke_prompts
+
+
+class WordEncoding:
+    """Stand-in BPE encoding: one token per whitespace-separated word."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text, disallowed_special=()):
+        self.calls += 1
+        return text.split()
+
+
+def counter_with(encoding):
+    counter = TokenCounter(encoding_name="test")
+    counter._encoding, counter._loaded = encoding, True
+    return counter
+
+
+def test_counts_use_the_encoder_and_are_memoized():
+    encoding = WordEncoding()
+    counter = counter_with(encoding)
+    text = "word " * 100
+
+    assert counter.count(text) == 100
+    assert counter.count(text) == 100
+    assert encoding.calls == 1
+    assert counter.stats()["hits"] == 1 and counter.stats()["exact"] is True
+
+
+def test_falls_back_to_character_estimate_without_encoder():
+    counter = TokenCounter(encoding_name="test")
+    with patch("tiktoken.get_encoding", side_effect=OSError("offline")):
+        assert counter.count("abcdefghi") == 3
+    assert counter.exact is False
+    assert counter.count("") == 0
+
+
+def test_message_count_includes_overhead():
+    counter = counter_with(WordEncoding())
+    messages = [MagicMock(content="a b"), MagicMock(content="c")]
+    assert counter.count_messages(messages) == 3 + 2 * MESSAGE_OVERHEAD_TOKENS
+
+
+@patch("utils.llm_utils.prompt_packing.llm_scheduler")
+def test_each_call_gets_a_max_tokens_limit(mock_scheduler):
+    mock_scheduler.invoke.return_value = (MagicMock(content="ok"), 0)
+
+    invoke_prompts("test", "system", ["prompt"], max_output_tokens=123)
+
+    kwargs = mock_scheduler.invoke.call_args.kwargs
+    assert kwargs["max_tokens"] == 123
+    assert kwargs["estimated_tokens"] > 0
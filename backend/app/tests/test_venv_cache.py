@@ -0,0 +1,141 @@
+import io
+import os
+import sys
+import json
+import time
+import tarfile
+import zipfile
+
+import pytest
+
+from services.dependency_management_services import setup_virtualenv_and_install_requirements
+import utils.venv_cache as venv_cache
+from utils.venv_cache import get_environment, evict_environments, evict_wheels, normalize_requirements, resolve_requirements, ResolutionError, READY_MARKER
+
+
+def make_wheel(wheelhouse, name="tiny_pkg", version="1.0"):
+    dist_info = f"{name}-{version}.dist-info"
+    files = {
+        f"{name}/__init__.py": "VALUE = 1\n",
+        f"{dist_info}/METADATA": f"Metadata-Version: 2.1\nName: {name.replace('_', '-')}\nVersion: {version}\n",
+        f"{dist_info}/WHEEL": "Wheel-Version: 1.0\nGenerator: test\nRoot-Is-Purelib: true\nTag: py3-none-any\n",
+    }
+    record = "".join(f"{path},,\n" for path in files) + f"{dist_info}/RECORD,,\n"
+    with zipfile.ZipFile(os.path.join(wheelhouse, f"{name}-{version}-py3-none-any.whl"), "w") as wheel:
+        for path, content in files.items():
+            wheel.writestr(path, content)
+        wheel.writestr(f"{dist_info}/RECORD", record)
+
+
+def test_normalize_requirements():
+    assert normalize_requirements("PyYAML\n# comment\n\n-r other.txt\nrequests >= 2.0  # pinned\npyyaml\nzope.interface\n") == [
+        "pyyaml", "requests>=2.0", "zope-interface"
+    ]
+
+
+def test_environment_is_built_offline_then_reused(tmp_path):
+    cache_dir, wheelhouse = str(tmp_path / "venvs"), str(tmp_path / "wheels")
+    os.makedirs(wheelhouse)
+    make_wheel(wheelhouse)
+
+    built = get_environment("tiny_pkg\n", sys.executable, offline=True, cache_dir=cache_dir, wheelhouse=wheelhouse)
+    reused = get_environment("# same set\nTiny-Pkg", sys.executable, offline=True, cache_dir=cache_dir, wheelhouse=wheelhouse)
+
+    assert not built.reused and reused.reused
+    assert built.env_dir == reused.env_dir
+    assert reused.installed_packages == built.installed_packages == ["tiny-pkg==1.0"]
+
+    with pytest.raises(RuntimeError, match="offline"):
+        get_environment("not-in-wheelhouse", sys.executable, offline=True, cache_dir=cache_dir, wheelhouse=wheelhouse)
+    # The failed build leaves nothing behind
+    assert os.listdir(cache_dir) == [os.path.basename(built.env_dir)]
+
+
+def test_least_recently_used_environments_are_evicted(tmp_path):
+    now = time.time()
+    for i, name in enumerate(["old", "middle", "new"]):
+        env_dir = tmp_path / name
+        env_dir.mkdir()
+        marker = env_dir / READY_MARKER
+        marker.write_text(json.dumps({"size": 3 * 1024 * 1024}))
+        os.utime(marker, (now - 100 + i, now - 100 + i))
+    (tmp_path / "building").mkdir()
+
+    removed = evict_environments(str(tmp_path), max_mb=6, keep=str(tmp_path / "old"))
+
+    assert removed == [str(tmp_path / "middle")]
+    assert sorted(os.listdir(tmp_path)) == ["building", "new", "old"]
+
+
+def test_eviction_skips_environments_in_use(tmp_path):
+    for name in ["busy", "idle"]:
+        (tmp_path / name).mkdir()
+        (tmp_path / name / READY_MARKER).write_text(json.dumps({"size": 3 * 1024 * 1024}))
+    os.utime(tmp_path / "busy" / READY_MARKER, (time.time() - 100, time.time() - 100))
+
+    # get_environment holds the key lock while it reuses or builds an environment
+    with venv_cache._key_lock("busy"):
+        removed = evict_environments(str(tmp_path), max_mb=4)
+
+    assert removed == [str(tmp_path / "idle")]
+    assert os.listdir(tmp_path) == ["busy"]
+
+
+def test_least_recently_used_wheels_are_evicted(tmp_path):
+    now = time.time()
+    for i, name in enumerate(["old", "middle", "new"]):
+        wheel = tmp_path / f"{name}_pkg-1.0-py3-none-any.whl"
+        wheel.write_bytes(b"x" * 1024 * 1024)
+        os.utime(wheel, (now - 100 + i, now - 100 + i))
+
+    # Nothing is removed while pip reads the wheelhouse
+    with venv_cache._using_wheelhouse(str(tmp_path)):
+        assert evict_wheels(str(tmp_path), max_mb=2) == []
+    removed = evict_wheels(str(tmp_path), max_mb=2)
+
+    assert removed == [str(tmp_path / "old_pkg-1.0-py3-none-any.whl")]
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_resolve_only_pins_without_installing(tmp_path):
+    wheelhouse = str(tmp_path / "wheels")
+    os.makedirs(wheelhouse)
+    make_wheel(wheelhouse)
+    make_wheel(wheelhouse, name="other_pkg", version="2.0")
+    options = {"offline": True, "cache_dir": str(tmp_path / "venvs"), "wheelhouse": wheelhouse}
+
+    assert resolve_requirements("other_pkg\ntiny-pkg\n", sys.executable, **options) == ["other-pkg==2.0", "tiny-pkg==1.0"]
+    # Resolving for another Python version only considers wheels
+    assert resolve_requirements("tiny-pkg", sys.executable, python_version="3.12", **options) == ["tiny-pkg==1.0"]
+    with pytest.raises(ResolutionError, match="tiny-pkg==3.0"):
+        resolve_requirements("tiny-pkg==3.0", sys.executable, **options)
+    assert not os.path.exists(options["cache_dir"])
+
+
+def test_resolve_only_rejects_sdist_only_requirements(tmp_path):
+    # get_environment installs wheels only, so an sdist must not resolve (nor be built)
+    wheelhouse = tmp_path / "wheels"
+    wheelhouse.mkdir()
+    setup_py = b"raise SystemExit('sdist was built')\n"
+    with tarfile.open(wheelhouse / "sdist_pkg-1.0.tar.gz", "w:gz") as sdist:
+        info = tarfile.TarInfo("sdist_pkg-1.0/setup.py")
+        info.size = len(setup_py)
+        sdist.addfile(info, io.BytesIO(setup_py))
+
+    with pytest.raises(ResolutionError, match="sdist-pkg") as error:
+        resolve_requirements("sdist-pkg", sys.executable, offline=True, cache_dir=str(tmp_path / "venvs"), wheelhouse=str(wheelhouse))
+    assert "sdist was built" not in str(error.value)
+
+
+def test_setup_resolve_only_writes_pins(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        "services.dependency_management_services.resolve_requirements",
+        lambda text, executable, version, offline: calls.append((text, version, offline)) or ["tiny-pkg==1.0"],
+    )
+
+    result = setup_virtualenv_and_install_requirements("tiny-pkg", "3.99", str(tmp_path / "repo"), offline=True, resolve_only=True)
+
+    assert result["success"] and result["installed_packages"] == "tiny-pkg==1.0"
+    assert calls == [("tiny-pkg", "3.99", True)]
+    assert (tmp_path / "repo" / "requirements.txt").read_text() == "tiny-pkg==1.0"
@@ -0,0 +1,371 @@
+import os
+import mmap
+import glob
+import struct
+import zipfile
+import argparse
+import threading
+import zlib
+from importlib.metadata import distributions
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distribution_index.bin")
+DISTRIBUTION_INDEX_PATH = os.getenv("DISTRIBUTION_INDEX_PATH", DEFAULT_INDEX_PATH)
+# Documented list of common packages the bundled index is built from
+DISTRIBUTION_PACKAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "distribution_packages.txt")
+
+# Import names whose distribution on PyPI has a different name; these win over collected metadata
+CURATED_DISTRIBUTIONS = {
+    "attr": "attrs",
+    "Bio": "biopython",
+    "bs4": "beautifulsoup4",
+    "Crypto": "pycryptodome",
+    "cv2": "opencv-python",
+    "dateutil": "python-dateutil",
+    "dns": "dnspython",
+    "docx": "python-docx",
+    "dotenv": "python-dotenv",
+    "faiss": "faiss-cpu",
+    "fitz": "PyMuPDF",
+    "gi": "PyGObject",
+    "git": "GitPython",
+    "github": "PyGithub",
+    "gitlab": "python-gitlab",
+    "googleapiclient": "google-api-python-client",
+    "grpc": "grpcio",
+    "jose": "python-jose",
+    "jwt": "PyJWT",
+    "kafka": "kafka-python",
+    "ldap": "python-ldap",
+    "Levenshtein": "python-Levenshtein",
+    "magic": "python-magic",
+    "mpl_toolkits": "matplotlib",
+    "multipart": "python-multipart",
+    "MySQLdb": "mysqlclient",
+    "nacl": "PyNaCl",
+    "OpenSSL": "pyOpenSSL",
+    "osgeo": "GDAL",
+    "PIL": "Pillow",
+    "pkg_resources": "setuptools",
+    "pptx": "python-pptx",
+    "psycopg2": "psycopg2-binary",
+    "pymysql": "PyMySQL",
+    "serial": "pyserial",
+    "skimage": "scikit-image",
+    "sklearn": "scikit-learn",
+    "slugify": "python-slugify",
+    "snappy": "python-snappy",
+    "socks": "PySocks",
+    "telegram": "python-telegram-bot",
+    "usb": "pyusb",
+    "websocket": "websocket-client",
+    "win32api": "pywin32",
+    "win32con": "pywin32",
+    "wx": "wxPython",
+    "Xlib": "python-xlib",
+    "yaml": "PyYAML",
+    "zmq": "pyzmq",
+}
+
+# File layout: header, then `slots` fixed-size slots of an open-addressing hash
+# table keyed by crc32 of the import name, then the strings they point to.
+# Each string is a little-endian uint16 length followed by UTF-8 bytes; a value
+# holds the distribution names separated by newlines.
+MAGIC = b"PYDX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")  # magic, version, reserved, entries, slots
+SLOT = struct.Struct("<III")  # hash, key offset, value offset
+EMPTY = 0xFFFFFFFF
+LENGTH = struct.Struct("<H")
+
+
+def _hash(name: bytes) -> int:
+    return zlib.crc32(name)
+
+
+def write_index(mapping: Dict[str, List[str]], path: str) -> int:
+    """
+    Writes an import name -> distributions mapping as a memory-mappable hash table.
+
+    The file is replaced atomically, so readers never see a partial index.
+
+    Args:
+        mapping: Import name -> distribution names.
+        path: Destination file.
+
+    Returns:
+        Number of entries written.
+    """
+    entries = sorted(mapping.items())
+    # Load factor of at most 1/2 keeps probe sequences short
+    slots = max(8, 1 << (len(entries) * 2 - 1).bit_length())
+    table = [(0, EMPTY, EMPTY)] * slots
+    strings = bytearray()
+    offsets: Dict[bytes, int] = {}
+
+    def add_string(text: str) -> int:
+        data = text.encode("utf-8")
+        if data not in offsets:
+            offsets[data] = len(strings)
+            strings.extend(LENGTH.pack(len(data)) + data)
+        return offsets[data]
+
+    for name, values in entries:
+        key = name.encode("utf-8")
+        value = "\n".join(dict.fromkeys(values))
+        slot = _hash(key) & (slots - 1)
+        while table[slot][1] != EMPTY:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = (_hash(key), add_string(name), add_string(value))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(entries), slots))
+        for entry in table:
+            f.write(SLOT.pack(*entry))
+        f.write(strings)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+class DistributionIndex:
+    """
+    Read-only, memory-mapped import name -> PyPI distribution index.
+
+    The file is opened on the first lookup, so creating the index costs nothing
+    at startup, and a lookup reads a handful of bytes from the mapping.
+    """
+
+    def __init__(self, path: str = DISTRIBUTION_INDEX_PATH):
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        self._slots = 0
+        self._entries = 0
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                with open(self.path, "rb") as f:
+                    mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Distribution index {self.path} not available ({e}); using the curated table only.")
+                return
+            magic, version, _, entries, slots = HEADER.unpack_from(mapping, 0)
+            if magic != MAGIC or version != VERSION:
+                logger.warning(f"{self.path} is not a distribution index (version {VERSION}); using the curated table only.")
+                mapping.close()
+                return
+            self._map, self._entries, self._slots = mapping, entries, slots
+
+    def _string(self, offset: int) -> str:
+        start = HEADER.size + self._slots * SLOT.size + offset
+        (length,) = LENGTH.unpack_from(self._map, start)
+        return self._map[start + LENGTH.size:start + LENGTH.size + length].decode("utf-8")
+
+    def get(self, name: str) -> List[str]:
+        """
+        Returns the distributions that provide an import name.
+
+        Args:
+            name: Top-level import name, e.g. "yaml".
+
+        Returns:
+            Distribution names (several for namespace packages such as `google`), or [] if unknown.
+        """
+        if name in CURATED_DISTRIBUTIONS:
+            return [CURATED_DISTRIBUTIONS[name]]
+        if not self._loaded:
+            self._load()
+        if self._map is None:
+            return []
+        key = name.encode("utf-8")
+        key_hash = _hash(key)
+        slot = key_hash & (self._slots - 1)
+        for _ in range(self._slots):
+            entry_hash, key_offset, value_offset = SLOT.unpack_from(self._map, HEADER.size + slot * SLOT.size)
+            if key_offset == EMPTY:
+                return []
+            if entry_hash == key_hash and self._string(key_offset) == name:
+                return self._string(value_offset).split("\n")
+            slot = (slot + 1) & (self._slots - 1)
+        return []
+
+    def __len__(self) -> int:
+        if not self._loaded:
+            self._load()
+        return self._entries
+
+    def close(self) -> None:
+        with self._lock:
+            if self._map is not None:
+                self._map.close()
+            self._map, self._loaded = None, False
+
+
+def _top_level_from_files(paths: Iterable[str]) -> Set[str]:
+    """Top-level import names of a distribution, from the paths listed in its RECORD."""
+    names = set()
+    for path in paths:
+        parts = path.replace("\\", "/").split("/")
+        top = parts[0]
+        if top in ("..", "__pycache__") or top.endswith((".dist-info", ".egg-info", ".data")):
+            continue
+        if len(parts) > 1:
+            if parts[-1].endswith((".py", ".so", ".pyd")):
+                names.add(top)
+        elif top.endswith((".py", ".so", ".pyd")):
+            names.add(top.split(".")[0])
+    return names
+
+
+def _top_level_names(top_level: Optional[str], files: Iterable[str]) -> Set[str]:
+    if top_level:
+        names = {line.strip().replace("/", ".").split(".")[0] for line in top_level.splitlines()}
+    else:
+        names = _top_level_from_files(files)
+    # Private modules (_yaml, _distutils_hack) are not imported by projects
+    return {name for name in names if name.isidentifier() and not name.startswith("_")}
+
+
+def collect_installed() -> Dict[str, Set[str]]:
+    """Import name -> distributions, from the metadata of the packages installed in this environment."""
+    mapping: Dict[str, Set[str]] = {}
+    for distribution in distributions():
+        name = distribution.metadata["Name"]
+        if not name:
+            continue
+        files = [str(path) for path in distribution.files or []]
+        for module in _top_level_names(distribution.read_text("top_level.txt"), files):
+            mapping.setdefault(module, set()).add(name)
+    return mapping
+
+
+def _read_wheel(path: str) -> Tuple[Optional[str], Set[str]]:
+    with zipfile.ZipFile(path) as wheel:
+        files = wheel.namelist()
+        dist_info = next((f.split("/")[0] for f in files if f.split("/")[0].endswith(".dist-info")), None)
+        if dist_info is None:
+            return None, set()
+        name = None
+        metadata = wheel.read(f"{dist_info}/METADATA").decode("utf-8", errors="replace")
+        for line in metadata.splitlines():
+            if line.startswith("Name:"):
+                name = line.split(":", 1)[1].strip()
+                break
+        top_level_path = f"{dist_info}/top_level.txt"
+        top_level = wheel.read(top_level_path).decode("utf-8") if top_level_path in files else None
+        return name, _top_level_names(top_level, files)
+
+
+def collect_wheels(wheel_dir: str) -> Dict[str, Set[str]]:
+    """Import name -> distributions, from every .whl file under a directory (e.g. pip's wheel cache)."""
+    mapping: Dict[str, Set[str]] = {}
+    for path in glob.glob(os.path.join(wheel_dir, "**", "*.whl"), recursive=True):
+        try:
+            name, modules = _read_wheel(path)
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"Skipping unreadable wheel {path}: {e}")
+            continue
+        for module in modules if name else ():
+            mapping.setdefault(module, set()).add(name)
+    return mapping
+
+
+def load_package_list(path: str = DISTRIBUTION_PACKAGES_PATH) -> Dict[str, str]:
+    """
+    Reads a package list: one import name per line, optionally followed by its distribution.
+
+    Args:
+        path: List file; blank lines and '#' comments are ignored.
+
+    Returns:
+        Import name -> distribution name (the import name itself when none is given).
+    """
+    packages = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            fields = line.split("#", 1)[0].split()
+            if fields:
+                packages[fields[0]] = fields[1] if len(fields) > 1 else fields[0]
+    return packages
+
+
+def rebuild_index(
+    wheel_dir: Optional[str] = None,
+    include_installed: bool = False,
+    path: str = DEFAULT_INDEX_PATH,
+    packages_file: Optional[str] = DISTRIBUTION_PACKAGES_PATH
+) -> int:
+    """
+    Rebuilds the distribution index from the curated table, a package list and package metadata.
+
+    By default this rebuilds the bundled index, which only holds the documented
+    package list and the curated table. Collecting the installed packages or a
+    wheel cache is meant for local, environment-specific indexes and must be
+    written to another path.
+
+    Args:
+        wheel_dir: Directory of wheels to read (searched recursively), e.g. ~/.cache/pip/wheels.
+        include_installed: Also read the packages installed in this environment.
+        path: Index file to write.
+        packages_file: Package list to include (see load_package_list), or None.
+
+    Returns:
+        Number of import names in the new index.
+
+    Raises:
+        ValueError: If installed packages or wheels would be written into the bundled index.
+    """
+    if (include_installed or wheel_dir) and os.path.realpath(path) == os.path.realpath(DEFAULT_INDEX_PATH):
+        raise ValueError(
+            "The bundled index is built from the package list only; write an index of installed "
+            "packages or wheels to another path."
+        )
+
+    mapping: Dict[str, Set[str]] = {}
+    sources = [collect_installed()] if include_installed else []
+    if wheel_dir:
+        sources.append(collect_wheels(wheel_dir))
+    for source in sources:
+        for module, names in source.items():
+            mapping.setdefault(module, set()).update(names)
+    entries = {module: sorted(names) for module, names in mapping.items()}
+    # The documented list, then the curated table, win over collected metadata
+    if packages_file:
+        entries.update({module: [name] for module, name in load_package_list(packages_file).items()})
+    entries.update({module: [name] for module, name in CURATED_DISTRIBUTIONS.items()})
+
+    count = write_index(entries, path)
+    if path == distribution_index.path:
+        distribution_index.close()
+    logger.info(f"Wrote {count} import names to the distribution index {path}")
+    return count
+
+
+distribution_index = DistributionIndex()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the import name -> PyPI distribution index.")
+    parser.add_argument("--wheels", help="Directory of .whl files to index, e.g. ~/.cache/pip/wheels (needs --output)")
+    parser.add_argument("--installed", action="store_true", help="Also index the packages installed here (needs --output)")
+    parser.add_argument("--packages", default=DISTRIBUTION_PACKAGES_PATH, help="Package list to include")
+    parser.add_argument("--output", default=DEFAULT_INDEX_PATH, help="Index file to write (default: the bundled index)")
+    args = parser.parse_args()
+    try:
+        rebuild_index(
+            os.path.expanduser(args.wheels) if args.wheels else None, args.installed,
+            os.path.expanduser(args.output), args.packages
+        )
+    except ValueError as e:
+        parser.error(str(e))
@@ -0,0 +1,197 @@
+import os
+import time
+import random
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+GITHUB_POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "20"))
+GITHUB_MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "3"))
+GITHUB_BACKOFF_BASE = float(os.getenv("GITHUB_BACKOFF_BASE", "0.5"))
+GITHUB_BACKOFF_MAX = float(os.getenv("GITHUB_BACKOFF_MAX", "60"))
+GITHUB_TIMEOUT = float(os.getenv("GITHUB_TIMEOUT", "30"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Only these are retried after a read timeout or a 5xx: a POST/PUT/PATCH may have been
+# applied already, and its retry would fail (409 on contents, 422 on pulls)
+IDEMPOTENT_METHODS = {"GET", "HEAD"}
+
+
+class GitHubClient:
+    """
+    Shared HTTP client for every GitHub call.
+
+    Keeps one connection-pooled `requests.Session` (keep-alive across calls),
+    retries transient failures with jittered exponential backoff, honours
+    `Retry-After` and `X-RateLimit-Reset` on rate limits, and records per-call
+    latency metrics grouped by method and host. Non-idempotent requests are only
+    retried when GitHub cannot have applied them: the connection was never
+    established, or a rate limit rejected them with `Retry-After`.
+    """
+
+    def __init__(
+        self,
+        api_url: str = GITHUB_API_URL,
+        pool_size: int = GITHUB_POOL_SIZE,
+        max_retries: int = GITHUB_MAX_RETRIES,
+        backoff_base: float = GITHUB_BACKOFF_BASE,
+        backoff_max: float = GITHUB_BACKOFF_MAX,
+        timeout: float = GITHUB_TIMEOUT
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._metrics: Dict[str, Dict[str, float]] = {}
+        self._metrics_lock = threading.Lock()
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Sends a request, retrying on connection errors, 5xx responses and rate limits.
+
+        GET and HEAD are retried on any network error or 5xx. Other methods are only
+        retried when the connection could not be established, or on a 429/403 with
+        `Retry-After`.
+
+        Args:
+            method: HTTP method.
+            url: Full request URL.
+            kwargs: Extra arguments passed to `requests.Session.request`.
+
+        Returns:
+            The final response (which may still be an error status once retries are exhausted).
+
+        Raises:
+            requests.exceptions.RequestException: If the request keeps failing at the network level.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(method, url, time.perf_counter() - start, error=True)
+                if attempt == self.max_retries or (method.upper() not in IDEMPOTENT_METHODS and not _not_sent(e)):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{method} {url} failed ({e}); retrying in {delay:.2f}s...")
+                time.sleep(delay)
+                continue
+
+            self._record(method, url, time.perf_counter() - start, error=response.status_code >= 400)
+            delay = self._retry_delay(response, attempt, method)
+            if delay is None or attempt == self.max_retries:
+                return response
+
+            logger.warning(f"{method} {url} returned {response.status_code}; retrying in {delay:.2f}s...")
+            response.close()
+            time.sleep(delay)
+
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("PATCH", url, **kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: a random delay up to base * 2^attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _retry_delay(self, response: requests.Response, attempt: int, method: str = "GET") -> Optional[float]:
+        """
+        Decides whether a response should be retried and how long to wait first.
+
+        Returns:
+            Seconds to wait, or None if the response should be returned as-is.
+        """
+        headers = response.headers
+        rate_limited = response.status_code == 429 or (
+            response.status_code == 403
+            and (headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in headers)
+        )
+        if method.upper() not in IDEMPOTENT_METHODS:
+            if not (rate_limited and "Retry-After" in headers):
+                return None
+        elif response.status_code not in RETRY_STATUSES and not rate_limited:
+            return None
+
+        wait: Optional[float] = None
+        retry_after = headers.get("Retry-After")
+        if retry_after and retry_after.strip().isdigit():
+            wait = float(retry_after)
+        elif rate_limited and headers.get("X-RateLimit-Reset", "").isdigit():
+            wait = max(0.0, float(headers["X-RateLimit-Reset"]) - time.time())
+
+        if wait is None:
+            return self._backoff(attempt)
+        if wait > self.backoff_max:
+            # Quota resets too far in the future; let the caller see the error
+            return None
+        return wait + random.uniform(0, self.backoff_base)
+
+    def _record(self, method: str, url: str, elapsed: float, error: bool) -> None:
+        key = f"{method} {urlparse(url).netloc}"
+        with self._metrics_lock:
+            entry = self._metrics.setdefault(
+                key, {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["calls"] += 1
+            entry["errors"] += int(error)
+            entry["total_seconds"] += elapsed
+            entry["max_seconds"] = max(entry["max_seconds"], elapsed)
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns call counts and latencies per method and host.
+
+        Returns:
+            Mapping like {"GET api.github.com": {"calls", "errors", "total_seconds", "max_seconds", "avg_seconds"}}.
+        """
+        with self._metrics_lock:
+            return {
+                key: {**entry, "avg_seconds": entry["total_seconds"] / entry["calls"]}
+                for key, entry in self._metrics.items()
+            }
+
+    def reset_metrics(self) -> None:
+        """Clears the collected metrics."""
+        with self._metrics_lock:
+            self._metrics.clear()
+
+
+def _not_sent(error: requests.exceptions.RequestException) -> bool:
+    """True if the request failed while connecting, i.e. before any of it reached the server."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    # NewConnectionError (refused, DNS failure) is a ConnectTimeoutError in urllib3
+    return isinstance(error, requests.exceptions.ConnectionError) and isinstance(reason, ConnectTimeoutError)
+
+
+# Shared by all GitHub helpers so connections are reused across requests
+github_client = GitHubClient()
+
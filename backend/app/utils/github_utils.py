@@ -1,10 +1,46 @@
-from urllib.parse import urlparse
+from urllib.parse import urlparse, quote
 from typing import Dict
 import requests
-from typing import List
+from typing import Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 import os
+import re
+import uuid
+import hashlib
+import shutil
+import tarfile
+import tempfile
+import threading
+from contextlib import contextmanager
+from loguru import logger
+from utils.github_client import github_client
 load_dotenv()
+
+GITHUB_RAW_URL = os.getenv("GITHUB_RAW_URL", "https://raw.githubusercontent.com")
+GITHUB_ARCHIVE_URL = os.getenv("GITHUB_ARCHIVE_URL", "https://codeload.github.com")
+SNAPSHOT_DIR = os.getenv("GITHUB_SNAPSHOT_DIR", os.path.join(".cache", "snapshots"))
+# Inside a branch's snapshot directory, names the subdirectory holding its current snapshot
+SNAPSHOT_POINTER = ".current"
+
+_COMMIT_SHA = re.compile(r"^[0-9a-f]{40}$")
+_snapshot_locks: Dict[str, threading.Lock] = {}
+# Number of branch_snapshot blocks reading each snapshot directory
+_snapshot_readers: Dict[str, int] = {}
+_snapshot_locks_guard = threading.Lock()
+
+def git_blob_sha(data: bytes) -> str:
+    """
+    Computes the SHA-1 git assigns to a blob, without any network call.
+
+    Args:
+        data: Raw file content.
+
+    Returns:
+        The blob SHA, comparable with the SHAs of a git tree listing.
+    """
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
 def get_owner_and_repo(repo_url: str) -> Dict[str, str]:
     """
     Extracts the owner and repository name from a GitHub URL.
@@ -47,9 +83,9 @@ def get_branch_list(owner: str, repo: str) -> List[str]:
         ValueError: If the repository is not found or the API returns an error.
         requests.exceptions.RequestException: If a network error occurs.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/branches"
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/branches"
     try:
-        res = requests.get(url, timeout=10)
+        res = github_client.get(url, timeout=10)
         if res.status_code == 200:
             return [branch["name"] for branch in res.json()]
         elif res.status_code == 404:
@@ -76,9 +112,9 @@ def get_branch_files(owner: str, repo: str, branch: str = "main") -> List[str]:
         ValueError: If the branch or repository is not found, or if the GitHub API returns an error.
         requests.exceptions.RequestException: If a network error occurs.
     """
-    url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
     try:
-        res = requests.get(url, timeout=10)
+        res = github_client.get(url, timeout=10)
         if res.status_code == 200:
             return [item["path"] for item in res.json()["tree"] if item["type"] == "blob"]
         elif res.status_code == 404:
@@ -89,6 +125,68 @@ def get_branch_files(owner: str, repo: str, branch: str = "main") -> List[str]:
         raise requests.exceptions.RequestException("Network error while fetching files") from e
 
 
+def get_branch_tree(owner: str, repo: str, branch: str = "main") -> Dict[str, Tuple[str, str]]:
+    """
+    Fetches all file paths (blobs) of a branch together with their git blob SHAs and modes.
+
+    Args:
+        owner (str): GitHub username or organization name.
+        repo (str): Repository name.
+        branch (str, optional): Branch name, commit SHA or tree SHA to list. Defaults to "main".
+
+    Returns:
+        Dict[str, Tuple[str, str]]: Mapping of file path to (blob SHA, file mode), e.g.
+            ("3b18e5...", "100755") for an executable script or "120000" for a symlink.
+
+    Raises:
+        ValueError: If the branch or repository is not found, or if the GitHub API returns an error.
+        requests.exceptions.RequestException: If a network error occurs.
+    """
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/git/trees/{branch}?recursive=1"
+    try:
+        res = github_client.get(url, timeout=10)
+        if res.status_code == 200:
+            return {
+                item["path"]: (item["sha"], item.get("mode", "100644"))
+                for item in res.json()["tree"] if item["type"] == "blob"
+            }
+        elif res.status_code == 404:
+            raise ValueError(f"Branch '{branch}' not found in repository '{owner}/{repo}' (404).")
+        else:
+            raise ValueError(f"GitHub API error while fetching files: {res.status_code}")
+    except requests.exceptions.RequestException as e:
+        raise requests.exceptions.RequestException("Network error while fetching files") from e
+
+
+def get_branch_head_sha(owner: str, repo: str, branch: str = "main") -> str:
+    """
+    Fetches the SHA of the latest commit on a branch.
+
+    Args:
+        owner (str): GitHub username or organization name.
+        repo (str): Repository name.
+        branch (str, optional): Branch name. Defaults to "main".
+
+    Returns:
+        str: The commit SHA the branch points to.
+
+    Raises:
+        ValueError: If the branch is not found or the GitHub API returns an error.
+        requests.exceptions.RequestException: If a network error occurs.
+    """
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/git/ref/heads/{branch}"
+    try:
+        res = github_client.get(url, timeout=10)
+        if res.status_code == 200:
+            return res.json()["object"]["sha"]
+        elif res.status_code == 404:
+            raise ValueError(f"Branch '{branch}' not found in repository '{owner}/{repo}' (404).")
+        else:
+            raise ValueError(f"GitHub API error while fetching branch head: {res.status_code}")
+    except requests.exceptions.RequestException as e:
+        raise requests.exceptions.RequestException("Network error while fetching branch head") from e
+
+
 def get_github_file_content(
     owner: str,
     repo: str,
@@ -103,7 +201,7 @@ def get_github_file_content(
         owner (str): GitHub repository owner (user or organization).
         repo (str): GitHub repository name.
         file_path (str): Path to the file within the repository (e.g., "src/utils/helper.py").
-        branch (str, optional): Branch name to fetch from. Defaults to "main".
+        branch (str, optional): Branch name or commit SHA to fetch from. Defaults to "main".
         timeout (float, optional): Seconds to wait for the HTTP response. Defaults to 10.0.
 
     Returns:
@@ -114,9 +212,9 @@ def get_github_file_content(
         GitHubAPIError: If GitHub returns any other non-200 status code.
         RequestException: For network-related issues (connection errors, DNS failures, etc.).
     """
-    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{file_path}"
+    raw_url = f"{GITHUB_RAW_URL}/{owner}/{repo}/{branch}/{file_path}"
     try:
-        response = requests.get(raw_url, timeout=timeout)
+        response = github_client.get(raw_url, timeout=timeout)
         response.raise_for_status()
     except requests.HTTPError as http_err:
         status = getattr(http_err.response, "status_code", None)
@@ -136,6 +234,287 @@ def get_github_file_content(
 
 
 
+def get_snapshot_path(owner: str, repo: str, branch: str = "main") -> str:
+    """
+    Returns the local directory where the snapshots of a branch are stored.
+
+    Each download is extracted into its own subdirectory, and a pointer file
+    names the current one, so a refresh never changes files under a reader.
+
+    Args:
+        owner (str): GitHub repository owner.
+        repo (str): GitHub repository name.
+        branch (str, optional): Branch name. Defaults to "main".
+
+    Returns:
+        str: Snapshot store directory of the branch (it may not exist yet).
+    """
+    return os.path.join(SNAPSHOT_DIR, quote(owner, safe=""), quote(repo, safe=""), quote(branch, safe=""))
+
+
+def _safe_join(root: str, relative_path: str) -> str:
+    """
+    Joins a repository-relative path to a local root, refusing paths that escape it.
+
+    Raises:
+        ValueError: If the path points outside of root.
+    """
+    root = os.path.abspath(root)
+    target = os.path.abspath(os.path.join(root, relative_path))
+    if not target.startswith(root + os.sep):
+        raise ValueError(f"Unsafe path outside of snapshot: {relative_path}")
+    return target
+
+
+def _branch_lock(branch_dir: str) -> threading.Lock:
+    """Returns the lock serializing downloads and clean-ups of one branch's snapshots."""
+    with _snapshot_locks_guard:
+        return _snapshot_locks.setdefault(branch_dir, threading.Lock())
+
+
+def _current_snapshot(branch_dir: str) -> Optional[str]:
+    """Returns the snapshot the branch's pointer file names, or None if there is none yet."""
+    try:
+        with open(os.path.join(branch_dir, SNAPSHOT_POINTER), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    snapshot_path = os.path.join(branch_dir, name)
+    return snapshot_path if name and os.path.isdir(snapshot_path) else None
+
+
+def _set_current_snapshot(branch_dir: str, snapshot_path: str) -> None:
+    """Points the branch at a snapshot; the pointer file is replaced atomically."""
+    pointer_path = os.path.join(branch_dir, SNAPSHOT_POINTER)
+    with open(pointer_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(os.path.basename(snapshot_path))
+    os.replace(pointer_path + ".tmp", pointer_path)
+
+
+def _prune_snapshots(branch_dir: str) -> None:
+    """
+    Removes the snapshots of a branch that are neither current nor in use.
+
+    Must be called with the branch lock held.
+    """
+    current = _current_snapshot(branch_dir)
+    with _snapshot_locks_guard:
+        in_use = {path for path, readers in _snapshot_readers.items() if readers > 0}
+    for name in os.listdir(branch_dir):
+        path = os.path.join(branch_dir, name)
+        if name == SNAPSHOT_POINTER or path == current or path in in_use or not os.path.isdir(path):
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _extract_archive(owner: str, repo: str, branch: str, archive_ref: str, snapshot_path: str, timeout: float) -> None:
+    """
+    Streams the tarball of a ref and extracts it into `snapshot_path`.
+
+    The archive is read straight from the HTTP stream and extracted member by member,
+    so it is never fully buffered in memory. Extraction goes to a temporary folder
+    that is renamed to `snapshot_path` only once it is complete.
+
+    Raises:
+        FileNotFoundError: If the repository or ref isn't found (HTTP 404).
+        RuntimeError: If GitHub returns any other error status or the archive is invalid.
+        ConnectionError: For network-related issues.
+    """
+    archive_url = f"{GITHUB_ARCHIVE_URL}/{owner}/{repo}/tar.gz/{archive_ref}"
+    extract_dir = tempfile.mkdtemp(prefix=".extract-", dir=os.path.dirname(snapshot_path))
+    file_count = 0
+
+    try:
+        with github_client.get(archive_url, stream=True, timeout=timeout) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(f"Branch '{branch}' not found in {owner}/{repo}")
+            if response.status_code != 200:
+                raise RuntimeError(f"GitHub returned status {response.status_code} for URL {archive_url}")
+
+            response.raw.decode_content = True
+            with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+                for member in archive:
+                    if not member.isfile():
+                        continue
+                    # Archives have a single top-level "<repo>-<branch>/" folder
+                    parts = member.name.split("/", 1)
+                    if len(parts) < 2 or not parts[1]:
+                        continue
+                    target = _safe_join(extract_dir, parts[1])
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    source = archive.extractfile(member)
+                    with open(target, "wb") as f:
+                        shutil.copyfileobj(source, f)
+                    file_count += 1
+
+        os.replace(extract_dir, snapshot_path)
+    except requests.RequestException as req_err:
+        raise ConnectionError(f"Network error while fetching {archive_url}: {req_err}")
+    except tarfile.TarError as tar_err:
+        raise RuntimeError(f"Invalid archive received from {archive_url}: {tar_err}")
+    finally:
+        if os.path.isdir(extract_dir):
+            shutil.rmtree(extract_dir, ignore_errors=True)
+
+    logger.info(f"Extracted {file_count} files of {owner}/{repo}@{archive_ref} into {snapshot_path}")
+
+
+def _ensure_snapshot(
+    owner: str,
+    repo: str,
+    branch: str,
+    refresh: bool,
+    timeout: float,
+    ref: Optional[str],
+    hold: bool
+) -> str:
+    """Shared body of download_branch_snapshot and branch_snapshot; `hold` registers a reader before unlocking."""
+    branch_dir = get_snapshot_path(owner, repo, branch)
+
+    with _branch_lock(branch_dir):
+        current = _current_snapshot(branch_dir)
+        if current is None and os.path.isdir(branch_dir):
+            # Leftovers of an interrupted first download or of the old single-folder layout
+            shutil.rmtree(branch_dir)
+        os.makedirs(branch_dir, exist_ok=True)
+
+        if ref and _COMMIT_SHA.match(ref):
+            # A commit never changes, so its snapshot is reused even on refresh
+            snapshot_path = os.path.join(branch_dir, ref)
+            if not os.path.isdir(snapshot_path):
+                _extract_archive(owner, repo, branch, ref, snapshot_path, timeout)
+        elif current is not None and not refresh:
+            snapshot_path = current
+        else:
+            snapshot_path = os.path.join(branch_dir, f"download-{uuid.uuid4().hex[:12]}")
+            _extract_archive(owner, repo, branch, ref or branch, snapshot_path, timeout)
+
+        if snapshot_path != current:
+            _set_current_snapshot(branch_dir, snapshot_path)
+        if hold:
+            with _snapshot_locks_guard:
+                _snapshot_readers[snapshot_path] = _snapshot_readers.get(snapshot_path, 0) + 1
+        _prune_snapshots(branch_dir)
+        return snapshot_path
+
+
+def _release_snapshot(snapshot_path: str) -> None:
+    """Drops a reader registered by branch_snapshot, removing the snapshot if it is no longer current or used."""
+    branch_dir = os.path.dirname(snapshot_path)
+    with _branch_lock(branch_dir):
+        with _snapshot_locks_guard:
+            readers = _snapshot_readers.pop(snapshot_path, 0) - 1
+            if readers > 0:
+                _snapshot_readers[snapshot_path] = readers
+        _prune_snapshots(branch_dir)
+
+
+def download_branch_snapshot(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    refresh: bool = False,
+    timeout: float = 60.0,
+    ref: Optional[str] = None
+) -> str:
+    """
+    Downloads the tarball of a branch once and extracts it into the local snapshot store.
+
+    Every download goes to a new directory and the branch is then pointed at it,
+    so files of the previous snapshot do not disappear under its readers; older
+    snapshots are removed once no branch_snapshot block uses them.
+
+    The returned directory may be removed by a later refresh; use branch_snapshot
+    to keep reading from it safely.
+
+    Args:
+        owner (str): GitHub repository owner.
+        repo (str): GitHub repository name.
+        branch (str, optional): Branch name. Defaults to "main".
+        refresh (bool, optional): Download again even if a snapshot exists. Defaults to False.
+        timeout (float, optional): Seconds to wait for the HTTP response. Defaults to 60.0.
+        ref (str, optional): Commit SHA to download instead of the branch head; it becomes
+            the branch's current snapshot and is reused while it is kept. Defaults to the branch.
+
+    Returns:
+        str: Path of the snapshot directory holding the branch files.
+
+    Raises:
+        FileNotFoundError: If the repository or branch isn't found (HTTP 404).
+        RuntimeError: If GitHub returns any other error status or the archive is invalid.
+        ConnectionError: For network-related issues.
+    """
+    return _ensure_snapshot(owner, repo, branch, refresh, timeout, ref, hold=False)
+
+
+@contextmanager
+def branch_snapshot(
+    owner: str,
+    repo: str,
+    branch: str = "main",
+    refresh: bool = False,
+    timeout: float = 60.0,
+    ref: Optional[str] = None
+) -> Iterator[str]:
+    """
+    Like download_branch_snapshot, but keeps the snapshot on disk until the block exits.
+
+    Usage:
+        with branch_snapshot(owner, repo, branch) as snapshot_path:
+            content = read_snapshot_file(snapshot_path, "README.md")
+
+    Yields:
+        str: Path of the snapshot directory holding the branch files.
+
+    Raises:
+        Same as download_branch_snapshot.
+    """
+    snapshot_path = _ensure_snapshot(owner, repo, branch, refresh, timeout, ref, hold=True)
+    try:
+        yield snapshot_path
+    finally:
+        _release_snapshot(snapshot_path)
+
+
+def read_snapshot_file(snapshot_path: str, file_path: str) -> str:
+    """
+    Reads one file from a branch snapshot.
+
+    Args:
+        snapshot_path (str): Snapshot directory returned by download_branch_snapshot.
+        file_path (str): Path to the file within the repository.
+
+    Returns:
+        str: The text content of the file.
+
+    Raises:
+        FileNotFoundError: If the file is not part of the snapshot.
+        ValueError: If the path points outside of the snapshot.
+    """
+    full_path = _safe_join(snapshot_path, file_path)
+    if not os.path.isfile(full_path):
+        raise FileNotFoundError(f"File '{file_path}' not found in snapshot {snapshot_path}")
+    with open(full_path, "r", encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def get_snapshot_file_content(owner: str, repo: str, file_path: str, branch: str = "main") -> str:
+    """
+    Returns the content of a file from the branch snapshot, downloading the snapshot if needed.
+
+    Args:
+        owner (str): GitHub repository owner.
+        repo (str): GitHub repository name.
+        file_path (str): Path to the file within the repository.
+        branch (str, optional): Branch name. Defaults to "main".
+
+    Returns:
+        str: The text content of the requested file.
+    """
+    with branch_snapshot(owner, repo, branch) as snapshot_path:
+        return read_snapshot_file(snapshot_path, file_path)
+
+
 def create_branch(owner: str, repo: str, new_branch: str, from_branch: str = "main") -> bool:
     """
     Creates a new branch in a GitHub repository from a given base branch.
@@ -156,21 +535,21 @@ def create_branch(owner: str, repo: str, new_branch: str, from_branch: str = "ma
     headers = {"Authorization": f"token {token}"}
 
     # Get the latest commit SHA of the base branch
-    url = f"https://api.github.com/repos/{owner}/{repo}/git/ref/heads/{from_branch}"
-    res = requests.get(url, headers=headers)
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/git/ref/heads/{from_branch}"
+    res = github_client.get(url, headers=headers)
     if res.status_code != 200:
         raise Exception(f"Failed to get base branch '{from_branch}': {res.status_code} {res.text}")
     
     sha = res.json()["object"]["sha"]
 
     # Create the new branch
-    url = f"https://api.github.com/repos/{owner}/{repo}/git/refs"
+    url = f"{github_client.api_url}/repos/{owner}/{repo}/git/refs"
     data = {
         "ref": f"refs/heads/{new_branch}",
         "sha": sha
     }
 
-    res = requests.post(url, headers=headers, json=data)
+    res = github_client.post(url, headers=headers, json=data)
     if res.status_code == 201:
         return True
     elif res.status_code == 422 and "Reference already exists" in res.text:
@@ -0,0 +1,204 @@
+import os
+import re
+import ast
+import sys
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from importlib.metadata import packages_distributions
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from utils.distribution_index import distribution_index
+
+load_dotenv()
+IMPORT_SCAN_WORKERS = int(os.getenv("IMPORT_SCAN_WORKERS", str(os.cpu_count() or 1)))
+
+# Below this many files, starting worker processes costs more than it saves
+MIN_FILES_PER_WORKER = 32
+
+_IMPORT_LINE = re.compile(r"^\s*(?:from\s+([A-Za-z_]\w*)[\w.]*\s+import\b|import\s+(.+))", re.MULTILINE)
+
+
+def extract_imports(source: str) -> Set[str]:
+    """
+    Returns the top-level names of the modules imported by Python source code.
+
+    Relative imports are left out, as they always point inside the project.
+    Imports anywhere in the file count, including the ones guarded by
+    try/except. Code that does not parse (e.g. Python 2) is scanned line by line.
+
+    Args:
+        source: Python source code.
+
+    Returns:
+        Set of top-level module names, e.g. {"os", "requests", "yaml"}.
+    """
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return _extract_imports_by_line(source)
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def _extract_imports_by_line(source: str) -> Set[str]:
+    names = set()
+    for match in _IMPORT_LINE.finditer(source):
+        if match.group(1):
+            names.add(match.group(1))
+        else:
+            for alias in match.group(2).split("#")[0].split(","):
+                name = alias.strip().split(" ")[0].split(".")[0]
+                if name.isidentifier():
+                    names.add(name)
+    return names
+
+
+def _scan_file(item: Tuple[str, str]) -> Tuple[str, List[str], Optional[str]]:
+    root_dir, relative_path = item
+    try:
+        with open(os.path.join(root_dir, relative_path), "r", encoding="utf-8") as f:
+            return relative_path, sorted(extract_imports(f.read())), None
+    except (OSError, UnicodeDecodeError) as e:
+        return relative_path, [], str(e)
+
+
+def list_python_files(root_dir: str) -> List[str]:
+    """Returns the paths of the .py files under root_dir, relative to it and sorted."""
+    return sorted(
+        os.path.relpath(os.path.join(dirpath, filename), root_dir)
+        for dirpath, _, filenames in os.walk(root_dir)
+        for filename in filenames
+        if filename.endswith(".py")
+    )
+
+
+def scan_imports(
+    root_dir: str,
+    max_workers: Optional[int] = None,
+    on_file: Optional[Callable[[str, List[str], Optional[str]], None]] = None
+) -> Dict[str, List[str]]:
+    """
+    Extracts the imports of every Python file under a directory, in a process pool.
+
+    Args:
+        root_dir: Directory to scan recursively.
+        max_workers: Worker processes (default IMPORT_SCAN_WORKERS); small trees are scanned in-process.
+        on_file: Called with (relative path, imports, read error) after each file, in order.
+
+    Returns:
+        Dict of relative path -> sorted top-level module names.
+    """
+    items = [(root_dir, path) for path in list_python_files(root_dir)]
+    workers = max(1, min(max_workers or IMPORT_SCAN_WORKERS, len(items) // MIN_FILES_PER_WORKER))
+
+    imports: Dict[str, List[str]] = {}
+
+    def collect(results: Iterable[Tuple[str, List[str], Optional[str]]]) -> None:
+        for relative_path, names, error in results:
+            if error:
+                logger.warning(f"Could not read {relative_path}: {error}")
+            imports[relative_path] = names
+            if on_file is not None:
+                on_file(relative_path, names, error)
+
+    if workers == 1:
+        collect(_scan_file(item) for item in items)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            collect(executor.map(_scan_file, items, chunksize=max(1, len(items) // (workers * 4))))
+    logger.info(f"Scanned imports of {len(items)} files in {root_dir} with {workers} process(es).")
+    return imports
+
+
+def local_module_names(relative_paths: Iterable[str]) -> Set[str]:
+    """
+    Returns the names the project's own modules can be imported as.
+
+    Every directory and module name in the tree counts, since code is often run
+    with a sub-directory on sys.path (e.g. `from services import ...` in an app/ folder).
+    """
+    names = set()
+    for path in relative_paths:
+        parts = path.split(os.sep)
+        names.update(parts[:-1])
+        names.add(os.path.splitext(parts[-1])[0])
+    return names
+
+
+@lru_cache(maxsize=8)
+def stdlib_module_names(python_version: Optional[str] = None) -> FrozenSet[str]:
+    """
+    Returns the standard library module names of a Python version.
+
+    Uses sys.stdlib_module_names of the current interpreter when it is that
+    version (or no version is given), otherwise asks the `pythonX.Y` interpreter
+    when it is installed. Falls back to the current interpreter's list.
+
+    Args:
+        python_version: Target version such as "3.12".
+
+    Returns:
+        Frozen set of module names, including the built-in modules.
+    """
+    current = f"{sys.version_info.major}.{sys.version_info.minor}"
+    if python_version and python_version != current:
+        executable = shutil.which(f"python{python_version}")
+        if executable:
+            try:
+                result = subprocess.run(
+                    [executable, "-c", "import sys; print(' '.join(sys.stdlib_module_names | set(sys.builtin_module_names)))"],
+                    capture_output=True, text=True, check=True, timeout=30,
+                )
+                return frozenset(result.stdout.split())
+            except (subprocess.SubprocessError, OSError) as e:
+                logger.warning(f"Could not list the standard library of Python {python_version}: {e}")
+        logger.warning(f"Python {python_version} not found; using the standard library of Python {current}.")
+    return frozenset(sys.stdlib_module_names) | frozenset(sys.builtin_module_names)
+
+
+@lru_cache(maxsize=1)
+def _installed_distributions() -> Dict[str, List[str]]:
+    return packages_distributions()
+
+
+def resolve_distribution(name: str) -> Optional[str]:
+    """
+    Returns the PyPI distribution that provides an import name, if it is known.
+
+    Looks in the offline distribution index (curated renames and collected
+    package metadata), then in the distributions installed in the current
+    environment. Names provided by several distributions (namespace packages
+    such as `google`) are left unresolved.
+    """
+    distributions = set(distribution_index.get(name)) or set(_installed_distributions().get(name, []))
+    if len(distributions) == 1:
+        return distributions.pop()
+    return None
+
+
+def third_party_imports(imports: Dict[str, List[str]], python_version: Optional[str] = None) -> List[str]:
+    """
+    Returns the imported names that are neither standard library nor the project's own modules.
+
+    Args:
+        imports: Relative path -> imported module names, as returned by scan_imports.
+        python_version: Version whose standard library is filtered out.
+
+    Returns:
+        Sorted list of third-party import names.
+    """
+    stdlib = stdlib_module_names(python_version)
+    local = local_module_names(imports)
+    names = {name for names in imports.values() for name in names}
+    return sorted(name for name in names if name not in stdlib and name not in local and not name.startswith("_"))
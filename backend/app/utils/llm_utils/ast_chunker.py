@@ -0,0 +1,211 @@
+import ast
+import textwrap
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+
+class CodeChunk(NamedTuple):
+    """
+    One independently processable piece of a Python file.
+
+    `body` is dedented source; re-indenting it with `indent` gives back the
+    original lines, and the re-indented bodies of all chunks, concatenated,
+    give back the whole file. `context` holds the file's import header and the
+    signature of the enclosing class or function, for reference only.
+    """
+    context: str
+    body: str
+    indent: str
+    start_line: int
+    end_line: int
+
+
+def _approx_tokens(text: str) -> int:
+    return -(-len(text) // 4)
+
+
+def import_header(code: str, tree: Optional[ast.Module] = None) -> str:
+    """
+    Returns the top-level import statements of a module.
+
+    Args:
+        code: Python source code.
+        tree: Parsed module, if already available.
+
+    Returns:
+        The import lines joined by newlines (empty if there are none).
+    """
+    if tree is None:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            return "\n".join(line for line in code.splitlines() if line.startswith(("import ", "from ")))
+    return "\n".join(
+        ast.get_source_segment(code, node) or ""
+        for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))
+    )
+
+
+def _node_start(node: ast.AST) -> int:
+    """0-based first line of a statement, including its decorators."""
+    return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])]) - 1
+
+
+def _spans(nodes: List[ast.stmt], start: int, end: int) -> List[Tuple[int, int, ast.stmt]]:
+    """Line spans covering [start, end): each node runs until the next one starts."""
+    starts = [start] + [_node_start(node) for node in nodes[1:]]
+    return list(zip(starts, starts[1:] + [end], nodes))
+
+
+def _signature(lines: List[str], node: ast.AST) -> str:
+    """Decorators and header line(s) of a class or function, up to its first body statement."""
+    return "".join(lines[_node_start(node):node.body[0].lineno - 1]).rstrip()
+
+
+class _Chunker:
+    def __init__(self, code: str, max_tokens: int, count_tokens: Callable[[str], int]):
+        self.lines = code.splitlines(keepends=True)
+        self.max_tokens = max_tokens
+        self.count_tokens = count_tokens
+        self.header = ""
+        self.chunks: List[CodeChunk] = []
+        # Each line is counted once; a span's count is the sum of its lines, a
+        # slight overestimate that keeps packing linear in the file size
+        self.prefix = [0]
+        for line in self.lines:
+            self.prefix.append(self.prefix[-1] + count_tokens(line))
+
+    def text(self, start: int, end: int) -> str:
+        return "".join(self.lines[start:end])
+
+    def fits(self, start: int, end: int, context: str) -> bool:
+        return self.count_tokens(context) + self.prefix[end] - self.prefix[start] <= self.max_tokens
+
+    def emit(self, start: int, end: int, context: str) -> None:
+        if start >= end:
+            return
+        if start == 0 and self.header and context.startswith(self.header):
+            # The chunk already starts with the imports
+            context = context[len(self.header):].lstrip("\n")
+        source = self.text(start, end)
+        body = textwrap.dedent(source)
+        first_source = next((line for line in source.splitlines() if line.strip()), "")
+        first_body = next((line for line in body.splitlines() if line.strip()), "")
+        indent = first_source[:len(first_source) - len(first_body)]
+        self.chunks.append(CodeChunk(context, body, indent, start + 1, end))
+
+    def context(self, *signatures: str) -> str:
+        return "\n".join(part for part in (self.header, *signatures) if part)
+
+    def group(self, spans: List[Tuple[int, int, Optional[ast.stmt]]], context: str, signatures: Tuple[str, ...] = ()) -> None:
+        """Greedily packs consecutive spans into chunks, descending into spans that are too large."""
+        group_start = group_end = None
+        for start, end, node in spans:
+            if group_start is not None and self.fits(group_start, end, context):
+                group_end = end
+                continue
+            if group_start is not None:
+                self.emit(group_start, group_end, context)
+                group_start = None
+            if self.fits(start, end, context):
+                group_start, group_end = start, end
+            else:
+                self.split(start, end, node, signatures)
+        if group_start is not None:
+            self.emit(group_start, group_end, context)
+
+    def split(self, start: int, end: int, node: Optional[ast.stmt], signatures: Tuple[str, ...]) -> None:
+        """Splits one oversized statement: classes and functions by their body statements, anything else by lines."""
+        body = getattr(node, "body", None)
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and body:
+            signature = _signature(self.lines, node)
+            inner = signatures + (signature,)
+            member_spans = _spans(body, body[0].lineno - 1, end)
+            # The header goes with the first members so that chunk stays valid on its own
+            first_start, first_end, _ = member_spans[0]
+            if len(member_spans) > 1 and self.fits(start, member_spans[1][0], self.context(*signatures)):
+                member_spans[0] = (start, first_end, member_spans[0][2])
+            else:
+                self.emit(start, first_start, self.context(*signatures))
+            self.group(member_spans, self.context(*inner), inner)
+            return
+        self.split_lines(start, end, self.context(*signatures))
+
+    def split_lines(self, start: int, end: int, context: str) -> None:
+        """Last resort: cuts by lines, preferring the last blank line before the budget runs out."""
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end, last_blank = chunk_start + 1, None
+            while chunk_end < end and self.fits(chunk_start, chunk_end + 1, context):
+                if not self.lines[chunk_end].strip():
+                    last_blank = chunk_end + 1
+                chunk_end += 1
+            if chunk_end < end and last_blank is not None:
+                chunk_end = last_blank
+            self.emit(chunk_start, chunk_end, context)
+            chunk_start = chunk_end
+
+
+def chunk_python_source(
+    code: str,
+    max_tokens: int,
+    count_tokens: Callable[[str], int] = _approx_tokens
+) -> List[CodeChunk]:
+    """
+    Splits a Python file into chunks of at most `max_tokens`, cut on statement boundaries.
+
+    Top-level statements are grouped greedily. A class or function too large for
+    one chunk is split between its body statements, and each of those chunks
+    carries the enclosing signature in its context. Statements still too large,
+    and files that do not parse, are cut by lines (preferring blank lines).
+
+    Args:
+        code: Python source code.
+        max_tokens: Token budget for one chunk, context included.
+        count_tokens: Function counting the tokens of a text.
+
+    Returns:
+        Chunks in file order; a file that fits the budget is a single chunk with no context.
+    """
+    if count_tokens(code) <= max_tokens:
+        return [CodeChunk("", code, "", 1, len(code.splitlines()))]
+
+    chunker = _Chunker(code, max_tokens, count_tokens)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        tree = None
+    if tree is not None and not tree.body:
+        return [CodeChunk("", code, "", 1, len(chunker.lines))]
+
+    header = import_header(code, tree)
+    # A header eating most of the budget would leave no room for code
+    chunker.header = header if count_tokens(header) <= max_tokens // 4 else ""
+    if tree is None:
+        chunker.split_lines(0, len(chunker.lines), chunker.header)
+        return chunker.chunks
+
+    chunker.group(_spans(tree.body, 0, len(chunker.lines)), chunker.header)
+    return chunker.chunks
+
+
+def join_chunks(bodies: List[str], chunks: List[CodeChunk]) -> str:
+    """
+    Reassembles processed chunk bodies into one file.
+
+    Each body is re-indented like the chunk it came from; top-level pieces are
+    separated by two blank lines and class or function members by one.
+
+    Args:
+        bodies: New body text for each chunk (e.g. the refactored code).
+        chunks: The chunks the bodies were produced from, in the same order.
+
+    Returns:
+        The joined source code.
+    """
+    joined = ""
+    for body, chunk in zip(bodies, chunks):
+        text = textwrap.indent(body.strip("\n"), chunk.indent) if chunk.indent else body.strip("\n")
+        if joined:
+            joined += "\n\n" if chunk.indent else "\n\n\n"
+        joined += text
+    return joined
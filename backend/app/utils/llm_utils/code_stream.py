@@ -0,0 +1,316 @@
+import os
+import time
+import threading
+from typing import Callable, Dict, List, Optional, TextIO
+
+from dotenv import load_dotenv
+
+from utils.llm_utils.ast_chunker import CodeChunk
+from utils.llm_utils.llm_scheduler import StopStream
+from utils.llm_utils.token_counter import count_tokens, CHARS_PER_TOKEN
+
+load_dotenv()
+LLM_STREAMING = os.getenv("LLM_STREAMING", "false").lower() in ("1", "true", "yes")
+# A reply longer than this many times its input (plus some slack) is treated as runaway output
+LLM_STREAM_MAX_GROWTH = float(os.getenv("LLM_STREAM_MAX_GROWTH", "3"))
+LLM_STREAM_EVENT_INTERVAL = float(os.getenv("LLM_STREAM_EVENT_INTERVAL", "0.25"))
+
+GROWTH_SLACK_TOKENS = 512
+CODE_LANGUAGES = ("", "python", "py", "python3")
+
+
+class LLMOutputTruncatedError(RuntimeError):
+    """Raised when a streamed reply is cut off or runs away, so no partial file is kept."""
+
+
+class FencedCodeExtractor:
+    """
+    Extracts the code of the first fenced Python block of a reply while it is still arriving.
+
+    `feed` returns the code that is known to be final after each delta;
+    `finish` returns the rest. Together they give the block's content with
+    surrounding whitespace stripped. A reply with no fence at all is taken as
+    code as a whole. Blocks tagged with another language (```bash) are skipped.
+    """
+
+    def __init__(self):
+        self._state = "before"  # before -> code -> after, or skip (inside a non-Python block)
+        self._buffer = ""
+        self._raw: List[str] = []  # whole reply, only kept until a fence opens
+        self._started = False
+        self._pending_ws = ""
+        self._carry_cr = False
+        self.chars = 0
+
+    @property
+    def closed(self) -> bool:
+        """True once the code block's closing fence has been seen."""
+        return self._state == "after"
+
+    @property
+    def truncated(self) -> bool:
+        """True if the reply ended inside the code block."""
+        return self._state == "code"
+
+    def feed(self, delta: str) -> str:
+        """
+        Adds a piece of the reply.
+
+        Args:
+            delta: Next piece of the reply text.
+
+        Returns:
+            Newly available code (possibly empty).
+        """
+        self.chars += len(delta)
+        if self._carry_cr:
+            delta = "\r" + delta
+        # A '\r' at the end may be the first half of '\r\n'
+        self._carry_cr = delta.endswith("\r")
+        if self._carry_cr:
+            delta = delta[:-1]
+        return self._process(delta.replace("\r\n", "\n").replace("\r", "\n"))
+
+    def finish(self) -> str:
+        """
+        Ends the reply.
+
+        Returns:
+            The code not returned by `feed` yet: the held-back tail of the block,
+            or the whole reply when it had no fence.
+        """
+        code = ""
+        if self._carry_cr:
+            self._carry_cr = False
+            code = self._process("\n")
+        if self._state == "code":
+            tail, self._buffer = self._buffer, ""
+            return code + self._emit(tail, final=True)
+        if self._state == "before" and self._raw:
+            raw, self._raw = "".join(self._raw), []
+            if "```" not in raw:
+                return raw.strip()
+        return code
+
+    def _process(self, delta: str) -> str:
+        if self._state == "after" or not delta:
+            return ""
+        if self._state == "code":
+            return self._code(self._buffer + delta)
+
+        if self._state == "before":
+            self._raw.append(delta)
+        self._buffer += delta
+        while self._state in ("before", "skip"):
+            fence = self._buffer.find("```")
+            if fence < 0:
+                # Keep a possible partial fence for the next delta
+                self._buffer = self._buffer[-2:]
+                return ""
+            if self._state == "skip":
+                self._state, self._buffer = "before", self._buffer[fence + 3:]
+                continue
+            newline = self._buffer.find("\n", fence)
+            if newline < 0:
+                self._buffer = self._buffer[fence:]
+                return ""
+            language = self._buffer[fence + 3:newline].strip().lower()
+            rest = self._buffer[newline + 1:]
+            if language in CODE_LANGUAGES:
+                self._state, self._buffer, self._raw = "code", "", []
+                return self._code(rest)
+            self._state, self._buffer = "skip", rest
+        return ""
+
+    def _code(self, text: str) -> str:
+        end = text.find("```")
+        if end >= 0:
+            self._state, self._buffer = "after", ""
+            return self._emit(text[:end], final=True)
+        # Hold back trailing backticks that may start the closing fence
+        held = len(text) - len(text.rstrip("`"))
+        self._buffer = text[len(text) - held:] if held else ""
+        return self._emit(text[:len(text) - held], final=False)
+
+    def _emit(self, code: str, final: bool) -> str:
+        if not self._started:
+            code = code.lstrip()
+            if not code:
+                return ""
+            self._started = True
+        code = self._pending_ws + code
+        stripped = code.rstrip()
+        self._pending_ws = "" if final else code[len(stripped):]
+        return stripped
+
+
+class StreamingCodeWriter:
+    """
+    Writes the refactored code of a file's chunks to disk while the replies stream in.
+
+    Chunks may be generated in parallel; the text of a chunk is written once
+    every earlier chunk is complete, indented and separated exactly like
+    `join_chunks`, so the file ends up identical to the joined result.
+    `feed` stops a reply as soon as its code block closes, and raises
+    `LLMOutputTruncatedError` when a reply grows far beyond its input.
+
+    With a `path`, written text goes only to the file and is not kept in
+    memory; without one it is collected and returned by `finish`.
+    """
+
+    def __init__(
+        self,
+        chunks: List[CodeChunk],
+        path: Optional[str] = None,
+        on_text: Optional[Callable[[str], None]] = None,
+        max_growth: float = LLM_STREAM_MAX_GROWTH,
+        event_interval: float = LLM_STREAM_EVENT_INTERVAL
+    ):
+        self.chunks = chunks
+        self.path = path
+        self.on_text = on_text
+        self.event_interval = event_interval
+        self.extractors = [FencedCodeExtractor() for _ in chunks]
+        self.limits = [
+            int(count_tokens(chunk.body) * max_growth) + GROWTH_SLACK_TOKENS for chunk in chunks
+        ]
+        self._pending: Dict[int, List[str]] = {}
+        self._current = 0
+        self._at_line_start = True
+        self._line_ws = ""
+        self.chars_written = 0
+        self._collected: Optional[List[str]] = None if path else []
+        self._unsent: List[str] = []
+        self._last_event = time.monotonic()
+        self._file: Optional[TextIO] = None
+        self._lock = threading.Lock()
+
+    def feed(self, part: int, delta: str) -> None:
+        """
+        Adds a delta of the reply for chunk `part` (1-based).
+
+        Raises:
+            StopStream: Once the chunk's code block is closed.
+            LLMOutputTruncatedError: If the reply is far longer than its chunk.
+        """
+        index = part - 1
+        extractor = self.extractors[index]
+        with self._lock:
+            code = extractor.feed(delta)
+            if extractor.chars / CHARS_PER_TOKEN > self.limits[index]:
+                raise LLMOutputTruncatedError(
+                    f"Part {part} reply passed {self.limits[index]} tokens without finishing; aborted as runaway output"
+                )
+            self._add(index, code)
+            if extractor.closed:
+                self._advance()
+                self._flush_events()
+                raise StopStream()
+            self._flush_events()
+
+    def finish(self) -> Optional[str]:
+        """
+        Completes the file once every reply has ended.
+
+        Returns:
+            The full refactored code when the writer has no path; None when it
+            was written to `path`, which then holds the whole file.
+
+        Raises:
+            LLMOutputTruncatedError: If a reply ended inside its code block.
+        """
+        with self._lock:
+            for index, extractor in enumerate(self.extractors):
+                tail = extractor.finish()
+                if extractor.truncated:
+                    raise LLMOutputTruncatedError(
+                        f"Part {index + 1} reply ended before its code block was closed (output limit reached?)"
+                    )
+                self._add(index, tail)
+            self._advance(final=True)
+            self._flush_events(force=True)
+            if self.path:
+                if self._file is None:
+                    # Every reply was empty: still leave the (empty) file behind
+                    self._open()
+                self._file.close()
+                self._file = None
+                return None
+            return "".join(self._collected)
+
+    def abort(self) -> None:
+        """Closes and removes the partial file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+
+    def _add(self, index: int, code: str) -> None:
+        if not code:
+            return
+        if index == self._current:
+            self._write(self._indent(code, self.chunks[index].indent))
+        else:
+            self._pending.setdefault(index, []).append(code)
+
+    def _advance(self, final: bool = False) -> None:
+        """Moves past every finished chunk (all of them when `final`), writing the buffered text of the next ones."""
+        while self._current < len(self.chunks) and (final or self.extractors[self._current].closed):
+            self._current += 1
+            self._at_line_start, self._line_ws = True, ""
+            if self._current == len(self.chunks):
+                break
+            if self.chars_written:
+                self._write("\n\n" if self.chunks[self._current].indent else "\n\n\n")
+            for code in self._pending.pop(self._current, []):
+                self._write(self._indent(code, self.chunks[self._current].indent))
+
+    def _indent(self, text: str, indent: str) -> str:
+        """Indents the lines of `text` that are not blank, like textwrap.indent, across delta boundaries."""
+        if not indent:
+            return text
+        out = []
+        for piece in text.splitlines(keepends=True):
+            if not self._at_line_start:
+                out.append(piece)
+            elif piece.strip():
+                out.append(indent + self._line_ws + piece)
+                self._line_ws = ""
+                self._at_line_start = False
+            elif piece.endswith("\n"):
+                out.append(self._line_ws + piece)
+                self._line_ws = ""
+            else:
+                self._line_ws += piece
+            if piece.endswith("\n"):
+                self._at_line_start = True
+        return "".join(out)
+
+    def _open(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _write(self, text: str) -> None:
+        if not text:
+            return
+        self.chars_written += len(text)
+        if self.on_text is not None:
+            self._unsent.append(text)
+        if self._collected is not None:
+            self._collected.append(text)
+        else:
+            if self._file is None:
+                self._open()
+            self._file.write(text)
+
+    def _flush_events(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not self._unsent or (not force and now - self._last_event < self.event_interval):
+            return
+        if self._file is not None:
+            self._file.flush()
+        if self.on_text is not None:
+            self.on_text("".join(self._unsent))
+        self._unsent, self._last_event = [], now
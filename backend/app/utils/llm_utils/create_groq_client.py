@@ -1,5 +1,8 @@
 from groq import Groq
 import os
+import re
+import threading
+from typing import Any, Dict, List, Tuple
 from dotenv import load_dotenv
 from langchain_groq import ChatGroq
 
@@ -8,31 +11,67 @@ MODEL = os.getenv("GROQ_MODEL")
 TEMPERATURE = float(os.getenv("GROQ_TEMPERATURE", "0.3"))
 TOP_P = float(os.getenv("GROQ_TOP_P", "0.9"))
 MAX_COMPLETION_TOKENS = int(os.getenv("GROQ_MAX_COMPLETION_TOKENS", "120000"))
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_KEY1 = os.getenv("GROQ_API_KEY1")
-GROQ_API_KEY2 = os.getenv("GROQ_API_KEY2")
-GROQ_API_KEY3 = os.getenv("GROQ_API_KEY3")
-GROQ_API_KEY4 = os.getenv("GROQ_API_KEY4")
-GROQ_API_KEY5 = os.getenv("GROQ_API_KEY5")
-
-def get_groq_client(key_index : int = 0) -> Groq:
+# Points the clients at another OpenAI-compatible server, e.g. devtools/fake_llm_server.py
+BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+
+def load_api_keys() -> List[str]:
     """
-    Initializes and returns a Groq client instance using the API key from environment variables.
+    Reads the configured Groq API keys.
+
+    Keys come from GROQ_API_KEYS (comma-separated) if set, otherwise from
+    GROQ_API_KEY followed by GROQ_API_KEY1, GROQ_API_KEY2, ... in numeric order.
 
     Returns:
-        Groq: An instance of the Groq client.
+        The non-empty keys, without duplicates, in configuration order.
+    """
+    if os.getenv("GROQ_API_KEYS"):
+        keys = [key.strip() for key in os.environ["GROQ_API_KEYS"].split(",")]
+    else:
+        numbered = sorted(
+            (int(match.group(1)), value)
+            for name, value in os.environ.items()
+            if (match := re.fullmatch(r"GROQ_API_KEY(\d+)", name))
+        )
+        keys = [os.getenv("GROQ_API_KEY", "")] + [value for _, value in numbered]
+    return list(dict.fromkeys(key for key in keys if key))
 
-    Raises:
-        ValueError: If the GROQ_API_KEY is missing in the environment.
+
+API_KEYS = load_api_keys()
+
+_clients: Dict[Tuple[Any, ...], ChatGroq] = {}
+_clients_lock = threading.Lock()
+
+
+def get_groq_client(key_index : int = 0, **params: Any) -> Groq:
     """
-    api_keys = [GROQ_API_KEY, GROQ_API_KEY1, GROQ_API_KEY2, GROQ_API_KEY3]
+    Returns the shared LangChain Groq client for an API key.
 
-    if not GROQ_API_KEY:
+    Clients are created once per (API key, model, base URL, parameters) and
+    reused by every caller, so their HTTP connection pools stay warm. They are
+    safe to share across threads and asyncio tasks. Retries are left to the LLM
+    scheduler, so the client itself does not retry.
+
+    Args:
+        key_index: Index into the configured keys; wraps around past the last key.
+        params: Extra ChatGroq settings (e.g. streaming=True), part of the cache key.
+
+    Returns:
+        ChatGroq: The client for that key and settings.
+
+    Raises:
+        ValueError: If no Groq API key is configured.
+    """
+    if not API_KEYS:
         raise ValueError("Missing GROQ_API_KEY in environment.")
-    else:
-        llm = ChatGroq(
-        api_key=api_keys[key_index],
-        model_name=MODEL,
-        streaming=False,
-        )
+
+    api_key = API_KEYS[key_index % len(API_KEYS)]
+    settings = {"streaming": False, "max_retries": 0, **params}
+    cache_key = (api_key, MODEL, BASE_URL, tuple(sorted(settings.items())))
+
+    with _clients_lock:
+        llm = _clients.get(cache_key)
+        if llm is None:
+            llm = ChatGroq(api_key=api_key, model_name=MODEL, base_url=BASE_URL, **settings)
+            _clients[cache_key] = llm
         return llm
@@ -0,0 +1,181 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_cache.sqlite3"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+
+_caches: Dict[str, "LLMResultCache"] = {}
+_caches_lock = threading.Lock()
+
+
+def hash_text(text: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a string.
+
+    Args:
+        text: Text to hash.
+
+    Returns:
+        Hex digest of the UTF-8 encoded text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(*parts: str) -> str:
+    """
+    Builds a cache key from several parts (content hash, model, prompt version...).
+
+    Args:
+        parts: Strings that together identify one LLM result.
+
+    Returns:
+        A fixed-length key that changes whenever any part changes.
+    """
+    return hash_text("\0".join(str(part) for part in parts))
+
+
+class LLMResultCache:
+    """
+    Persistent, size-bounded LRU cache for LLM outputs backed by SQLite.
+
+    Entries are grouped by namespace so different prompts (refactor, summary...)
+    can share one database file. When the total stored size goes above
+    `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES, namespace: str = "default"):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON entries(last_access)")
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Looks up a cached value and marks it as recently used.
+
+        Args:
+            key: Cache key built with `make_cache_key`.
+
+        Returns:
+            The cached value, or None on a miss.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (time.time(), self.namespace, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, value: str) -> None:
+        """
+        Stores a value and evicts least recently used entries if the cache is too big.
+
+        Args:
+            key: Cache key built with `make_cache_key`.
+            value: LLM output to store.
+        """
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            logger.warning(f"Not caching {size} bytes: larger than the whole cache ({self.max_bytes} bytes).")
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, value, size, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes the oldest entries until the total size fits in `max_bytes`. Caller holds the lock."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT namespace, key, size FROM entries ORDER BY last_access ASC")
+        to_delete = []
+        for namespace, key, entry_size in rows:
+            if total <= self.max_bytes:
+                break
+            to_delete.append((namespace, key))
+            total -= entry_size
+        self._conn.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?", to_delete)
+        logger.info(f"Evicted {len(to_delete)} entries from LLM cache '{self.path}'.")
+
+    def clear(self) -> None:
+        """Removes every entry of this cache's namespace."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns hit/miss counters for this process and the stored size of the namespace.
+
+        Returns:
+            Dict with 'hits', 'misses', 'entries' and 'bytes'.
+        """
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries WHERE namespace = ?",
+                (self.namespace,)
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+def get_cache(namespace: str) -> Optional[LLMResultCache]:
+    """
+    Returns the shared cache instance for a namespace.
+
+    Args:
+        namespace: Logical cache name, e.g. 'refactor'.
+
+    Returns:
+        The process-wide LLMResultCache, or None if caching is disabled.
+    """
+    if not CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        if namespace not in _caches:
+            _caches[namespace] = LLMResultCache(namespace=namespace)
+        return _caches[namespace]
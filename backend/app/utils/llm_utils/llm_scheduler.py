@@ -0,0 +1,405 @@
+import os
+import re
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+import groq
+import httpx
+from dotenv import load_dotenv
+from loguru import logger
+
+from utils.llm_utils.create_groq_client import get_groq_client, API_KEYS
+from utils.llm_utils.token_counter import count_message_tokens
+
+load_dotenv()
+LLM_RPM_LIMIT = int(os.getenv("LLM_RPM_LIMIT", "30"))
+LLM_TPM_LIMIT = int(os.getenv("LLM_TPM_LIMIT", "12000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "900"))
+LLM_BAD_KEY_COOLDOWN = float(os.getenv("LLM_BAD_KEY_COOLDOWN", "300"))
+
+WINDOW_SECONDS = 60.0
+TRANSIENT_STATUSES = {408, 409, 500, 502, 503, 504}
+BAD_KEY_STATUSES = {401, 403}
+CONNECTION_ERRORS = (groq.APIConnectionError, httpx.TransportError, ConnectionError, TimeoutError)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+class LLMRateLimitError(RuntimeError):
+    """Raised when no API key gets enough rate-limit headroom in time."""
+
+
+class StopStream(Exception):
+    """Raised by a stream callback to stop reading a reply early; the stream returns what it has."""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Parses Groq-style durations such as '7.66s', '2m59.56s', '1h2m' or '250ms'.
+
+    Args:
+        value: Duration string, or a plain number of seconds.
+
+    Returns:
+        The duration in seconds, or None if it cannot be parsed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    scale = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    return sum(float(number) * scale[unit] for number, unit in parts)
+
+
+def estimate_tokens(messages: Sequence[Any]) -> int:
+    """
+    Estimates the tokens a chat call will use when the caller gives no estimate.
+
+    The reply is assumed to be about as long as the prompt, since refactors echo the code back.
+
+    Args:
+        messages: Chat messages with a `content` attribute.
+
+    Returns:
+        Estimated prompt plus completion tokens.
+    """
+    return max(1, count_message_tokens(messages) * 2)
+
+
+def response_tokens(response: Any) -> Optional[int]:
+    """Returns the total tokens reported for an LLM response, if any."""
+    usage = getattr(response, "usage_metadata", None)
+    if isinstance(usage, dict) and isinstance(usage.get("total_tokens"), int):
+        return usage["total_tokens"]
+    metadata = getattr(response, "response_metadata", None)
+    if isinstance(metadata, dict):
+        total = (metadata.get("token_usage") or {}).get("total_tokens")
+        if isinstance(total, int):
+            return total
+    return None
+
+
+class KeyBudget:
+    """Requests and tokens spent on one API key over the last minute."""
+
+    def __init__(self, key_index: int, rpm_limit: int, tpm_limit: int):
+        self.key_index = key_index
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.window: Deque[List[float]] = deque()  # [start time, tokens] per call
+        self.blocked_until = 0.0
+        self.requests = 0
+        self.tokens = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def prune(self, now: float, window: float) -> None:
+        while self.window and self.window[0][0] <= now - window:
+            self.window.popleft()
+
+    def headroom(self) -> Tuple[int, float]:
+        """Returns (requests left, tokens left) in the current window."""
+        return self.rpm_limit - len(self.window), self.tpm_limit - sum(tokens for _, tokens in self.window)
+
+
+class LLMScheduler:
+    """
+    Routes every LLM call to the API key with the most rate-limit headroom.
+
+    Each key has a sliding one-minute budget of requests and tokens. A call is
+    sent to the key with the largest remaining share of both; when every key
+    is exhausted the caller waits until one frees up instead of retrying.
+    Rate-limit responses block the key until the reset reported in the
+    response headers (or message) and the call moves on to another key;
+    connection errors and 5xx responses are retried with bounded, jittered
+    exponential backoff.
+    """
+
+    def __init__(
+        self,
+        key_indices: Optional[Sequence[int]] = None,
+        rpm_limit: int = LLM_RPM_LIMIT,
+        tpm_limit: int = LLM_TPM_LIMIT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_max: float = LLM_BACKOFF_MAX,
+        max_queue_wait: float = LLM_MAX_QUEUE_WAIT,
+        window: float = WINDOW_SECONDS
+    ):
+        if key_indices is None:
+            key_indices = list(range(len(API_KEYS))) or [0]
+        self.budgets: Dict[int, KeyBudget] = {
+            index: KeyBudget(index, rpm_limit, tpm_limit) for index in key_indices
+        }
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_queue_wait = max_queue_wait
+        self.window = window
+        self._cond = threading.Condition()
+
+    def invoke(
+        self,
+        messages: Sequence[Any],
+        key_index: Optional[int] = None,
+        estimated_tokens: Optional[int] = None,
+        **kwargs: Any
+    ) -> Tuple[Any, int]:
+        """
+        Sends a chat call through the key with the most headroom.
+
+        Args:
+            messages: Chat messages for the model.
+            key_index: Preferred key when several have the same headroom.
+            estimated_tokens: Expected prompt plus completion tokens; estimated from the messages if omitted.
+            kwargs: Extra arguments passed to the client's `invoke`.
+
+        Returns:
+            A tuple: (LLM response, index of the key that served it)
+
+        Raises:
+            LLMRateLimitError: If no key frees up within the queue wait limit.
+            Exception: The client's error when it is not retryable or retries are exhausted.
+        """
+        estimated = estimated_tokens or estimate_tokens(messages)
+
+        for attempt in range(self.max_retries + 1):
+            budget, entry = self.acquire(estimated, key_index)
+            try:
+                response = get_groq_client(budget.key_index).invoke(messages, **kwargs)
+            except Exception as e:
+                delay = self._on_error(budget, entry, e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    raise
+                key_index = None
+                if delay > 0:
+                    logger.warning(f"LLM call on key {budget.key_index} failed ({e}); retrying in {delay:.2f}s...")
+                    time.sleep(delay)
+                continue
+
+            self._record_usage(budget, entry, response, estimated)
+            return response, budget.key_index
+
+        raise LLMRateLimitError("LLM call retries exhausted")  # pragma: no cover
+
+    def stream(
+        self,
+        messages: Sequence[Any],
+        on_delta: Callable[[str], None],
+        key_index: Optional[int] = None,
+        estimated_tokens: Optional[int] = None,
+        **kwargs: Any
+    ) -> Tuple[Any, int]:
+        """
+        Streams a chat call through the key with the most headroom, passing each text delta to `on_delta`.
+
+        Errors before the first delta are retried like `invoke`. Once output has
+        been handed to `on_delta` the call is never retried, since the caller has
+        already consumed it. `on_delta` may raise `StopStream` to stop reading
+        early, or any other exception to abort the call.
+
+        Args:
+            messages: Chat messages for the model.
+            on_delta: Called with every non-empty piece of the reply, in order.
+            key_index: Preferred key when several have the same headroom.
+            estimated_tokens: Expected prompt plus completion tokens; estimated from the messages if omitted.
+            kwargs: Extra arguments passed to the client's `stream`.
+
+        Returns:
+            A tuple: (the merged reply chunks without their text, for the usage metadata; index of the key that served it)
+
+        Raises:
+            LLMRateLimitError: If no key frees up within the queue wait limit.
+            Exception: The client's error, or the one raised by `on_delta`.
+        """
+        estimated = estimated_tokens or estimate_tokens(messages)
+
+        for attempt in range(self.max_retries + 1):
+            budget, entry = self.acquire(estimated, key_index)
+            merged, received = None, False
+            stream = None
+            try:
+                stream = get_groq_client(budget.key_index).stream(messages, **kwargs)
+                for chunk in stream:
+                    if chunk.content:
+                        received = True
+                        on_delta(chunk.content)
+                        # The text belongs to on_delta; only the metadata (token usage) is merged
+                        chunk = chunk.model_copy(update={"content": ""})
+                    merged = chunk if merged is None else merged + chunk
+            except StopStream:
+                pass
+            except Exception as e:
+                if received:
+                    self._record_usage(budget, entry, merged, estimated)
+                    raise
+                delay = self._on_error(budget, entry, e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    raise
+                key_index = None
+                if delay > 0:
+                    logger.warning(f"LLM stream on key {budget.key_index} failed ({e}); retrying in {delay:.2f}s...")
+                    time.sleep(delay)
+                continue
+            finally:
+                # Closing the generator closes the HTTP response when the stream is stopped early
+                if stream is not None and hasattr(stream, "close"):
+                    stream.close()
+
+            self._record_usage(budget, entry, merged, estimated)
+            return merged, budget.key_index
+
+        raise LLMRateLimitError("LLM call retries exhausted")  # pragma: no cover
+
+    def _record_usage(self, budget: KeyBudget, entry: List[float], response: Any, estimated: int) -> None:
+        """Replaces the call's reserved tokens with the real usage, when the response reports it."""
+        with self._cond:
+            used = response_tokens(response)
+            entry[1] = used if used is not None else estimated
+            budget.tokens += int(entry[1])
+            self._cond.notify_all()
+
+    def acquire(self, estimated_tokens: int, preferred: Optional[int] = None) -> Tuple[KeyBudget, List[float]]:
+        """
+        Reserves a slot on the key with the most headroom, waiting if all are exhausted.
+
+        Args:
+            estimated_tokens: Tokens to reserve for the call.
+            preferred: Key to pick on a tie.
+
+        Returns:
+            A tuple: (key budget, window entry to update with the real token count)
+
+        Raises:
+            LLMRateLimitError: If no key frees up within `max_queue_wait` seconds.
+        """
+        deadline = time.monotonic() + self.max_queue_wait
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                budget, wait = self._pick(estimated_tokens, preferred, now)
+                if budget is not None:
+                    entry = [now, float(estimated_tokens)]
+                    budget.window.append(entry)
+                    budget.requests += 1
+                    return budget, entry
+
+                if now + wait > deadline:
+                    raise LLMRateLimitError(
+                        f"No LLM API key has rate-limit headroom within {self.max_queue_wait:.0f}s"
+                    )
+                logger.info(f"All LLM API keys are at their rate limit; waiting {wait:.1f}s...")
+                self._cond.wait(timeout=max(wait, 0.01))
+
+    def _pick(self, estimated_tokens: int, preferred: Optional[int], now: float) -> Tuple[Optional[KeyBudget], float]:
+        """Returns the best key with room for the call, or None and how long until one may free up."""
+        best, best_score, wait = None, None, self.window
+        for budget in self.budgets.values():
+            budget.prune(now, self.window)
+            if budget.blocked_until > now:
+                wait = min(wait, budget.blocked_until - now)
+                continue
+
+            requests_left, tokens_left = budget.headroom()
+            # A call larger than the whole budget may still run on an idle key
+            fits = requests_left > 0 and (tokens_left >= estimated_tokens or not budget.window)
+            if not fits:
+                if budget.window:
+                    wait = min(wait, budget.window[0][0] + self.window - now)
+                continue
+
+            score = (
+                min(requests_left / budget.rpm_limit, tokens_left / budget.tpm_limit),
+                budget.key_index == preferred,
+            )
+            if best_score is None or score > best_score:
+                best, best_score = budget, score
+        return best, max(wait, 0.0)
+
+    def _on_error(self, budget: KeyBudget, entry: List[float], error: Exception, attempt: int) -> Optional[float]:
+        """
+        Updates the key's budget after a failed call.
+
+        Returns:
+            Seconds to sleep before retrying (0 to retry at once on another key), or None if not retryable.
+        """
+        status = getattr(error, "status_code", None)
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+
+        with self._cond:
+            budget.errors += 1
+            try:
+                if status == 429 or "rate limit" in str(error).lower():
+                    budget.rate_limited += 1
+                    limit = headers.get("x-ratelimit-limit-tokens")
+                    if limit and limit.isdigit():
+                        budget.tpm_limit = int(limit)
+                    budget.blocked_until = time.monotonic() + self._rate_limit_wait(error, headers, attempt)
+                    return 0.0
+
+                entry[1] = 0.0
+                if status in BAD_KEY_STATUSES:
+                    budget.blocked_until = time.monotonic() + LLM_BAD_KEY_COOLDOWN
+                    return 0.0 if len(self.budgets) > 1 else None
+                if status in TRANSIENT_STATUSES or (status is not None and status >= 500) or isinstance(error, CONNECTION_ERRORS):
+                    return self._backoff(attempt)
+                return None
+            finally:
+                self._cond.notify_all()
+
+    def _rate_limit_wait(self, error: Exception, headers: Any, attempt: int) -> float:
+        """Seconds until a rate-limited key can be used again, from headers, the message, or backoff."""
+        for header in ("retry-after", "x-ratelimit-reset-tokens", "x-ratelimit-reset-requests"):
+            wait = parse_duration(headers.get(header))
+            if wait is not None:
+                return min(wait, self.backoff_max * 10)
+
+        match = re.search(r"try again in ((?:\d+(?:\.\d+)?(?:ms|h|m|s))+)", str(error))
+        wait = parse_duration(match.group(1)) if match else None
+        return min(wait, self.backoff_max * 10) if wait is not None else self._backoff(attempt)
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff: a random delay up to base * 2^attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def stats(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Returns per-key usage for monitoring.
+
+        Returns:
+            Mapping of key index to requests, tokens, rate-limit hits, errors, current window usage and block time left.
+        """
+        with self._cond:
+            now = time.monotonic()
+            result = {}
+            for index, budget in self.budgets.items():
+                budget.prune(now, self.window)
+                requests_left, tokens_left = budget.headroom()
+                result[index] = {
+                    "requests": budget.requests,
+                    "tokens": budget.tokens,
+                    "rate_limited": budget.rate_limited,
+                    "errors": budget.errors,
+                    "requests_left": requests_left,
+                    "tokens_left": tokens_left,
+                    "blocked_for": round(max(0.0, budget.blocked_until - now), 3),
+                }
+            return result
+
+
+# Shared by every LLM helper so all calls draw on the same per-key budgets
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,243 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from langchain.schema.messages import SystemMessage, HumanMessage
+from loguru import logger
+
+from utils.llm_utils.llm_scheduler import llm_scheduler
+from utils.llm_utils.ast_chunker import CodeChunk, chunk_python_source
+from utils.llm_utils.create_groq_client import MAX_COMPLETION_TOKENS
+from utils.llm_utils.token_counter import count_tokens, count_message_tokens, MESSAGE_OVERHEAD_TOKENS
+
+load_dotenv()
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "131072"))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", str(min(MAX_COMPLETION_TOKENS, 32768))))
+LLM_REPLY_TOKENS = int(os.getenv("LLM_REPLY_TOKENS", "4096"))
+LLM_CHUNK_WORKERS = int(os.getenv("LLM_CHUNK_WORKERS", "4"))
+
+# A "next.." reply and the chunk size of the old conversational protocol, for the savings estimate
+ACK_TOKENS = 4
+LEGACY_CHUNK_CHARS = 100000
+
+
+def chunk_budget(overhead: str, rewrites_code: bool) -> int:
+    """
+    Largest amount of code, in tokens, that one request can carry.
+
+    Args:
+        overhead: System prompt and instructions sent along with the code.
+        rewrites_code: True when the reply repeats the code (refactoring), so it must also fit the output limit.
+
+    Returns:
+        Token budget for the code of one request.
+    """
+    available = LLM_CONTEXT_TOKENS - count_tokens(overhead) - 2 * MESSAGE_OVERHEAD_TOKENS
+    if rewrites_code:
+        return max(1, min(LLM_MAX_OUTPUT_TOKENS, available // 2))
+    return max(1, available - LLM_REPLY_TOKENS)
+
+
+def split_into_chunks(code: str, overhead: str, rewrites_code: bool) -> List[CodeChunk]:
+    """
+    Splits a file into the fewest AST-bounded chunks that each fit one request.
+
+    Args:
+        code: Python source code.
+        overhead: System prompt and instructions sent along with each chunk.
+        rewrites_code: True when the reply repeats the code (refactoring).
+
+    Returns:
+        Chunks in file order; a single chunk when the whole file fits.
+    """
+    return chunk_python_source(code, chunk_budget(overhead, rewrites_code), count_tokens)
+
+
+def chunk_prompt(chunk: CodeChunk, part: int, parts: int) -> str:
+    """
+    Formats one chunk for a prompt, with where it sits in its file.
+
+    Args:
+        chunk: The chunk to describe.
+        part: 1-based position of the chunk.
+        parts: Number of chunks of the file.
+
+    Returns:
+        Text introducing the chunk and its context, followed by its code.
+    """
+    if parts == 1:
+        return f"```python\n{chunk.body}\n```"
+
+    text = f"This is part {part} of {parts} of the file (lines {chunk.start_line}-{chunk.end_line}).\n"
+    if chunk.context:
+        text += f"For reference, it sits under these imports and enclosing definitions:\n```python\n{chunk.context}\n```\n"
+    if chunk.indent:
+        text += "The code is shown dedented out of its enclosing definition.\n"
+    return text + f"```python\n{chunk.body}\n```"
+
+
+def chunked_protocol_tokens(system_prompt: str, instruction: str, code: str) -> int:
+    """
+    Prompt tokens the old conversational protocol would send for one file.
+
+    That protocol sent an intro, every chunk and a final instruction as
+    separate calls, each re-sending the whole conversation so far.
+
+    Args:
+        system_prompt: System prompt of the request.
+        instruction: Task instructions (stands in for both the intro and the final message).
+        code: File content.
+
+    Returns:
+        Estimated total prompt tokens over all calls.
+    """
+    chunks = [code[i:i + LEGACY_CHUNK_CHARS] for i in range(0, len(code), LEGACY_CHUNK_CHARS)] or [""]
+    total, history = 0, count_tokens(system_prompt)
+    for message in [instruction, *chunks, instruction]:
+        history += count_tokens(message)
+        total += history
+        history += ACK_TOKENS
+    return total
+
+
+class TokenUsage:
+    """Thread-safe per-purpose counters of LLM calls and tokens, with the savings over the chunked protocol."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage: Dict[str, Dict[str, int]] = {}
+
+    def record(self, purpose: str, calls: int, prompt_tokens: int, completion_tokens: int, chunked_prompt_tokens: int) -> None:
+        with self._lock:
+            entry = self._usage.setdefault(purpose, {
+                "requests": 0, "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "chunked_prompt_tokens": 0
+            })
+            entry["requests"] += 1
+            entry["calls"] += calls
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["chunked_prompt_tokens"] += chunked_prompt_tokens
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns usage per purpose.
+
+        Returns:
+            Mapping like {"refactor": {"requests", "calls", "prompt_tokens", "completion_tokens",
+            "chunked_prompt_tokens", "saved_prompt_tokens", "saved_percent"}}.
+        """
+        with self._lock:
+            result = {}
+            for purpose, entry in self._usage.items():
+                saved = entry["chunked_prompt_tokens"] - entry["prompt_tokens"]
+                result[purpose] = {
+                    **entry,
+                    "saved_prompt_tokens": saved,
+                    "saved_percent": round(100 * saved / entry["chunked_prompt_tokens"], 1) if entry["chunked_prompt_tokens"] else 0.0,
+                }
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._usage.clear()
+
+
+token_usage = TokenUsage()
+
+
+def invoke_prompts(
+    purpose: str,
+    system_prompt: str,
+    prompts: List[str],
+    key_index: int = 0,
+    file_path: Optional[str] = None,
+    baseline_tokens: int = 0,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    max_workers: Optional[int] = None,
+    max_output_tokens: int = LLM_REPLY_TOKENS,
+    on_delta: Optional[Callable[[int, str], None]] = None
+) -> Tuple[List[str], int]:
+    """
+    Sends each prompt as its own single-turn request, in parallel, and records the token usage.
+
+    Args:
+        purpose: Usage bucket, e.g. 'refactor' or 'summary'.
+        system_prompt: System prompt sent with every request.
+        prompts: Independent user prompts (one per chunk).
+        key_index: Preferred API key.
+        file_path: File the prompts are about, for logs and progress events.
+        baseline_tokens: Prompt tokens the chunked protocol would have needed, for the savings log.
+        progress_callback: Called with an 'llm-chunk' event after each request.
+        max_workers: Number of prompts in flight at the same time (default LLM_CHUNK_WORKERS).
+        max_output_tokens: Reply limit per request; lowered when the prompt leaves less room in the context.
+        on_delta: When given, replies are streamed and this is called with (1-based prompt number, text delta);
+            it may raise `StopStream` to stop a reply early.
+
+    Returns:
+        A tuple: (reply text per prompt, in prompt order, empty when streamed to on_delta; last API key index used)
+    """
+    def send(item: Tuple[int, str]) -> Tuple[str, int, int, int]:
+        number, prompt = item
+        messages = [SystemMessage(content=system_prompt), HumanMessage(content=prompt)]
+        prompt_tokens = count_message_tokens(messages)
+        max_tokens = max(1, min(max_output_tokens, LLM_CONTEXT_TOKENS - prompt_tokens))
+        start = time.perf_counter()
+        logger.info(f"Sending part {number}/{len(prompts)} of {file_path} to LLM ({prompt_tokens} prompt tokens)...")
+        # Replies are assumed to be at most as long as the prompt
+        estimated_tokens = prompt_tokens + min(max_tokens, prompt_tokens)
+        first_token: List[float] = []
+        completion_tokens = [0]
+
+        if on_delta is None:
+            response, used_key = llm_scheduler.invoke(
+                messages, key_index=key_index, estimated_tokens=estimated_tokens, max_tokens=max_tokens
+            )
+            completion_tokens[0] = count_tokens(response.content)
+        else:
+            def forward(text: str) -> None:
+                if not first_token:
+                    first_token.append(time.perf_counter() - start)
+                completion_tokens[0] += count_tokens(text)
+                on_delta(number, text)
+
+            response, used_key = llm_scheduler.stream(
+                messages, forward, key_index=key_index, estimated_tokens=estimated_tokens, max_tokens=max_tokens
+            )
+
+        if progress_callback is not None:
+            event = {
+                "event": "llm-chunk",
+                "file": file_path,
+                "chunk": number,
+                "chunks": len(prompts),
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+            if first_token:
+                event["first_token_seconds"] = round(first_token[0], 3)
+            progress_callback(event)
+        return response.content if response is not None else "", used_key, prompt_tokens, completion_tokens[0]
+
+    items = list(enumerate(prompts, start=1))
+    max_workers = max_workers or LLM_CHUNK_WORKERS
+    if len(items) == 1 or max_workers <= 1:
+        results = [send(item) for item in items]
+    else:
+        # Chunks are independent, so they can be in flight together
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            results = list(executor.map(send, items))
+
+    outputs = [content for content, _, _, _ in results]
+    key_index = results[-1][1] if results else key_index
+    prompt_tokens = sum(tokens for _, _, tokens, _ in results)
+    completion_tokens = sum(tokens for _, _, _, tokens in results)
+
+    token_usage.record(purpose, len(prompts), prompt_tokens, completion_tokens, baseline_tokens)
+    if baseline_tokens:
+        logger.info(
+            f"{purpose} {file_path}: {len(prompts)} call(s), ~{prompt_tokens} prompt tokens "
+            f"(chunked protocol: ~{baseline_tokens})"
+        )
+    return outputs, key_index
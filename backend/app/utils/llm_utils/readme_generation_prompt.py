@@ -1,14 +1,71 @@
 import re
 import time
-from typing import Dict
-from langchain.schema.messages import SystemMessage, HumanMessage, AIMessage
-from langchain.text_splitter import PythonCodeTextSplitter
-from utils.llm_utils.create_groq_client import get_groq_client
+from typing import Any, Dict, List, Tuple
+from langchain.schema.messages import SystemMessage, HumanMessage
+from utils.llm_utils.llm_scheduler import llm_scheduler
+from utils.llm_utils.prompt_packing import (
+    chunk_budget,
+    split_into_chunks,
+    chunk_prompt,
+    chunked_protocol_tokens,
+    invoke_prompts,
+)
+from utils.llm_utils.token_counter import count_tokens, CHARS_PER_TOKEN
+from utils.llm_utils.llm_cache import get_cache, hash_text, make_cache_key
+from utils.llm_utils.create_groq_client import MODEL
 from loguru import logger
 
+SUMMARY_SYSTEM_PROMPT = "You are a professional Python code analyst and documentation expert."
+FILE_INSTRUCTION_TEMPLATE = """
+        Analyze the code and produce a summary that explains what `{file_name}` does.
+        It should be concise and clear, suitable for inclusion in a README.md. Highlight the core logic, key components, and any noteworthy behavior.
+    """
+FILE_PARTS_PROMPT_TEMPLATE = "Combine these summaries of the parts of `{file_name}` into one summary of the whole file.\n{instruction}\n\n{partial_summaries}"
+PACKAGE_SYSTEM_PROMPT = SUMMARY_SYSTEM_PROMPT
+PACKAGE_INSTRUCTION = """
+        Combine the summaries below into one summary of {name}: what it is for, its main components
+        and how they work together. It should be concise and clear; do not list every file.
+    """
+
+# Changes whenever a prompt changes, so summaries made with an old prompt are not reused
+SUMMARY_PROMPT_VERSION = hash_text(
+    SUMMARY_SYSTEM_PROMPT + FILE_INSTRUCTION_TEMPLATE + FILE_PARTS_PROMPT_TEMPLATE + PACKAGE_INSTRUCTION
+)[:16]
+
+
+def _invoke_cached(prompts: List[str], file_path: str, key_index: int = 0) -> Tuple[List[str], int]:
+    """
+    Sends summary prompts, reusing the cached reply of any prompt already answered.
+
+    A rollup prompt holds the summaries it combines, so its key changes exactly
+    when one of them does: an unchanged package keeps its cached summary, and a
+    changed file only invalidates the rollups above it.
+    """
+    cache = get_cache("summary")
+    keys = [make_cache_key("rollup", hash_text(prompt), MODEL, SUMMARY_PROMPT_VERSION) for prompt in prompts]
+    outputs = [cache.get(key) if cache is not None else None for key in keys]
+    missing = [index for index, output in enumerate(outputs) if output is None]
+    if missing:
+        replies, key_index = invoke_prompts(
+            "summary", SUMMARY_SYSTEM_PROMPT, [prompts[index] for index in missing], key_index=key_index, file_path=file_path
+        )
+        for index, reply in zip(missing, replies):
+            outputs[index] = reply
+            if cache is not None and reply:
+                cache.put(keys[index], reply)
+    if len(missing) < len(prompts):
+        logger.info(f"Reused {len(prompts) - len(missing)} cached summaries for {file_path}")
+    return outputs, key_index
+
+
 def file_summary(file_content: str, file_name: str, key_index = 0) -> str:
     """
-    Summarizes a Python file by sending its content (in chunks) to the LLM.
+    Summarizes a Python file with the LLM.
+
+    Sends the whole file in one request when it fits the model's context; larger
+    files are summarized chunk by chunk and the partial summaries are then
+    combined in one more request. Summaries are cached by file content, name,
+    model and prompt version, so an unchanged file is never summarized twice.
 
     Args:
         file_content: Raw content of the Python file.
@@ -17,71 +74,181 @@ def file_summary(file_content: str, file_name: str, key_index = 0) -> str:
     Returns:
         A summary string describing the file's purpose and behavior.
     """
+    cache = get_cache("summary")
+    cache_key = make_cache_key("file", hash_text(file_content), file_name, MODEL, SUMMARY_PROMPT_VERSION)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for the summary of {file_name}, skipping LLM call.")
+            return cached, key_index
 
-    llm = get_groq_client(key_index)
     # Prompts
-    system_prompt = SystemMessage(content="You are a professional Python code analyst and documentation expert.")
+    system_prompt = SUMMARY_SYSTEM_PROMPT
+    instruction = FILE_INSTRUCTION_TEMPLATE.format(file_name=file_name)
+
+    chunks = split_into_chunks(file_content, system_prompt + instruction, rewrites_code=False)
+    prompts = [
+        f"{instruction}\n{chunk_prompt(chunk, part, len(chunks))}"
+        for part, chunk in enumerate(chunks, start=1)
+    ]
+
+    outputs, key_index = invoke_prompts(
+        "summary",
+        system_prompt,
+        prompts,
+        key_index=key_index,
+        file_path=file_name,
+        baseline_tokens=chunked_protocol_tokens(system_prompt, instruction, file_content),
+    )
+    if len(outputs) == 1:
+        summary = outputs[0]
+    else:
+        partial_summaries = "\n\n".join(f"Part {part}:\n{output.strip()}" for part, output in enumerate(outputs, start=1))
+        combined, key_index = invoke_prompts(
+            "summary",
+            system_prompt,
+            [FILE_PARTS_PROMPT_TEMPLATE.format(file_name=file_name, instruction=instruction, partial_summaries=partial_summaries)],
+            key_index=key_index,
+            file_path=file_name,
+        )
+        summary = combined[0]
+
+    if cache is not None and summary:
+        cache.put(cache_key, summary)
+    return summary, key_index
 
-    init_prompt = f"""
-        I will send you a large file by chunking. You just read all the chunks and remember the import modules and file name: {file_name}. 
-        Whenever I say that all chunks are provided, you should summarize the file and this summary will be used for automatic README generation.
-        No need to respond to the earlier chunks; just say 'next..' until I tell you all chunks are provided.
+
+
+def format_summaries(summaries: Dict[str, str]) -> str:
+    """Formats summaries as markdown sections headed by their path."""
+    return "".join(f"### `{path}`\n{summary.strip()}\n\n" for path, summary in summaries.items())
+
+
+def fit_summary(path: str, summary: str, budget: int) -> str:
     """
+    Cuts a summary so that its section, path header included, fits a token budget.
 
-    final_instruction = f"""
-        All chunks are provided. Now analyze the full code and produce a summary that explains what `{file_name}` does.
-        It should be concise and clear, suitable for inclusion in a README.md. Highlight the core logic, key components, and any noteworthy behavior.
+    Args:
+        path: Path heading the section.
+        summary: Summary to cut.
+        budget: Token budget of the whole section.
+
+    Returns:
+        The summary, possibly cut; empty when the header alone does not fit.
     """
+    room = budget - count_tokens(format_summaries({path: ""}))
+    cut = summary.strip()[:max(0, room) * CHARS_PER_TOKEN]
+    while cut and count_tokens(format_summaries({path: cut})) > budget:
+        cut = cut[:len(cut) * 3 // 4]
+    return cut
 
-    text_splitter = PythonCodeTextSplitter(chunk_size=100000, chunk_overlap=0)
-    chunks = text_splitter.split_text(file_content)
-    chunks.insert(0, init_prompt)
-    chunks.append(final_instruction)
 
-    messages = [system_prompt]
-    final_output = ''
-    
-    for chunk in chunks:
-        messages.append(HumanMessage(content=chunk))
-        while True:
-            try:
-                logger.info(f"Sending chunk to LLM:...")  
-                response = llm.invoke(messages) 
-                break  # Exit loop on success
-            except Exception as e:
-                msg = str(e)
-                key_index = (key_index + 1) % 4  # Rotate through API keys
-                logger.error(f"Error invoking LLM: {msg}. Switching to API key index {key_index}...")
-                llm = get_groq_client(key_index)  # Reinitialize client
+def pack_summaries(summaries: Dict[str, str], budget: int) -> List[Dict[str, str]]:
+    """
+    Splits summaries into consecutive groups that each fit a token budget.
 
-        messages.append(AIMessage(content=response.content))
-        final_output = response.content
-    return final_output, key_index
+    A single summary larger than the budget is cut to fit, so every group can be sent.
 
+    Args:
+        summaries: Path -> summary, in the order they should stay in.
+        budget: Token budget of one group.
 
+    Returns:
+        Groups of summaries, in order; one group when everything fits.
+    """
+    groups: List[Dict[str, str]] = [{}]
+    used = 0
+    for path, summary in summaries.items():
+        tokens = count_tokens(format_summaries({path: summary}))
+        if tokens > budget:
+            summary = summary[:max(1, budget - count_tokens(path) - 16) * CHARS_PER_TOKEN]
+            tokens = count_tokens(format_summaries({path: summary}))
+        if groups[-1] and used + tokens > budget:
+            groups.append({})
+            used = 0
+        groups[-1][path] = summary
+        used += tokens
+    return groups
 
-def generate_readme_from_repo_summary(repo_summary: Dict[str, str], python_version: str) -> str:
+
+def reduce_summaries(name: str, summaries: Dict[str, str], budget: int, key_index: int = 0) -> Tuple[Dict[str, str], int]:
     """
-    Generates a structured README.md from file-level summaries and Python version.
+    Combines summaries until they fit a token budget.
+
+    Summaries that fit are returned as they are. Otherwise they are packed into
+    groups that each fit, every group is summarized in one request, and the
+    group summaries are reduced again, so the fan-in of each request is set by
+    the budget and no prompt outgrows the context window. If a round does not
+    reduce the number of groups (the replies are too long to pack together),
+    every section is cut to an equal share of the budget instead, or, when
+    their headers alone do not fit, the summaries are merged into one section
+    with an equal share each; no summary is dropped whole.
 
     Args:
-        repo_summary: Mapping of file paths to their summaries.
-        python_version: The Python version used in the project.
+        name: What the summaries describe, e.g. "the package `utils/`".
+        summaries: Path -> summary.
+        budget: Token budget for the summaries of one request.
+        key_index: Preferred API key.
 
     Returns:
-        A full README string in markdown format.
+        Summaries that fit the budget, and the key index to continue with.
     """
-    llm = get_groq_client()
+    previous_groups = None
+    while True:
+        groups = pack_summaries(summaries, budget)
+        if len(groups) == 1:
+            return groups[0], key_index
+        if previous_groups is not None and len(groups) >= previous_groups:
+            logger.warning(f"Summaries of {name} stopped shrinking at {len(groups)} groups; truncating them to fit.")
+            share = budget // len(summaries)
+            truncated = {path: fit_summary(path, summary, share) for path, summary in summaries.items()}
+            groups = pack_summaries(truncated, budget)
+            if len(groups) > 1:
+                # Too many parts for even their headers to fit: merge them into one section, an equal share each
+                logger.warning(f"Headers of {len(summaries)} summaries of {name} exceed the budget; merging them.")
+                room = budget - count_tokens(format_summaries({name: ""}))
+                each = max(1, room // len(summaries) - 1) * CHARS_PER_TOKEN
+                merged = "\n".join(summary.strip()[:each] for summary in summaries.values())
+                groups = pack_summaries({name: merged}, budget)
+            return groups[0], key_index
+        previous_groups = len(groups)
+        instruction = PACKAGE_INSTRUCTION.format(name=f"this part of {name}")
+        outputs, key_index = _invoke_cached(
+            [f"{instruction}\n{format_summaries(group)}" for group in groups], name, key_index
+        )
+        summaries = {f"{name} (part {part} of {len(outputs)})": output for part, output in enumerate(outputs, start=1)}
 
+
+def package_summary(package: str, summaries: Dict[str, str], budget: int, key_index: int = 0) -> Tuple[str, int]:
+    """
+    Summarizes a package from the summaries of its files and sub-packages.
+
+    Args:
+        package: Package directory, relative to the repository root.
+        summaries: Path -> summary of its files and sub-packages.
+        budget: Token budget for the summaries of one request.
+        key_index: Preferred API key.
+
+    Returns:
+        The package summary and the key index to continue with.
+    """
+    name = f"the package `{package}/`"
+    summaries, key_index = reduce_summaries(name, summaries, budget, key_index)
+    outputs, key_index = _invoke_cached(
+        [f"{PACKAGE_INSTRUCTION.format(name=name)}\n{format_summaries(summaries)}"], package, key_index
+    )
+    return outputs[0], key_index
+
+
+def readme_messages(repo_summary: Dict[str, str], python_version: str) -> List[Any]:
+    """Builds the README request from file (or package) summaries."""
     system_prompt = SystemMessage(content="""
         You are a professional technical writer and Python developer. Your job is to generate a clear, structured README.md file 
         for a Python repository based on summarized descriptions of each file and the Python version used.
         Make sure the README includes a project overview, key components, and a 'Getting Started' section.
     """)
 
-    file_summaries = ""
-    for file, summary in repo_summary.items():
-        file_summaries += f"### `{file}`\n{summary.strip()}\n\n"
+    file_summaries = format_summaries(repo_summary)
 
     user_prompt = f"""
         Generate a complete README.md using the following context:
@@ -103,7 +270,32 @@ def generate_readme_from_repo_summary(repo_summary: Dict[str, str], python_versi
         Use proper markdown formatting.
     """
 
-    messages = [system_prompt, HumanMessage(content=user_prompt)]
-    response = llm.invoke(messages)
+    return [system_prompt, HumanMessage(content=user_prompt)]
+
+
+def readme_summary_budget(python_version: str) -> int:
+    """Tokens of summaries that fit in the README request next to its instructions and reply."""
+    overhead = "".join(message.content for message in readme_messages({}, python_version))
+    return chunk_budget(overhead, rewrites_code=False)
+
+
+def package_summary_budget() -> int:
+    """Tokens of summaries that fit in one package summary request."""
+    return chunk_budget(PACKAGE_SYSTEM_PROMPT + PACKAGE_INSTRUCTION, rewrites_code=False)
+
+
+def generate_readme_from_repo_summary(repo_summary: Dict[str, str], python_version: str) -> str:
+    """
+    Generates a structured README.md from file-level summaries and Python version.
+
+    Args:
+        repo_summary: Mapping of file (or package) paths to their summaries; together they
+            must fit `readme_summary_budget`.
+        python_version: The Python version used in the project.
+
+    Returns:
+        A full README string in markdown format.
+    """
+    response, _ = llm_scheduler.invoke(readme_messages(repo_summary, python_version))
 
     return response.content.strip()
@@ -1,37 +1,84 @@
-import re 
 import time 
-from langchain.schema.messages import SystemMessage, HumanMessage, AIMessage
-from langchain.text_splitter import PythonCodeTextSplitter
-
-from utils.llm_utils.create_groq_client import get_groq_client
+from typing import Any, Callable, Dict, Optional
+
+from utils.llm_utils.create_groq_client import MODEL
+from utils.llm_utils.ast_chunker import join_chunks
+from utils.llm_utils.prompt_packing import (
+    split_into_chunks,
+    chunk_prompt,
+    chunked_protocol_tokens,
+    invoke_prompts,
+    LLM_MAX_OUTPUT_TOKENS,
+)
+from utils.llm_utils.llm_cache import get_cache, hash_text, make_cache_key
+from utils.llm_utils.code_stream import FencedCodeExtractor, StreamingCodeWriter, LLM_STREAMING
 from loguru import logger
 
+SYSTEM_PROMPT = "You are a powerful code refactorer and version upgrader."
+
+CODE_INSTRUCTION_TEMPLATE = """
+            Your task:
+            - Refactor the code to be compatible with **Python {python_version}**.
+            - Ensure proper indentation and clean formatting.
+            - Add missing **docstrings** and **type hints** where applicable.
+            - Maintain clarity and structure throughout.
+
+            Important:
+            - Output only valid Python code.
+            - No explanations, comments, or markdown.
+            - Do not stop until the **entire updated code** is provided.
+            """
+
+TEST_INSTRUCTION_TEMPLATE = """
+            Your task:
+            - Refactor and updated the full content to **Python {python_version}**.
+            - Follow best practices (`pytest` or `unittest` as applicable).
+            - Add docstrings and type hints.
+            - Make test names clear and meaningful.
+
+            Important:
+            - Output only the final Python test code.
+            - No comments, markdown, or summaries.
+            - Do not stop until the **entire test file** is refactored.
+            """
+
+FILE_PROMPT_TEMPLATE = """
+        Here is the full {file_type} file `{file_path}`.
+        {instruction}
+```python
+{code}
+```
+"""
+
+SECTION_PROMPT_TEMPLATE = """
+        The {file_type} file `{file_path}` is too large for one request, so it is refactored in parts
+        that are processed separately and joined in order. Refactor and return only the code of this part.
+        {instruction}
+{chunk}
+"""
+
+# Changes whenever a prompt changes, so cached refactors made with an old prompt are not reused
+PROMPT_VERSION = hash_text(
+    SYSTEM_PROMPT + CODE_INSTRUCTION_TEMPLATE + TEST_INSTRUCTION_TEMPLATE
+    + FILE_PROMPT_TEMPLATE + SECTION_PROMPT_TEMPLATE
+)[:16]
+
 
 def clean_llm_code_output(text: str) -> str:
     """
     Extracts and returns the code inside the first ```python ...``` block 
     from LLM-generated output. Falls back to any ```...``` block if needed.
 
+    Uses the same extractor as streamed replies, so both give the same code.
+
     Args:
         text: LLM-generated string containing markdown-formatted code.
 
     Returns:
         Extracted code string, or original text if no code block is found.
     """
-    # Normalize line endings and strip leading/trailing space
-    text = text.strip().replace("\r\n", "\n").replace("\r", "\n")
-
-    # Try to extract from the first ```python ... ``` block
-    match = re.search(r"```python\n(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-
-    # Fallback: try any ``` ... ``` block (without language specifier)
-    match = re.search(r"```\n(.*?)```", text, re.DOTALL)
-    if match:
-        return match.group(1).strip()
-
-    return text  # Nothing found
+    extractor = FencedCodeExtractor()
+    return extractor.feed(text) + extractor.finish()
 
 
 def refactor_code_or_test_file(
@@ -39,80 +86,104 @@ def refactor_code_or_test_file(
     file_path: str,
     python_version: str = "3.12",
     file_type: str = "code",
-    key_index = 1
+    key_index = 1,
+    progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+    stream_path: Optional[str] = None
 ) -> str:
     """    Refactors a Python code or test file using LLM.
+
+    The whole file goes out in a single request when it fits the model's
+    context and output limits; larger files are split into AST-bounded chunks
+    (see `ast_chunker`), which are refactored in parallel and joined in order.
+
+    With LLM_STREAMING on, replies are streamed: the code is extracted as it
+    arrives, written to `stream_path` in file order and sent to
+    `progress_callback` as 'llm-delta' events. A reply is cut off as soon as
+    its code block closes, and a reply that ends inside the block or grows far
+    beyond its input raises `LLMOutputTruncatedError` and removes the file.
+    The streamed code is not kept in memory: it is read back from
+    `stream_path` only when the result cache is on, and None is returned otherwise.
+
     Args:
         code (str): The original code content.
         file_path (str): The path of the file being refactored.
         python_version (str): Target Python version for refactoring.
         file_type (str): Type of file - 'code' or 'test'.
+        progress_callback: Called with a 'cache-hit' event, or an 'llm-chunk' event after each LLM request
+            (and 'llm-delta' events with new code while streaming).
+        stream_path: File the code is written to while it streams; not written when None or on a cache hit.
     Returns:
-        str: The refactored code content.  
+        str: The refactored code content, or None when it was streamed to `stream_path` with the cache off.
     """
     
-    llm = get_groq_client(key_index)
-
-    # Prompts
-    system_prompt = SystemMessage(content="You are a powerful code refactorer and version upgrader.")
-
-    init_prompt = f"""
-        I will send you a large {file_type} file by chunking. File name is : {file_path}. you just read all the chunks also remember class and function information. whenever I will say that all chunks are provided, then you should refactor the full code file. No need to say anything, you can say just next.. ok?
-    """
-
-    if file_type == "code":
-        final_instruction = f"""
-            You now have the full code.
-
-            Your task:
-            - Refactor the entire code to be compatible with **Python {python_version}**.
-            - Ensure proper indentation and clean formatting.
-            - Add missing **docstrings** and **type hints** where applicable.
-            - Maintain clarity and structure throughout.
-
-            Important:
-            - Output only valid Python code.
-            - No explanations, comments, or markdown.
-            - Do not stop until the **entire updated code** is provided.
-            """
+    cache = get_cache("refactor")
+    cache_key = make_cache_key(hash_text(code), file_type, python_version, MODEL, PROMPT_VERSION)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit for {file_path}, skipping LLM call.")
+            if progress_callback is not None:
+                progress_callback({"event": "cache-hit", "file": file_path})
+            return cached, key_index
+
+    instruction_template = CODE_INSTRUCTION_TEMPLATE if file_type == "code" else TEST_INSTRUCTION_TEMPLATE
+    instruction = instruction_template.format(python_version=python_version)
+
+    # One request when the file fits, otherwise independent AST-bounded chunks stitched back in order
+    chunks = split_into_chunks(code, SYSTEM_PROMPT + SECTION_PROMPT_TEMPLATE + instruction, rewrites_code=True)
+    if len(chunks) == 1:
+        prompts = [FILE_PROMPT_TEMPLATE.format(file_type=file_type, file_path=file_path, instruction=instruction, code=code)]
     else:
-        final_instruction = f"""
-            You now have the full test file.
-
-            Your task:
-            - Refactor and updated the full content to **Python {python_version}**.
-            - Follow best practices (`pytest` or `unittest` as applicable).
-            - Add docstrings and type hints.
-            - Make test names clear and meaningful.
-
-            Important:
-            - Output only the final Python test code.
-            - No comments, markdown, or summaries.
-            - Do not stop until the **entire test file** is refactored.
-            """
-
-    text_splitter = PythonCodeTextSplitter(chunk_size=100000, chunk_overlap=0)
-    chunks = text_splitter.split_text(code)
-    chunks.insert(0, init_prompt)
-    chunks.append(final_instruction)
-
-    messages = [system_prompt]
-    final_output = ''
-    
-    for chunk in chunks:
-        messages.append(HumanMessage(content=chunk))
-        while True:
-            try:
-                logger.info(f"Sending chunk to LLM:...")  
-                response = llm.invoke(messages) 
-                break  # Exit loop on success
-            except Exception as e:
-                msg = str(e)
-                key_index = (key_index + 1) % 4  # Rotate through API keys
-                logger.error(f"Error invoking LLM: {msg}. Switching to API key index {key_index}...")
-                llm = get_groq_client(key_index)  # Reinitialize client
-                
-
-        messages.append(AIMessage(content=response.content))
-        final_output = response.content
-    return clean_llm_code_output(final_output), key_index
+        prompts = [
+            SECTION_PROMPT_TEMPLATE.format(
+                file_type=file_type,
+                file_path=file_path,
+                instruction=instruction,
+                chunk=chunk_prompt(chunk, part, len(chunks)),
+            )
+            for part, chunk in enumerate(chunks, start=1)
+        ]
+
+    baseline_tokens = chunked_protocol_tokens(SYSTEM_PROMPT, instruction, code)
+    if LLM_STREAMING:
+        def on_text(text: str) -> None:
+            if progress_callback is not None:
+                progress_callback({"event": "llm-delta", "file": file_path, "text": text})
+
+        writer = StreamingCodeWriter(chunks, path=stream_path, on_text=on_text)
+        try:
+            _, key_index = invoke_prompts(
+                "refactor",
+                SYSTEM_PROMPT,
+                prompts,
+                key_index=key_index,
+                file_path=file_path,
+                baseline_tokens=baseline_tokens,
+                progress_callback=progress_callback,
+                max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
+                on_delta=writer.feed,
+            )
+            refactored = writer.finish()
+        except Exception:
+            writer.abort()
+            raise
+        if refactored is None and cache is not None:
+            # The code was only written to stream_path; it is read back once, for the cache
+            with open(stream_path, "r", encoding="utf-8") as f:
+                refactored = f.read()
+    else:
+        outputs, key_index = invoke_prompts(
+            "refactor",
+            SYSTEM_PROMPT,
+            prompts,
+            key_index=key_index,
+            file_path=file_path,
+            baseline_tokens=baseline_tokens,
+            progress_callback=progress_callback,
+            max_output_tokens=LLM_MAX_OUTPUT_TOKENS,
+        )
+        refactored = join_chunks([clean_llm_code_output(output) for output in outputs], chunks)
+
+    if cache is not None and refactored:
+        cache.put(cache_key, refactored)
+    return refactored, key_index
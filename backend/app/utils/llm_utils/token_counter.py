@@ -0,0 +1,139 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Sequence
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+# Llama 3 uses a tiktoken-style BPE; cl100k_base is the closest bundled encoding
+TOKENIZER_ENCODING = os.getenv("LLM_TOKENIZER_ENCODING", "cl100k_base")
+TOKEN_CACHE_SIZE = int(os.getenv("LLM_TOKEN_CACHE_SIZE", "16384"))
+
+CHARS_PER_TOKEN = 4
+# Texts shorter than this are cheaper to encode than to hash
+MIN_CACHED_CHARS = 256
+# Role and separator tokens the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class TokenCounter:
+    """
+    Counts tokens with a real BPE encoder, memoizing counts per content hash.
+
+    The encoder is loaded lazily. If it cannot be loaded (tiktoken missing, or
+    its encoding files not downloadable), counts fall back to about 4
+    characters per token, rounded up, and `exact` reports False.
+    """
+
+    def __init__(self, encoding_name: str = TOKENIZER_ENCODING, cache_size: int = TOKEN_CACHE_SIZE):
+        self.encoding_name = encoding_name
+        self.cache_size = cache_size
+        self._encoding: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def exact(self) -> bool:
+        return self._load() is not None
+
+    def _load(self) -> Any:
+        if self._loaded:
+            return self._encoding
+        with self._lock:
+            if not self._loaded:
+                try:
+                    import tiktoken
+                    self._encoding = tiktoken.get_encoding(self.encoding_name)
+                except Exception as e:
+                    logger.warning(f"Tokenizer '{self.encoding_name}' unavailable ({e}); estimating 4 characters per token.")
+                    self._encoding = None
+                self._loaded = True
+        return self._encoding
+
+    def _encode_count(self, text: str) -> int:
+        encoding = self._load()
+        if encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def count(self, text: str) -> int:
+        """
+        Returns the number of tokens in a text.
+
+        Args:
+            text: Any text.
+
+        Returns:
+            Token count (0 for an empty text).
+        """
+        if not text:
+            return 0
+        if len(text) < MIN_CACHED_CHARS:
+            return self._encode_count(text)
+
+        key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+
+        tokens = self._encode_count(text)
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+    def count_messages(self, messages: Sequence[Any]) -> int:
+        """
+        Returns the prompt tokens of a list of chat messages, including per-message overhead.
+
+        Args:
+            messages: Chat messages with a `content` attribute (or plain strings).
+
+        Returns:
+            Token count of the whole prompt.
+        """
+        return sum(
+            self.count(str(getattr(message, "content", message))) + MESSAGE_OVERHEAD_TOKENS
+            for message in messages
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns tokenizer and memo cache statistics.
+
+        Returns:
+            Dict with 'encoding', 'exact', 'hits', 'misses' and 'entries'.
+        """
+        exact = self.exact
+        with self._lock:
+            return {
+                "encoding": self.encoding_name,
+                "exact": exact,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._cache),
+            }
+
+
+token_counter = TokenCounter()
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens in a text, using the shared token counter."""
+    return token_counter.count(text)
+
+
+def count_message_tokens(messages: Sequence[Any]) -> int:
+    """Prompt tokens of a list of chat messages, using the shared token counter."""
+    return token_counter.count_messages(messages)
@@ -0,0 +1,427 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import subprocess
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+VENV_CACHE_DIR = os.getenv("VENV_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "code-agent", "venvs"))
+WHEELHOUSE_DIR = os.getenv("WHEELHOUSE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "code-agent", "wheels"))
+VENV_CACHE_MAX_MB = int(os.getenv("VENV_CACHE_MAX_MB", "4096"))
+WHEELHOUSE_MAX_MB = int(os.getenv("WHEELHOUSE_MAX_MB", "2048"))
+# Install only from WHEELHOUSE_DIR, never from the package index
+DEPENDENCY_OFFLINE = os.getenv("DEPENDENCY_OFFLINE", "false").lower() in ("1", "true", "yes")
+
+READY_MARKER = ".ready"
+FREEZE_FILE = "freeze.txt"
+PIP_ENV = {"PIP_DISABLE_PIP_VERSION_CHECK": "1", "PIP_NO_INPUT": "1"}
+
+_REQUIREMENT = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)(.*)$")
+_key_locks: Dict[str, threading.Lock] = {}
+_key_locks_lock = threading.Lock()
+# Number of pip runs reading each wheelhouse; wheels are only evicted while it is zero
+_wheelhouse_users: Dict[str, int] = {}
+_wheelhouse_lock = threading.Lock()
+
+
+class CachedEnvironment(NamedTuple):
+    env_dir: str
+    installed_packages: List[str]
+    reused: bool
+
+
+class ResolutionError(RuntimeError):
+    """Raised when a requirement set cannot be resolved (conflicts or missing distributions)."""
+
+
+def normalize_requirements(requirements_text: str) -> List[str]:
+    """
+    Returns the requirement lines in a canonical form, so equivalent sets get the same cache key.
+
+    Comments, blank lines and pip options are dropped, names are normalized as
+    in PEP 503 (`PyYAML` and `pyyaml` are the same) and the lines are sorted.
+
+    Args:
+        requirements_text: Content of a requirements file.
+
+    Returns:
+        Sorted, de-duplicated requirement lines.
+    """
+    requirements = set()
+    for line in requirements_text.splitlines():
+        line = line.split("#")[0].strip()
+        if not line or line.startswith("-"):
+            continue
+        match = _REQUIREMENT.match(line)
+        if match:
+            name = re.sub(r"[-_.]+", "-", match.group(1)).lower()
+            requirements.add(name + re.sub(r"\s+", "", match.group(2)))
+    return sorted(requirements)
+
+
+@lru_cache(maxsize=16)
+def interpreter_id(python_executable: str) -> str:
+    """Identifies an interpreter by its real path and full version, which decide what a venv built from it contains."""
+    result = subprocess.run(
+        [python_executable, "-c", "import sys, platform; print(sys.version, platform.machine())"],
+        capture_output=True, text=True, check=True,
+    )
+    return f"{os.path.realpath(python_executable)} {result.stdout.strip()}"
+
+
+def cache_key(requirements: List[str], python_executable: str) -> str:
+    payload = json.dumps({"python": interpreter_id(python_executable), "requirements": requirements})
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+@contextmanager
+def _using_wheelhouse(wheelhouse: str) -> Iterator[None]:
+    """Marks a wheelhouse as read by pip, so evict_wheels leaves it alone meanwhile."""
+    with _wheelhouse_lock:
+        _wheelhouse_users[wheelhouse] = _wheelhouse_users.get(wheelhouse, 0) + 1
+    try:
+        yield
+    finally:
+        with _wheelhouse_lock:
+            _wheelhouse_users[wheelhouse] -= 1
+
+
+def _venv_python(env_dir: str) -> str:
+    return os.path.join(env_dir, "bin", "python") if os.name != "nt" else os.path.join(env_dir, "Scripts", "python.exe")
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _pip(python_path: str, *args: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [python_path, "-m", "pip", *args],
+        capture_output=True, text=True, env={**os.environ, **PIP_ENV},
+    )
+
+
+def _install(python_path: str, requirements_file: str, wheelhouse: str, offline: bool) -> None:
+    """Installs from the wheelhouse, filling it from the package index first when a wheel is missing (unless offline)."""
+    install = ("install", "--no-index", "--find-links", wheelhouse, "--only-binary=:all:", "-r", requirements_file)
+    result = _pip(python_path, *install)
+    if result.returncode == 0:
+        logger.info("Installed every requirement from the local wheelhouse.")
+        return
+    if offline:
+        raise RuntimeError(f"Failed to install packages offline from {wheelhouse}:\n{result.stderr or result.stdout}")
+
+    # The target interpreter downloads, so the wheels match its version and platform
+    download = _pip(python_path, "download", "--only-binary=:all:", "--find-links", wheelhouse, "--dest", wheelhouse, "-r", requirements_file)
+    if download.returncode != 0:
+        raise RuntimeError(f"Failed to install packages:\n{download.stderr or download.stdout}")
+    result = _pip(python_path, *install)
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to install packages:\n{result.stderr or result.stdout}")
+
+
+def evict_environments(cache_dir: str = VENV_CACHE_DIR, max_mb: int = VENV_CACHE_MAX_MB, keep: Optional[str] = None) -> List[str]:
+    """
+    Removes the least recently used environments until the cache fits in max_mb.
+
+    Args:
+        cache_dir: Environment cache directory.
+        max_mb: Disk budget in megabytes.
+        keep: Environment directory that must not be removed (the one in use).
+
+    Returns:
+        The removed environment directories.
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+    environments = []
+    for name in os.listdir(cache_dir):
+        env_dir = os.path.join(cache_dir, name)
+        marker = os.path.join(env_dir, READY_MARKER)
+        if not os.path.isfile(marker):
+            continue
+        try:
+            with open(marker, "r", encoding="utf-8") as f:
+                size = json.load(f)["size"]
+        except (OSError, ValueError, KeyError):
+            size = _directory_size(env_dir)
+        environments.append((os.path.getmtime(marker), size, env_dir))
+
+    total = sum(size for _, size, _ in environments)
+    removed = []
+    for _, size, env_dir in sorted(environments):
+        if total <= max_mb * 1024 * 1024:
+            break
+        if env_dir == keep:
+            continue
+        # An environment being reused or rebuilt holds its key lock; it is skipped rather than pulled away
+        lock = _key_lock(os.path.basename(env_dir))
+        if not lock.acquire(blocking=False):
+            continue
+        try:
+            shutil.rmtree(env_dir, ignore_errors=True)
+        finally:
+            lock.release()
+        total -= size
+        removed.append(env_dir)
+    if removed:
+        logger.info(f"Evicted {len(removed)} cached environment(s) to stay under {max_mb} MB.")
+    return removed
+
+
+def _wheel_id(filename: str) -> Optional[str]:
+    """Returns 'name==version' for a wheel file name, with the name normalized like `pip freeze` output."""
+    if not filename.endswith(".whl"):
+        return None
+    parts = filename[:-len(".whl")].split("-")
+    if len(parts) < 5:
+        return None
+    return f"{re.sub(r'[-_.]+', '-', parts[0]).lower()}=={parts[1]}"
+
+
+def _touch_wheels(wheelhouse: str, installed_packages: Iterable[str]) -> None:
+    """Marks the wheels of the installed packages as recently used, for evict_wheels."""
+    used = set()
+    for line in installed_packages:
+        name, _, version = line.partition("==")
+        if version:
+            used.add(f"{re.sub(r'[-_.]+', '-', name).lower()}=={version}")
+    for name in os.listdir(wheelhouse):
+        if _wheel_id(name) in used:
+            try:
+                os.utime(os.path.join(wheelhouse, name))
+            except OSError:
+                pass
+
+
+def evict_wheels(wheelhouse: str = WHEELHOUSE_DIR, max_mb: int = WHEELHOUSE_MAX_MB) -> List[str]:
+    """
+    Removes the least recently used wheels until the wheelhouse fits in max_mb.
+
+    Nothing is removed while pip is reading the wheelhouse for an install or a
+    resolution; the next build evicts instead.
+
+    Args:
+        wheelhouse: Directory of wheels shared by all environments.
+        max_mb: Disk budget in megabytes.
+
+    Returns:
+        The removed wheel files.
+    """
+    if not os.path.isdir(wheelhouse):
+        return []
+    with _wheelhouse_lock:
+        if _wheelhouse_users.get(wheelhouse):
+            return []
+        wheels = []
+        for name in os.listdir(wheelhouse):
+            path = os.path.join(wheelhouse, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            wheels.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in wheels)
+        removed = []
+        for _, size, path in sorted(wheels):
+            if total <= max_mb * 1024 * 1024:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed.append(path)
+    if removed:
+        logger.info(f"Evicted {len(removed)} wheel(s) to keep the wheelhouse under {max_mb} MB.")
+    return removed
+
+
+def get_environment(
+    requirements_text: str,
+    python_executable: str,
+    offline: bool = DEPENDENCY_OFFLINE,
+    cache_dir: str = VENV_CACHE_DIR,
+    wheelhouse: str = WHEELHOUSE_DIR,
+    max_mb: int = VENV_CACHE_MAX_MB,
+    wheelhouse_max_mb: int = WHEELHOUSE_MAX_MB
+) -> CachedEnvironment:
+    """
+    Returns a virtual environment with the requirements installed, reusing a cached one when possible.
+
+    Environments are keyed by the interpreter and the normalized requirement
+    set, so an identical set costs no venv creation and no pip run at all.
+    New environments install from a shared local wheelhouse; only the wheels
+    missing from it are downloaded, and `offline` never contacts the index.
+    Least recently used environments are evicted once the cache passes max_mb,
+    and least recently used wheels once the wheelhouse passes wheelhouse_max_mb.
+
+    Args:
+        requirements_text: Content of a requirements file.
+        python_executable: Interpreter the environment is created with.
+        offline: Install only from the wheelhouse.
+        cache_dir: Directory holding one sub-directory per environment.
+        wheelhouse: Directory of wheels shared by all environments.
+        max_mb: Disk budget of the environment cache in megabytes.
+        wheelhouse_max_mb: Disk budget of the wheelhouse in megabytes.
+
+    Returns:
+        CachedEnvironment with the environment directory, its `pip freeze` output and whether it was reused.
+
+    Raises:
+        RuntimeError: If the environment cannot be created or a package cannot be installed.
+    """
+    requirements = normalize_requirements(requirements_text)
+    key = cache_key(requirements, python_executable)
+    env_dir = os.path.join(cache_dir, key)
+    marker = os.path.join(env_dir, READY_MARKER)
+
+    with _key_lock(key):
+        if os.path.isfile(marker):
+            try:
+                os.utime(marker)
+                with open(os.path.join(env_dir, FREEZE_FILE), "r", encoding="utf-8") as f:
+                    installed_packages = f.read().splitlines()
+                logger.info(f"Reusing cached environment {key} for {len(requirements)} requirement(s).")
+                return CachedEnvironment(env_dir, installed_packages, True)
+            except FileNotFoundError:
+                # Evicted by another process in the meantime
+                logger.info(f"Cached environment {key} disappeared while being reused; rebuilding it.")
+
+        # A directory without the marker is left over from an interrupted build
+        shutil.rmtree(env_dir, ignore_errors=True)
+        os.makedirs(wheelhouse, exist_ok=True)
+        start = time.perf_counter()
+        try:
+            try:
+                subprocess.run([python_executable, "-m", "venv", env_dir], check=True, capture_output=True, text=True)
+            except subprocess.CalledProcessError as e:
+                raise RuntimeError(f"Failed to create virtual environment: {e.stderr or e}")
+            python_path = _venv_python(env_dir)
+
+            if requirements:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    requirements_file = os.path.join(temp_dir, "requirements.txt")
+                    with open(requirements_file, "w", encoding="utf-8") as f:
+                        f.write("\n".join(requirements))
+                    with _using_wheelhouse(wheelhouse):
+                        _install(python_path, requirements_file, wheelhouse, offline)
+
+            result = _pip(python_path, "freeze")
+            installed_packages = result.stdout.strip().splitlines() if result.returncode == 0 else []
+            _touch_wheels(wheelhouse, installed_packages)
+            with open(os.path.join(env_dir, FREEZE_FILE), "w", encoding="utf-8") as f:
+                f.write("\n".join(installed_packages))
+            with open(marker, "w", encoding="utf-8") as f:
+                json.dump({"requirements": requirements, "size": _directory_size(env_dir)}, f)
+        except BaseException:
+            shutil.rmtree(env_dir, ignore_errors=True)
+            raise
+        logger.info(f"Built environment {key} with {len(installed_packages)} package(s) in {time.perf_counter() - start:.1f}s.")
+
+    evict_environments(cache_dir, max_mb, keep=env_dir)
+    evict_wheels(wheelhouse, wheelhouse_max_mb)
+    return CachedEnvironment(env_dir, installed_packages, False)
+
+
+def resolve_requirements(
+    requirements_text: str,
+    python_executable: str,
+    python_version: Optional[str] = None,
+    offline: bool = DEPENDENCY_OFFLINE,
+    cache_dir: str = VENV_CACHE_DIR,
+    wheelhouse: str = WHEELHOUSE_DIR
+) -> List[str]:
+    """
+    Resolves a requirement set to exact pins without installing anything.
+
+    Runs `pip install --dry-run --report`, which reads package metadata (from
+    the wheelhouse first, then the index unless `offline`) and resolves
+    versions without creating a venv or unpacking wheels. Only binary wheels
+    are considered, as in `get_environment`, so no sdist is built and a set
+    that resolves can also be installed. If a cached environment for the same
+    set exists, its frozen pins are returned instead.
+
+    Args:
+        requirements_text: Content of a requirements file.
+        python_executable: Interpreter whose pip resolves the set.
+        python_version: Target version, e.g. "3.12", when it differs from python_executable's.
+        offline: Resolve only from the wheelhouse.
+        cache_dir: Environment cache checked for an existing environment.
+        wheelhouse: Directory of local wheels.
+
+    Returns:
+        Sorted `name==version` pins, like `pip freeze`.
+
+    Raises:
+        ResolutionError: If the set has conflicts or a requirement has no matching wheel.
+    """
+    requirements = normalize_requirements(requirements_text)
+    if not requirements:
+        return []
+    if python_version is None:
+        key = cache_key(requirements, python_executable)
+        env_dir = os.path.join(cache_dir, key)
+        with _key_lock(key):
+            if os.path.isfile(os.path.join(env_dir, READY_MARKER)):
+                try:
+                    with open(os.path.join(env_dir, FREEZE_FILE), "r", encoding="utf-8") as f:
+                        return f.read().splitlines()
+                except FileNotFoundError:
+                    pass
+
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        requirements_file = os.path.join(temp_dir, "requirements.txt")
+        report_file = os.path.join(temp_dir, "report.json")
+        with open(requirements_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(requirements))
+
+        # Binary-only like _install, so a set resolves here exactly when it can be installed
+        args = [
+            "install", "--dry-run", "--ignore-installed", "--only-binary=:all:", "--quiet",
+            "--report", report_file, "-r", requirements_file,
+        ]
+        if os.path.isdir(wheelhouse):
+            args += ["--find-links", wheelhouse]
+        if offline:
+            args.append("--no-index")
+        if python_version:
+            # Nothing is written to the target; pip only accepts --python-version with one
+            args += ["--python-version", python_version, "--target", os.path.join(temp_dir, "target")]
+        with _using_wheelhouse(wheelhouse):
+            result = _pip(python_executable, *args)
+        if result.returncode != 0:
+            errors = [line for line in (result.stderr or result.stdout).splitlines() if line.strip()]
+            raise ResolutionError("Could not resolve the requirements:\n" + "\n".join(errors))
+        with open(report_file, "r", encoding="utf-8") as f:
+            report = json.load(f)
+
+    pins = sorted(
+        f"{item['metadata']['name']}=={item['metadata']['version']}" for item in report.get("install", [])
+    )
+    logger.info(f"Resolved {len(requirements)} requirement(s) to {len(pins)} pins in {time.perf_counter() - start:.1f}s without installing.")
+    return pins
@@ -0,0 +1,379 @@
+"""
+End-to-end benchmark of the refactor, analysis, README and dependency pipelines.
+
+A synthetic repository of configurable size is served by the fake GitHub
+server, and every LLM call goes to the fake LLM server (devtools/), so runs
+need no network or API quota and are repeatable. Each pipeline runs in a
+fresh process so its peak RSS is its own. For every pipeline the suite
+reports wall time, LLM calls, tokens sent and received, HTTP requests,
+peak RSS and a per-stage breakdown, and writes them as JSON so runs on
+different commits can be compared.
+
+Usage (from the backend folder):
+    python benchmarks/bench_pipelines.py --files 40 --file-chars 4000 --test-ratio 0.25 --llm-latency 0.2
+    python benchmarks/bench_pipelines.py --pipelines refactor readme --compare benchmarks/results/baseline.json
+
+The LLM result cache is disabled, so every run measures uncached work.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "app"))
+
+PIPELINES = ["refactor", "analysis", "readme", "dependencies"]
+OWNER, REPO, BRANCH = "bench", "synthetic", "main"
+# Metrics compared against a baseline; higher is worse for all of them
+COMPARED_METRICS = ["wall_seconds", "llm_calls", "prompt_tokens", "completion_tokens", "http_requests", "peak_rss_mb"]
+
+
+def synthetic_repo(files: int, file_chars: int, test_ratio: float, seed: int = 0) -> Dict[str, bytes]:
+    """
+    Generates a deterministic repository of plain-stdlib Python modules and unittest files.
+
+    Modules only import the standard library and, relatively, their own
+    package, so the dependency pipeline has nothing to download.
+
+    Args:
+        files: Total number of files.
+        file_chars: Approximate size of each file in characters.
+        test_ratio: Share of the files that are tests (under <package>/tests/).
+        seed: Seed for names and constants.
+
+    Returns:
+        Mapping of repository path to file content.
+    """
+    rng = random.Random(seed)
+    tests = round(files * test_ratio)
+    modules = max(files - tests, 1 if tests else 0)
+    repo: Dict[str, bytes] = {}
+
+    for index in range(modules):
+        package = f"pkg{index % 5}"
+        parts = ["import os\nimport json\nfrom typing import Dict, List\n"]
+        if index >= 5:
+            parts.append(f"from .module_{index % 5} import function_{index % 5}_0\n")
+        number = 0
+        while sum(map(len, parts)) < file_chars:
+            constant = rng.randint(2, 999)
+            if number % 3 == 2:
+                parts.append(
+                    f"\n\nclass Handler{index}_{number}:\n"
+                    f"    \"\"\"Keeps a running total.\"\"\"\n\n"
+                    f"    def __init__(self, limit={constant}):\n"
+                    f"        self.limit = limit\n"
+                    f"        self.items = []\n\n"
+                    f"    def add(self, value):\n"
+                    f"        if len(self.items) > self.limit:\n"
+                    f"            self.items = self.items[1:]\n"
+                    f"        self.items.append(value)\n"
+                    f"        return sum(self.items)\n"
+                )
+            else:
+                parts.append(
+                    f"\n\ndef function_{index}_{number}(values: List[int], options: Dict = {{}}) -> int:\n"
+                    f"    total = 0\n"
+                    f"    for value in values:\n"
+                    f"        if value % {constant} == 0:\n"
+                    f"            total += value * {constant}\n"
+                    f"        else:\n"
+                    f"            total -= 1\n"
+                    f"    return total + len(json.dumps(options)) + len(os.sep)\n"
+                )
+            number += 1
+        repo[f"{package}/module_{index}.py"] = "".join(parts).encode()
+
+    for index in range(tests):
+        target = index % modules
+        parts = [f"import unittest\n\nfrom ..module_{target} import function_{target}_0\n"]
+        number = 0
+        while sum(map(len, parts)) < file_chars:
+            value = rng.randint(1, 50)
+            parts.append(
+                f"\n\nclass TestFunction{number}(unittest.TestCase):\n"
+                f"    def test_result_is_int(self):\n"
+                f"        self.assertIsInstance(function_{target}_0([{value}, {value + 1}]), int)\n"
+            )
+            number += 1
+        repo[f"pkg{target % 5}/tests/test_module_{index}.py"] = "".join(parts).encode()
+
+    return repo
+
+
+def write_repo(files: Dict[str, bytes], root: str) -> None:
+    for path, data in files.items():
+        full_path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(data)
+
+
+def peak_rss_mb() -> Optional[float]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_pipeline(name: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Runs one pipeline in the current (fresh) process.
+
+    Stages are measured from the services' progress events; '*_busy' stages
+    add up per-file durations over all workers, so they can exceed the wall time.
+
+    Returns:
+        Dict with 'wall_seconds', 'stages', 'files', 'failed', 'peak_rss_mb' and 'error'.
+    """
+    from loguru import logger
+    from utils.github_utils import get_branch_files, get_github_file_content
+    from services.refactor_full_repo_service import refactor_all_python_files_in_repo
+    from services.file_analysis_service import generate_file_analysis
+    from services.readme_generation_service import generate_readme
+    from services.dependency_management_services import generate_dependencies
+
+    logger.remove()
+    logger.add(sys.stderr, level=config["log_level"])
+
+    events: List[Dict[str, Any]] = []
+    start = time.perf_counter()
+
+    def record(event: Dict[str, Any]) -> None:
+        events.append({**event, "at": time.perf_counter() - start})
+
+    def busy(event_type: str) -> float:
+        return round(sum(e.get("seconds", 0.0) for e in events if e["event"] == event_type), 3)
+
+    def last(event_type: str) -> float:
+        return max((e["at"] for e in events if e["event"] == event_type), default=0.0)
+
+    stages: Dict[str, float] = {}
+    failed, error = 0, None
+    try:
+        if name == "refactor":
+            files = get_branch_files(OWNER, REPO, BRANCH)
+            stages["list_files"] = round(time.perf_counter() - start, 3)
+            _, _, logs = refactor_all_python_files_in_repo(
+                OWNER, REPO, BRANCH, files, config["python_version"],
+                output_dir=os.path.join(config["work_dir"], "refactored"),
+                max_workers=config["workers"], use_snapshot=config["snapshot"],
+                progress_callback=record,
+            )
+            failed = sum(1 for line in logs if line.startswith("[x]"))
+            stages["fetch_busy"] = busy("fetched")
+            stages["llm_busy"] = busy("llm-chunk")
+            first_tokens = [e["first_token_seconds"] for e in events if "first_token_seconds" in e]
+            if first_tokens:
+                stages["first_token_mean"] = round(sum(first_tokens) / len(first_tokens), 3)
+
+        elif name == "analysis":
+            for file_path in config["files"]:
+                fetch_start = time.perf_counter()
+                content = get_github_file_content(OWNER, REPO, file_path, BRANCH)
+                record({"event": "fetched", "seconds": time.perf_counter() - fetch_start})
+                llm_start = time.perf_counter()
+                generate_file_analysis(file_path, content)
+                record({"event": "analyzed", "seconds": time.perf_counter() - llm_start})
+            stages["fetch"] = busy("fetched")
+            stages["llm"] = busy("analyzed")
+
+        elif name == "readme":
+            generate_readme(config["repo_dir"], config["python_version"], progress_callback=record)
+            failed = sum(1 for e in events if e["event"] == "summarized" and e["log"].startswith("[x]"))
+            stages["summaries"] = round(last("summarized"), 3)
+            stages["readme"] = round(time.perf_counter() - start - stages["summaries"], 3)
+
+        elif name == "dependencies":
+            generate_dependencies(config["repo_dir"], config["python_version"], progress_callback=record)
+            stages["scan"] = round(last("scanned"), 3)
+            stages["merge_and_install"] = round(time.perf_counter() - start - stages["scan"], 3)
+
+        else:
+            raise ValueError(f"Unknown pipeline '{name}'")
+    except Exception as e:
+        error = str(e)
+
+    return {
+        "wall_seconds": round(time.perf_counter() - start, 3),
+        "stages": stages,
+        "files": len(config["files"]),
+        "failed": failed,
+        "peak_rss_mb": peak_rss_mb(),
+        "error": error,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Prints each metric next to its baseline value and returns the regressions.
+
+    Args:
+        results: This run's results.
+        baseline: A previous results file.
+        threshold: Allowed relative increase, e.g. 0.1 for 10%.
+
+    Returns:
+        One description per metric that grew by more than the threshold.
+    """
+    regressions = []
+    print(f"\n{'pipeline':<13} {'metric':<18} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, current in results["pipelines"].items():
+        previous = baseline.get("pipelines", {}).get(name)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), current.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+                continue
+            change = (new - old) / old if old else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  <-- regression"
+                regressions.append(f"{name} {metric}: {old} -> {new} ({change:+.1%})")
+            print(f"{name:<13} {metric:<18} {old:>12} {new:>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipelines", nargs="+", choices=PIPELINES, default=PIPELINES)
+    parser.add_argument("--files", type=int, default=40, help="Number of files in the synthetic repo")
+    parser.add_argument("--file-chars", type=int, default=4000, help="Approximate size of each file in characters")
+    parser.add_argument("--test-ratio", type=float, default=0.25, help="Share of test files")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=4, help="Refactor worker threads")
+    parser.add_argument("--snapshot", action="store_true", help="Refactor from one branch archive instead of per-file fetches")
+    parser.add_argument("--streaming", action="store_true", help="Stream refactor replies (LLM_STREAMING)")
+    parser.add_argument("--keys", type=int, default=4, help="Number of fake API keys")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Base seconds per LLM reply")
+    parser.add_argument("--llm-jitter", type=float, default=0.3, help="Log-normal sigma of the LLM latency")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="LLM generation speed (0 for instant)")
+    parser.add_argument("--rpm-limit", type=int, default=0, help="Requests per minute per key (0 for unlimited)")
+    parser.add_argument("--tpm-limit", type=int, default=0, help="Tokens per minute per key (0 for unlimited)")
+    parser.add_argument("--python-version", default=f"{sys.version_info.major}.{sys.version_info.minor}")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative increase reported as a regression")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    from devtools.fake_github_server import FakeGitHubServer
+    from devtools.fake_llm_server import FakeLLMServer
+
+    files = synthetic_repo(args.files, args.file_chars, args.test_ratio, args.seed)
+    llm = FakeLLMServer(
+        latency=args.llm_latency, latency_jitter=args.llm_jitter, tokens_per_second=args.tokens_per_second,
+        rpm_limit=args.rpm_limit, tpm_limit=args.tpm_limit, seed=args.seed,
+    )
+    github = FakeGitHubServer()
+    github.add_repo(OWNER, REPO, files, branch=BRANCH)
+
+    with llm, github, tempfile.TemporaryDirectory() as work_dir:
+        # Read by the pipeline processes when they import the app modules
+        os.environ.update({
+            "GROQ_BASE_URL": llm.url,
+            "GROQ_API_KEYS": ",".join(f"bench-key-{i}" for i in range(args.keys)),
+            "GROQ_MODEL": "fake-model",
+            "GITHUB_API_URL": github.url,
+            "GITHUB_RAW_URL": github.url,
+            "GITHUB_ARCHIVE_URL": github.url,
+            "GITHUB_SNAPSHOT_DIR": os.path.join(work_dir, "snapshots"),
+            "LLM_CACHE_ENABLED": "false",
+            # A cold environment cache, so runs stay comparable
+            "VENV_CACHE_DIR": os.path.join(work_dir, "venvs"),
+            "WHEELHOUSE_DIR": os.path.join(work_dir, "wheels"),
+            "LLM_STREAMING": "true" if args.streaming else "false",
+            "LLM_RPM_LIMIT": str(args.rpm_limit or 1_000_000),
+            "LLM_TPM_LIMIT": str(args.tpm_limit or 1_000_000_000),
+        })
+        repo_dir = os.path.join(work_dir, "repo")
+        write_repo(files, repo_dir)
+        config = {
+            "files": sorted(files),
+            "repo_dir": repo_dir,
+            "work_dir": work_dir,
+            "workers": args.workers,
+            "snapshot": args.snapshot,
+            "python_version": args.python_version,
+            "log_level": args.log_level,
+        }
+
+        pipelines: Dict[str, Any] = {}
+        for name in args.pipelines:
+            llm_before, github_before = Counter(llm.requests), Counter(github.requests)
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+                result = executor.submit(run_pipeline, name, config).result()
+            llm_used = llm.requests - llm_before
+            github_used = sum((github.requests - github_before).values())
+            pipelines[name] = {
+                **result,
+                "llm_calls": llm_used["chat/completions"],
+                "rate_limited": llm_used["rate_limited"],
+                "prompt_tokens": llm_used["prompt_tokens"],
+                "completion_tokens": llm_used["completion_tokens"],
+                "github_requests": github_used,
+                "http_requests": github_used + llm_used["chat/completions"],
+            }
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "repo": {"files": len(files), "bytes": sum(map(len, files.values()))},
+        "pipelines": pipelines,
+    }
+
+    print(f"{'pipeline':<13} {'seconds':>8} {'llm calls':>10} {'429s':>5} {'tokens in':>10} {'tokens out':>11} {'http':>6} {'rss MB':>7}  stages")
+    for name, result in pipelines.items():
+        stages = " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in result["stages"].items())
+        print(
+            f"{name:<13} {result['wall_seconds']:>8.2f} {result['llm_calls']:>10} {result['rate_limited']:>5} "
+            f"{result['prompt_tokens']:>10} {result['completion_tokens']:>11} {result['http_requests']:>6} "
+            f"{result['peak_rss_mb'] or 0:>7.1f}  {stages}"
+        )
+        if result["error"]:
+            print(f"{'':<13} error: {result['error']}")
+
+    output = args.output or os.path.join(
+        BACKEND_DIR, "benchmarks", "results", f"{results['commit'] or 'nocommit'}-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {os.path.relpath(output)}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
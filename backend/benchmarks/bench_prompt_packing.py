@@ -0,0 +1,67 @@
+"""
+Prompt-token comparison of the old chunk-by-chunk conversation and single-shot / sectioned requests.
+
+No LLM is called: synthetic modules of growing size are packed exactly as
+`refactor_code_or_test_file` would pack them, and the prompt tokens of both
+protocols are counted.
+
+Usage (from the backend folder):
+    python benchmarks/bench_prompt_packing.py --sizes 5000 50000 200000 800000
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from utils.llm_utils.prompt_packing import (  # noqa: E402
+    count_tokens,
+    split_into_chunks,
+    chunked_protocol_tokens,
+)
+from utils.llm_utils.refactor_file import (  # noqa: E402
+    SYSTEM_PROMPT,
+    CODE_INSTRUCTION_TEMPLATE,
+    SECTION_PROMPT_TEMPLATE,
+)
+
+
+def synthetic_module(target_chars: int) -> str:
+    parts = ["import os\nfrom typing import List\n\n"]
+    index = 0
+    while sum(map(len, parts)) < target_chars:
+        parts.append(
+            f"\ndef function_{index}(values: List[int]) -> int:\n"
+            f"    total = 0\n"
+            f"    for value in values:\n"
+            f"        total += value * {index}\n"
+            f"    return total + len(os.sep)\n"
+        )
+        index += 1
+    return "".join(parts)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_000, 50_000, 200_000, 800_000], help="File sizes in characters")
+    args = parser.parse_args()
+
+    instruction = CODE_INSTRUCTION_TEMPLATE.format(python_version="3.12")
+
+    print(f"{'chars':>9} {'chunked calls':>14} {'chunked tokens':>15} {'calls':>6} {'tokens':>9} {'saved':>7}")
+    for size in args.sizes:
+        code = synthetic_module(size)
+        legacy_calls = -(-len(code) // 100_000) + 2
+        legacy_tokens = chunked_protocol_tokens(SYSTEM_PROMPT, instruction, code)
+        chunks = split_into_chunks(code, SYSTEM_PROMPT + SECTION_PROMPT_TEMPLATE + instruction, rewrites_code=True)
+        packed_tokens = sum(
+            count_tokens(SYSTEM_PROMPT) + count_tokens(SECTION_PROMPT_TEMPLATE + instruction)
+            + count_tokens(chunk.context) + count_tokens(chunk.body)
+            for chunk in chunks
+        )
+        saved = 100 * (legacy_tokens - packed_tokens) / legacy_tokens
+        print(f"{len(code):>9} {legacy_calls:>14} {legacy_tokens:>15} {len(chunks):>6} {packed_tokens:>9} {saved:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
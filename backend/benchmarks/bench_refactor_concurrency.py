@@ -0,0 +1,61 @@
+"""
+Throughput benchmark for `refactor_all_python_files_in_repo`.
+
+GitHub and the LLM are replaced by local stubs that only sleep, so the numbers
+show how well the worker pool overlaps network-bound calls.
+
+Usage (from the backend folder):
+    python benchmarks/bench_refactor_concurrency.py --files 64 --llm-latency 0.2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from loguru import logger
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from services.refactor_full_repo_service import refactor_all_python_files_in_repo  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=64, help="Number of synthetic files")
+    parser.add_argument("--fetch-latency", type=float, default=0.02, help="Seconds per GitHub fetch")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Seconds per LLM refactor")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+
+    logger.remove()
+    files = [f"pkg/module_{i}.py" for i in range(args.files)]
+
+    def stub_fetch(owner, repo, file_path, branch="main", timeout=10.0):
+        time.sleep(args.fetch_latency)
+        return f"def f():\n    return {file_path!r}\n"
+
+    def stub_llm(code, file_path, python_version="3.12", file_type="code", key_index=1, progress_callback=None, stream_path=None):
+        time.sleep(args.llm_latency)
+        return code, key_index
+
+    print(f"{'workers':>8} {'seconds':>9} {'files/s':>9} {'speedup':>8}")
+    baseline = None
+    with patch("services.refactor_full_repo_service.get_github_file_content", stub_fetch), \
+         patch("services.refactor_full_repo_service.refactor_code_or_test_file", stub_llm):
+        for workers in args.workers:
+            with tempfile.TemporaryDirectory() as out_dir:
+                start = time.perf_counter()
+                success, _, logs = refactor_all_python_files_in_repo(
+                    "owner", "repo", "main", files, "3.12",
+                    output_dir=os.path.join(out_dir, "out"), max_workers=workers
+                )
+                elapsed = time.perf_counter() - start
+            assert success and len(logs) == len(files)
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {len(files) / elapsed:>9.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()